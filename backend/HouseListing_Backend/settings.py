@@ -4,14 +4,6 @@ from datetime import timedelta
 from dotenv import load_dotenv
 load_dotenv()
 
-print("\n=== Environment Variables ===")
-print(f"DB_NAME: {os.getenv('DB_NAME')}")
-print(f"DB_USER: {os.getenv('DB_USER')}")
-print(f"DB_PASSWORD: {'*' * 8 if os.getenv('DB_PASSWORD') else 'NOT SET'}")
-print(f"DB_HOST: {os.getenv('DB_HOST')}")
-print(f"DB_PORT: {os.getenv('DB_PORT')}")
-print("===========================\n")
-
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -62,9 +54,14 @@ EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'True') == 'True'
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'noreply@greengrass.com')
+# Queue emails in the database outbox and deliver them with the
+# send_queued_email worker instead of sending during the request
+EMAIL_USE_OUTBOX = os.getenv('EMAIL_USE_OUTBOX', 'True') == 'True'
 
 # Email Verification Settings
 EMAIL_VERIFICATION_ENABLED = os.getenv('EMAIL_VERIFICATION_ENABLED', 'True') == 'True'
+# Use signed, timestamped verification links instead of EmailVerificationToken rows
+EMAIL_VERIFICATION_STATELESS = os.getenv('EMAIL_VERIFICATION_STATELESS', 'False') == 'True'
 FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:3000')
 # Backend URL for email verification links
 BACKEND_URL = os.getenv('BACKEND_URL', 'http://localhost:8000')
@@ -83,6 +80,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.sites',
+    'django.contrib.postgres',
     'rest_framework',
     'django_filters',
     'corsheaders',
@@ -96,6 +94,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.tracing.TracingMiddleware',
+    'core.profiling.ProfilingMiddleware',
+    'core.metrics.MetricsMiddleware',
+    'core.slow_queries.SlowQueryMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -103,6 +105,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.db_router.ReplicationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -111,7 +114,8 @@ ROOT_URLCONF = 'HouseListing_Backend.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates with a tracing span per render (see core/tracing.py)
+        'BACKEND': 'core.tracing.TracedDjangoTemplates',
         'DIRS': [
             os.path.join(BASE_DIR, 'HouseListing_Backend', 'templates'),
             os.path.join(BASE_DIR, 'accounts', 'templates'),
@@ -134,12 +138,14 @@ WSGI_APPLICATION = 'HouseListing_Backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-import logging
-
-# Enable SQL query logging
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        'json': {
+            '()': 'core.logging.JSONFormatter',
+        },
+    },
     'handlers': {
         'console': {
             'level': 'DEBUG',
@@ -147,13 +153,28 @@ LOGGING = {
         },
     },
     'loggers': {
-        'django.db.backends': {
-            'level': 'DEBUG',
+        'core.slow_queries': {
+            'level': 'WARNING',
             'handlers': ['console'],
+            'propagate': False,
         },
     },
 }
 
+# Log queries taking at least SLOW_QUERY_MS milliseconds, with their view,
+# user and call site (see core/slow_queries.py); 0 logs every query.
+# SLOW_QUERY_LOG also appends them to a file as JSON lines, which
+# `manage.py slow_queries` summarises.
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 200))
+SLOW_QUERY_LOG = os.getenv('SLOW_QUERY_LOG')
+if SLOW_QUERY_LOG:
+    LOGGING['handlers']['slow_query_file'] = {
+        'class': 'logging.handlers.WatchedFileHandler',
+        'filename': SLOW_QUERY_LOG,
+        'formatter': 'json',
+    }
+    LOGGING['loggers']['core.slow_queries']['handlers'].append('slow_query_file')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -167,19 +188,98 @@ DATABASES = {
             'client_encoding': 'UTF8',
             'sslmode': 'prefer',
         },
+        # Seconds to keep a connection open between requests (0 reconnects
+        # every request); settings_production raises this
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 0)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
-# Test database connection on startup
-import sys
-if 'runserver' in sys.argv:
-    try:
-        from django.db import connection
-        connection.ensure_connection()
-        print("✅ Successfully connected to the database!")
-    except Exception as e:
-        print(f"❌ Database connection failed: {e}")
-        sys.exit(1)
+# Read replicas: comma-separated host[:port][/name] entries; unset parts come
+# from the primary. Safe-method reads of rooms, accounts and messaging go to a
+# healthy replica (see core.db_router). For local testing a second database on
+# the same server works, e.g. DB_REPLICAS=127.0.0.1:5432/greengrass_replica
+DATABASE_REPLICAS = []
+for i, replica in enumerate(filter(None, os.getenv('DB_REPLICAS', '').split(',')), start=1):
+    address, _, name = replica.strip().partition('/')
+    host, _, port = address.partition(':')
+    alias = f'replica{i}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host or DATABASES['default']['HOST'],
+        'PORT': port or DATABASES['default']['PORT'],
+        'NAME': name or DATABASES['default']['NAME'],
+        # Tests read replicas through the primary's connection
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+# After a write, keep the user's reads on the primary for this many seconds
+READ_REPLICA_STICKY_SECONDS = int(os.getenv('READ_REPLICA_STICKY_SECONDS', 5))
+# Skip replicas more than this many seconds behind the primary
+REPLICA_MAX_LAG = float(os.getenv('REPLICA_MAX_LAG', 10))
+# Seconds between per-process replica health checks
+REPLICA_CHECK_INTERVAL = float(os.getenv('REPLICA_CHECK_INTERVAL', 5))
+# Use `python manage.py wait_for_db` to check the database is reachable
+
+
+# Cache
+# Counters such as unread message totals must be shared by all workers, so
+# production should point REDIS_URL at a Redis server. CACHE_DIR selects a
+# file-based cache instead, shared by the workers of a single host. Without
+# either each process falls back to its own local-memory cache.
+# Hot keys are also kept in small per-process tiers in front of this cache
+# (see core/cache.py).
+REDIS_URL = os.getenv('REDIS_URL')
+CACHE_DIR = os.getenv('CACHE_DIR')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+elif CACHE_DIR:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_DIR,
+            'OPTIONS': {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 10000))},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+
+# Metrics
+# Per-view request metrics are served at /metrics (see core/metrics.py). Under
+# gunicorn set PROMETHEUS_MULTIPROC_DIR so all workers' values are reported.
+# With METRICS_TOKEN set, scrapes must send it as a bearer token; with
+# METRICS_REQUIRE_TOKEN (on in settings_production) and no token, /metrics
+# refuses every scrape.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+METRICS_REQUIRE_TOKEN = False
+
+# Staff can profile single requests with a signed token (see core/profiling.py).
+# Tokens expire after PROFILING_TOKEN_MAX_AGE seconds, reports are kept in the
+# shared cache for PROFILING_REPORT_TTL seconds.
+PROFILING_TOKEN_MAX_AGE = int(os.getenv('PROFILING_TOKEN_MAX_AGE', 3600))
+PROFILING_REPORT_TTL = int(os.getenv('PROFILING_REPORT_TTL', 86400))
+PROFILING_SAMPLE_INTERVAL = float(os.getenv('PROFILING_SAMPLE_INTERVAL', 0.001))
+
+# Tracing (see core/tracing.py): the fraction of requests and worker batches
+# traced, and where spans are exported: an OTLP/HTTP collector such as
+# http://localhost:4318 and/or a file of OTLP/JSON lines.
+TRACING_SAMPLE_RATE = float(os.getenv('TRACING_SAMPLE_RATE', 0))
+TRACING_OTLP_ENDPOINT = os.getenv('TRACING_OTLP_ENDPOINT')
+TRACING_FILE = os.getenv('TRACING_FILE')
+TRACING_SERVICE_NAME = os.getenv('TRACING_SERVICE_NAME', 'greengrass-backend')
+TRACING_EXPORT_INTERVAL = float(os.getenv('TRACING_EXPORT_INTERVAL', 2))
 
 
 # Password validation
@@ -245,13 +345,28 @@ REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
     ],
+    # Views opt in to a limit with rate_limit_scope; see RATE_LIMITS below
+    'DEFAULT_THROTTLE_CLASSES': [
+        'core.throttling.SlidingWindowThrottle',
+    ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework_simplejwt.authentication.JWTAuthentication',  
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.BasicAuthentication',
+        # Machine clients: SHA-256 API keys instead of per-request password hashing
+        'accounts.authentication.APIKeyAuthentication',
     ],
 }
 
+# Rate limits per scope, enforced by core.ratelimit over the shared cache.
+# Format: '<requests>/<period>', e.g. '10/min', '5/hour', '1/5min'
+RATE_LIMITS = {
+    'login': os.getenv('RATE_LIMIT_LOGIN', '10/min'),
+    'resend_verification': os.getenv('RATE_LIMIT_RESEND_VERIFICATION', '1/5min'),
+    'verification_email': os.getenv('RATE_LIMIT_VERIFICATION_EMAIL', '5/hour'),
+    'message_send': os.getenv('RATE_LIMIT_MESSAGE_SEND', '30/min'),
+    'property_create': os.getenv('RATE_LIMIT_PROPERTY_CREATE', '20/hour'),
+}
+
 # JWT Settings
 from datetime import timedelta
 
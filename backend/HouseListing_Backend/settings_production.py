@@ -0,0 +1,71 @@
+"""
+Production settings.
+
+Select with DJANGO_SETTINGS_MODULE=HouseListing_Backend.settings_production.
+Everything not overridden here comes from settings.py.
+"""
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES, SLOW_QUERY_LOG, TEMPLATES
+
+DEBUG = False
+
+# Keep connections open across requests instead of reconnecting every time;
+# health checks replace connections the server has closed before reuse. The
+# replica aliases were copied from the primary's settings, so set them too.
+for database in DATABASES.values():
+    database['CONN_MAX_AGE'] = int(os.getenv('DB_CONN_MAX_AGE', 60))
+    database['CONN_HEALTH_CHECKS'] = True
+
+# Per-view traffic and timings are not public: /metrics refuses scrapes
+# unless METRICS_TOKEN is set and sent
+METRICS_REQUIRE_TOKEN = True
+
+# Compile each template once per process
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['debug'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+
+# One JSON object per line on stdout; no SQL echo
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {
+            '()': 'core.logging.JSONFormatter',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'json',
+        },
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': os.getenv('LOG_LEVEL', 'INFO'),
+    },
+    'loggers': {
+        'django.db.backends': {
+            'level': 'WARNING',
+        },
+    },
+}
+
+# Slow queries reach stdout through the root logger; SLOW_QUERY_LOG keeps a
+# copy for `manage.py slow_queries`
+if SLOW_QUERY_LOG:
+    LOGGING['handlers']['slow_query_file'] = {
+        'class': 'logging.handlers.WatchedFileHandler',
+        'filename': SLOW_QUERY_LOG,
+        'formatter': 'json',
+    }
+    LOGGING['loggers']['core.slow_queries'] = {
+        'handlers': ['slow_query_file'],
+    }
@@ -0,0 +1,95 @@
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from django.contrib.auth import get_user_model
+from rest_framework import authentication, exceptions
+from .models import APIKey
+
+
+class APIKeyAuthentication(authentication.BaseAuthentication):
+    """
+    Authenticate machine clients with an ``Authorization: Api-Key <key>`` header.
+
+    Verified keys are remembered per process for ``cache_ttl`` seconds, so
+    repeat calls from the same integration skip the key lookup. Only the
+    key's fields and user id are remembered: the user is loaded on every
+    request, so deactivation and permission changes apply at once, and each
+    request gets its own instances. Revoking a key clears it in the current
+    process; other processes notice within ``cache_ttl`` seconds.
+    """
+    keyword = 'Api-Key'
+    cache_ttl = 60
+    cache_size = 1024
+
+    _verified = OrderedDict()  # digest -> (expires_at, api_key fields)
+    _lock = threading.Lock()
+
+    def authenticate(self, request):
+        auth = authentication.get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid API key header.')
+
+        try:
+            raw_key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed('Invalid API key.')
+        return self.authenticate_key(raw_key)
+
+    def authenticate_key(self, raw_key):
+        digest = APIKey.hash_key(raw_key)
+        fields = self._get_cached(digest)
+        if fields is not None:
+            api_key = APIKey(**fields)
+            api_key.user = get_user_model().objects.filter(pk=api_key.user_id).first()
+            if api_key.user is None or not api_key.user.is_active:
+                raise exceptions.AuthenticationFailed('User inactive or deleted.')
+            return api_key.user, api_key
+
+        prefix = APIKey.split_key(raw_key)
+        if prefix is None:
+            raise exceptions.AuthenticationFailed('Invalid API key.')
+        try:
+            api_key = APIKey.objects.select_related('user').get(prefix=prefix, revoked_at__isnull=True)
+        except APIKey.DoesNotExist:
+            raise exceptions.AuthenticationFailed('Invalid API key.')
+        if not hmac.compare_digest(api_key.digest, digest):
+            raise exceptions.AuthenticationFailed('Invalid API key.')
+        if not api_key.user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+
+        self._set_cached(digest, api_key)
+        return api_key.user, api_key
+
+    def authenticate_header(self, request):
+        return self.keyword
+
+    @classmethod
+    def _get_cached(cls, digest):
+        with cls._lock:
+            entry = cls._verified.get(digest)
+            if entry is None:
+                return None
+            expires_at, fields = entry
+            if expires_at < time.monotonic():
+                del cls._verified[digest]
+                return None
+            cls._verified.move_to_end(digest)
+            return fields
+
+    @classmethod
+    def _set_cached(cls, digest, api_key):
+        fields = {field.attname: getattr(api_key, field.attname) for field in APIKey._meta.concrete_fields}
+        with cls._lock:
+            cls._verified[digest] = (time.monotonic() + cls.cache_ttl, fields)
+            cls._verified.move_to_end(digest)
+            while len(cls._verified) > cls.cache_size:
+                cls._verified.popitem(last=False)
+
+    @classmethod
+    def forget(cls, api_key):
+        """Drop a key from this process's verification cache."""
+        with cls._lock:
+            cls._verified.pop(api_key.digest, None)
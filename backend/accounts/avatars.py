@@ -0,0 +1,149 @@
+"""
+Square WebP renditions of profile avatars.
+
+Uploads are stored as-is and flagged avatar_pending. The process_avatars
+worker later crops each one to a centred square and writes one WebP file per
+size in AVATAR_SIZES, so no image work happens on the request path.
+Serializers link to the variant for the size they display and fall back to
+the original upload until it has been processed.
+"""
+import logging
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from core import tracing
+
+from .models import UserProfile
+
+logger = logging.getLogger(__name__)
+
+AVATAR_SIZES = (48, 128, 256)
+AVATAR_MAX_UPLOAD_SIZE = 5 * 1024 * 1024  # bytes
+WEBP_QUALITY = 80
+
+
+def variant_field(size):
+    return f'avatar_{size}'
+
+
+def avatar_url(profile, size, request=None):
+    """URL of the profile's avatar at ``size`` px, or None without an avatar."""
+    if profile is None:
+        return None
+    image = getattr(profile, variant_field(size)) or profile.avatar
+    if not image:
+        return None
+    return request.build_absolute_uri(image.url) if request else image.url
+
+
+def avatar_urls(profile, request=None):
+    return {str(size): avatar_url(profile, size, request) for size in AVATAR_SIZES}
+
+
+def reset_avatar_variants(profile, new_avatar):
+    """
+    Prepare ``profile`` for a new avatar upload: clear the variants and flag
+    the upload for the worker. The caller saves the profile. Old variant files
+    are deleted once the transaction commits.
+    """
+    stale = [getattr(profile, variant_field(size)) for size in AVATAR_SIZES]
+    stale = [(image.storage, image.name) for image in stale if image]
+    for size in AVATAR_SIZES:
+        setattr(profile, variant_field(size), None)
+    profile.avatar_pending = bool(new_avatar)
+    if stale:
+        transaction.on_commit(lambda: [storage.delete(name) for storage, name in stale])
+
+
+def render_variants(image_file):
+    """
+    Render a centred square WebP of ``image_file`` for each size.
+
+    Returns:
+        dict: {size: ContentFile}
+    """
+    variants = {}
+    with tracing.span('image.decode'), Image.open(image_file) as image:
+        image = ImageOps.exif_transpose(image)
+        mode = 'RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB'
+        image = image.convert(mode)
+    for size in AVATAR_SIZES:
+        with tracing.span('image.resize', {'image.size': size}):
+            variant = ImageOps.fit(image, (size, size), method=Image.Resampling.LANCZOS)
+            buffer = BytesIO()
+            variant.save(buffer, format='WEBP', quality=WEBP_QUALITY, method=4)
+            variants[size] = ContentFile(buffer.getvalue())
+    return variants
+
+
+def process_avatar(profile):
+    """
+    Build and store the variants for a claimed avatar.
+
+    No lock is held while rendering; the variants are only saved if the
+    avatar was not replaced in the meantime.
+    """
+    if not profile.avatar:
+        return False
+
+    try:
+        with profile.avatar.open('rb') as f:
+            variants = render_variants(f)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        # Keep serving the original rather than retrying a broken file forever
+        logger.warning(f"Could not process avatar for profile {profile.pk}: {str(e)}")
+        return False
+
+    stem = os.path.splitext(os.path.basename(profile.avatar.name))[0]
+    for size, content in variants.items():
+        getattr(profile, variant_field(size)).save(f'{stem}_{size}.webp', content, save=False)
+
+    with transaction.atomic():
+        current = UserProfile.objects.select_for_update().filter(pk=profile.pk).values('avatar', 'avatar_pending')
+        if list(current) == [{'avatar': profile.avatar.name, 'avatar_pending': False}]:
+            # Saving fires post_save, which invalidates the cached profile payload
+            profile.save(update_fields=[variant_field(size) for size in AVATAR_SIZES])
+            return True
+
+    # A new upload replaced this one and is queued itself
+    for size in AVATAR_SIZES:
+        image = getattr(profile, variant_field(size))
+        image.storage.delete(image.name)
+    return False
+
+
+def claim_pending_avatars(batch_size):
+    """
+    Claim up to ``batch_size`` pending avatars by clearing their flag.
+
+    Rows are picked with SELECT ... FOR UPDATE SKIP LOCKED so several workers
+    can run at once, and the locks are released as soon as the flags are
+    cleared. An avatar claimed by a worker that dies keeps serving the
+    original until the next upload.
+    """
+    with transaction.atomic():
+        claimed = list(
+            UserProfile.objects.select_for_update(skip_locked=True)
+            .filter(avatar_pending=True)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        UserProfile.objects.filter(pk__in=claimed).update(avatar_pending=False)
+    return list(UserProfile.objects.filter(pk__in=claimed).order_by('pk'))
+
+
+def process_pending_avatars(batch_size=20):
+    """
+    Process one batch of pending avatars.
+
+    Returns:
+        int: Number of profiles handled
+    """
+    batch = claim_pending_avatars(batch_size)
+    for profile in batch:
+        process_avatar(profile)
+    return len(batch)
@@ -1,7 +1,6 @@
 import logging
 import random
 from datetime import timedelta
-from django.core.cache import cache
 from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
@@ -10,29 +9,32 @@ from django.urls import reverse
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from .models import EmailVerificationToken, User
+from .outbox import enqueue_email
+from .tokens import make_verification_token
+from core import tracing
+from core.ratelimit import SlidingWindowRateLimiter
 
 logger = logging.getLogger(__name__)
 
-def check_email_rate_limit(email, limit=5, period=3600):
+def check_email_rate_limit(email, limit=None, period=None):
     """
     Check if the email sending rate limit has been exceeded.
     
     Args:
         email: The email address to check
         limit: Maximum number of emails allowed in the period
+            (default: RATE_LIMITS['verification_email'])
         period: Time period in seconds
         
     Returns:
         bool: True if rate limit is not exceeded, False otherwise
     """
-    cache_key = f'email_rate_limit:{email}'
-    count = cache.get(cache_key, 0)
-    
-    if count >= limit:
-        return False
-        
-    cache.set(cache_key, count + 1, period)
-    return True
+    limiter = SlidingWindowRateLimiter.for_scope('verification_email')
+    if limit is not None:
+        limiter.limit = limit
+    if period is not None:
+        limiter.window = period
+    return limiter.hit(email.lower())
 
 def send_verification_email(user, request=None, **kwargs):
     """
@@ -44,21 +46,26 @@ def send_verification_email(user, request=None, **kwargs):
         **kwargs: Additional arguments to pass to the email sending function
         
     Returns:
-        bool: True if email was sent successfully
+        bool: True if email was queued or sent successfully
     """
     # Check rate limit
     if not check_email_rate_limit(user.email):
         logger.warning(f"Rate limit exceeded for email: {user.email}")
         raise ValidationError("Too many verification attempts. Please try again later.")
     
-    # Invalidate any existing tokens for this user
-    EmailVerificationToken.objects.filter(user=user, is_used=False).update(is_used=True)
-    
-    # Create a new verification token
-    token_obj = EmailVerificationToken.objects.create(user=user)
+    if settings.EMAIL_VERIFICATION_STATELESS:
+        # Signed, timestamped link: nothing is written to the token table
+        token_obj = None
+        verification_path = reverse('verify-email-signed', kwargs={'token': make_verification_token(user)})
+    else:
+        # Invalidate any existing tokens for this user
+        EmailVerificationToken.objects.filter(user=user, is_used=False).update(is_used=True)
+        
+        # Create a new verification token
+        token_obj = EmailVerificationToken.objects.create(user=user)
+        verification_path = reverse('verify-email', kwargs={'token': str(token_obj.token)})
     
     # Build verification URL using backend URL
-    verification_path = reverse('verify-email', kwargs={'token': str(token_obj.token)})
     if request:
         verification_url = request.build_absolute_uri(verification_path)
     else:
@@ -79,22 +86,35 @@ def send_verification_email(user, request=None, **kwargs):
     html_message = render_to_string('emails/verify_email.html', context)
     plain_message = strip_tags(html_message)
     
-    try:
-        # Send email synchronously
-        send_mail(
+    if settings.EMAIL_USE_OUTBOX:
+        # Queue the rendered email; the send_queued_email worker delivers it
+        enqueue_email(
             subject=subject,
             message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
             recipient_list=[user.email],
             html_message=html_message,
-            fail_silently=False,
-            **kwargs
         )
+        logger.info(f"Verification email queued for {user.email}")
+        return True
+    
+    try:
+        # Send email synchronously
+        with tracing.span('email.send', {'email.recipients': 1}, tracing.CLIENT):
+            send_mail(
+                subject=subject,
+                message=plain_message,
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                recipient_list=[user.email],
+                html_message=html_message,
+                fail_silently=False,
+                **kwargs
+            )
         logger.info(f"Verification email sent to {user.email}")
         return True
     except Exception as e:
         logger.error(f"Failed to send verification email to {user.email}: {str(e)}")
         # Mark token as used to prevent issues
-        token_obj.is_used = True
-        token_obj.save()
+        if token_obj is not None:
+            token_obj.is_used = True
+            token_obj.save()
         return False
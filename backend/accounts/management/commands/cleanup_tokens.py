@@ -1,13 +1,13 @@
+import time
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from accounts.models import EmailVerificationToken
-from django.db import transaction
 import logging
 
 logger = logging.getLogger(__name__)
 
 class Command(BaseCommand):
-    help = 'Cleans up expired email verification tokens'
+    help = 'Deletes expired and used email verification tokens in small batches'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -15,36 +15,59 @@ class Command(BaseCommand):
             action='store_true',
             help='Show what would be deleted without actually deleting',
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of tokens deleted per statement (default: 1000)',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0,
+            help='Seconds to pause between batches to reduce load (default: 0)',
+        )
 
     def handle(self, *args, **options):
-        dry_run = options['dry_run']
-        now = timezone.now()
-        
-        # Get all expired tokens
-        expired_tokens = EmailVerificationToken.objects.filter(
-            expires_at__lt=now
-        )
-        
-        count = expired_tokens.count()
-        
-        if dry_run:
+        cutoff = timezone.now() - EmailVerificationToken.VALIDITY_PERIOD
+        expired_tokens = EmailVerificationToken.objects.filter(created_at__lt=cutoff)
+        # Whatever is left after the first pass is less than a day old
+        used_tokens = EmailVerificationToken.objects.filter(is_used=True, created_at__gte=cutoff)
+
+        if options['dry_run']:
             self.stdout.write(
                 self.style.WARNING(
-                    f'[DRY RUN] Would delete {count} expired tokens'
+                    f'[DRY RUN] Would delete {expired_tokens.count()} expired '
+                    f'and {used_tokens.count()} used tokens'
                 )
             )
             return
-        
-        # Delete expired tokens in a transaction
-        with transaction.atomic():
-            deleted_count, _ = expired_tokens.delete()
-        
+
+        deleted_count = self.purge(expired_tokens.order_by('created_at', 'pk'), 'expired', options)
+        deleted_count += self.purge(used_tokens.order_by('pk'), 'used', options)
+
         if deleted_count > 0:
-            logger.info(f'Deleted {deleted_count} expired tokens')
+            logger.info(f'Deleted {deleted_count} expired or used tokens')
             self.stdout.write(
-                self.style.SUCCESS(f'Successfully deleted {deleted_count} expired tokens')
+                self.style.SUCCESS(f'Successfully deleted {deleted_count} expired or used tokens')
             )
         else:
             self.stdout.write(
-                self.style.SUCCESS('No expired tokens to delete')
+                self.style.SUCCESS('No expired or used tokens to delete')
             )
+
+    def purge(self, queryset, label, options):
+        """
+        Delete the queryset in primary-key batches. Each batch commits on its
+        own, so locks are held briefly and progress survives an interruption.
+        """
+        total = 0
+        while True:
+            pks = list(queryset.values_list('pk', flat=True)[:options['batch_size']])
+            if not pks:
+                return total
+            deleted, _ = EmailVerificationToken.objects.filter(pk__in=pks).delete()
+            total += deleted
+            self.stdout.write(f'Deleted {total} {label} tokens so far...')
+            if options['sleep']:
+                time.sleep(options['sleep'])
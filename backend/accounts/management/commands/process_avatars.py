@@ -0,0 +1,45 @@
+import time
+from django.core.management.base import BaseCommand
+from accounts.avatars import process_pending_avatars
+from core import tracing
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Renders square WebP variants for newly uploaded avatars'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=20,
+            help='Number of avatars claimed at a time (default: 20)',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Seconds to wait when no avatars are pending (default: 5)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process the pending avatars once and exit instead of polling',
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            with tracing.trace('process_avatars') as root:
+                processed = process_pending_avatars(batch_size=options['batch_size'])
+                root.set({'avatars.processed': processed})
+            total += processed
+            if processed:
+                logger.info(f'Processed {processed} avatars')
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {total} avatars'))
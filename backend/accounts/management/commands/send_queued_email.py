@@ -0,0 +1,57 @@
+import time
+from django.core.management.base import BaseCommand
+from accounts.outbox import deliver_batch
+from core import tracing
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Sends queued emails from the outbox in batches, retrying failures with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Number of emails sent over one connection (default: 50)',
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=5,
+            help='Give up on an email after this many failed attempts (default: 5)',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Seconds to wait when the outbox is empty (default: 5)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the outbox once and exit instead of polling',
+        )
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        while True:
+            with tracing.trace('send_queued_email') as root:
+                sent, failed = deliver_batch(
+                    batch_size=options['batch_size'],
+                    max_attempts=options['max_attempts'],
+                )
+                root.set({'email.sent': sent, 'email.failed': failed})
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                logger.info(f'Outbox batch: {sent} sent, {failed} failed')
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Sent {total_sent} emails ({total_failed} failed attempts)')
+        )
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-19 01:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_outboundemail'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='emailverificationtoken',
+            index=models.Index(fields=['created_at'], name='evtoken_created_at_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.5 on 2026-10-19 01:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_apikey'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='avatar_128',
+            field=models.ImageField(blank=True, null=True, upload_to='avatars/variants/'),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='avatar_256',
+            field=models.ImageField(blank=True, null=True, upload_to='avatars/variants/'),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='avatar_48',
+            field=models.ImageField(blank=True, null=True, upload_to='avatars/variants/'),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='avatar_pending',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(condition=models.Q(('avatar_pending', True)), fields=['id'], name='profile_avatar_pending_idx'),
+        ),
+    ]
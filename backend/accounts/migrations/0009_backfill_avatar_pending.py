@@ -0,0 +1,21 @@
+"""
+Flag avatars uploaded before the variant fields existed, so the
+process_avatars worker renders their WebP variants too.
+"""
+from django.db import migrations
+
+
+def flag_existing_avatars(apps, schema_editor):
+    UserProfile = apps.get_model('accounts', 'UserProfile')
+    UserProfile.objects.exclude(avatar='').exclude(avatar__isnull=True).update(avatar_pending=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_avatar_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(flag_existing_avatars, migrations.RunPython.noop),
+    ]
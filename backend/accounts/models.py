@@ -1,3 +1,5 @@
+import hashlib
+import secrets
 import uuid
 from django.db import models
 from django.contrib.auth.models import AbstractUser, BaseUserManager
@@ -61,12 +63,18 @@ class EmailVerificationToken(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_used = models.BooleanField(default=False)
 
+    # Tokens are valid for 24 hours
+    VALIDITY_PERIOD = timezone.timedelta(hours=24)
+
     class Meta:
         ordering = ['-created_at']  # Newest tokens first
+        indexes = [
+            # Lets cleanup_tokens find expired tokens without a full scan
+            models.Index(fields=['created_at'], name='evtoken_created_at_idx'),
+        ]
 
     def is_valid(self):
-        # Token is valid for 24 hours
-        expiration_time = self.created_at + timezone.timedelta(hours=24)
+        expiration_time = self.created_at + self.VALIDITY_PERIOD
         return not self.is_used and timezone.now() <= expiration_time
 
     def mark_used(self):
@@ -77,6 +85,89 @@ class EmailVerificationToken(models.Model):
     def __str__(self):
         return f"{self.user.email} - {'Used' if self.is_used else 'Valid'}"
 
+class APIKey(models.Model):
+    """
+    Landlord-scoped key for machine clients such as listing-sync scripts.
+
+    Keys are random 256-bit secrets, so a single SHA-256 digest is enough to
+    store them safely and verification costs microseconds rather than a
+    password hash. The short prefix is stored in clear to find the row.
+    """
+    KEY_PREFIX = 'gg'
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='api_keys')
+    name = models.CharField(max_length=100)
+    prefix = models.CharField(max_length=16, unique=True)
+    digest = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+    revoked_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.user.email} - {self.name} ({self.prefix})"
+
+    @staticmethod
+    def hash_key(raw_key):
+        return hashlib.sha256(raw_key.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def split_key(raw_key):
+        """Return the lookup prefix of a raw key, or None if it is malformed."""
+        parts = raw_key.split('_', 1)
+        if len(parts) != 2 or parts[0] != APIKey.KEY_PREFIX or '.' not in parts[1]:
+            return None
+        return parts[1].split('.', 1)[0]
+
+    @classmethod
+    def generate(cls, user, name):
+        """
+        Create a key for the user.
+
+        Returns:
+            tuple: (APIKey instance, raw key) - the raw key is only available here
+        """
+        prefix = secrets.token_hex(6)
+        raw_key = f"{cls.KEY_PREFIX}_{prefix}.{secrets.token_urlsafe(32)}"
+        api_key = cls.objects.create(user=user, name=name, prefix=prefix, digest=cls.hash_key(raw_key))
+        return api_key, raw_key
+
+    def revoke(self):
+        self.revoked_at = timezone.now()
+        self.save(update_fields=['revoked_at'])
+
+class OutboundEmail(models.Model):
+    """Rendered email waiting in the outbox for the send_queued_email worker."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    to = models.EmailField()
+    from_email = models.CharField(max_length=254)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            # The worker only ever scans pending rows that are due
+            models.Index(fields=['next_attempt_at'], condition=models.Q(status='pending'),
+                         name='outbox_pending_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.to} - {self.subject} ({self.status})"
+
 class UserProfile(models.Model):
     USER_TYPES = [
         ('landlord', 'Landlord'),
@@ -91,6 +182,11 @@ class UserProfile(models.Model):
     # Profile fields
     bio = models.TextField(max_length=500, blank=True)
     avatar = models.ImageField(upload_to='avatars/', blank=True, null=True)
+    # Square WebP renditions of avatar, built by the process_avatars worker
+    avatar_48 = models.ImageField(upload_to='avatars/variants/', blank=True, null=True)
+    avatar_128 = models.ImageField(upload_to='avatars/variants/', blank=True, null=True)
+    avatar_256 = models.ImageField(upload_to='avatars/variants/', blank=True, null=True)
+    avatar_pending = models.BooleanField(default=False)
     location = models.CharField(max_length=100, blank=True)
     date_of_birth = models.DateField(blank=True, null=True)
     
@@ -110,6 +206,13 @@ class UserProfile(models.Model):
     email_verification_sent = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # The avatar worker only scans profiles with an unprocessed upload
+            models.Index(fields=['id'], condition=models.Q(avatar_pending=True),
+                         name='profile_avatar_pending_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - {self.user_type}"
@@ -0,0 +1,109 @@
+import logging
+from datetime import timedelta
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from core import tracing
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_DELAY = 60  # seconds
+RETRY_MAX_DELAY = 60 * 60
+
+def enqueue_email(subject, message, recipient_list, html_message=None, from_email=None):
+    """
+    Store a rendered email in the outbox instead of sending it.
+
+    The rows are written in the caller's transaction, so the worker only sees
+    them once that transaction commits and nothing is sent for a rolled-back
+    request.
+
+    Returns:
+        list: The created OutboundEmail rows
+    """
+    return OutboundEmail.objects.bulk_create([
+        OutboundEmail(
+            to=recipient,
+            from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+            subject=subject,
+            body=message,
+            html_body=html_message or '',
+        )
+        for recipient in recipient_list
+    ])
+
+def retry_delay(attempts):
+    """Exponential backoff: 1, 2, 4 ... minutes, capped at an hour."""
+    return timedelta(seconds=min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY))
+
+def _record_failure(email, error, max_attempts, now):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= max_attempts:
+        email.status = 'failed'
+    else:
+        email.next_attempt_at = now + retry_delay(email.attempts)
+
+def deliver_batch(batch_size=50, max_attempts=5):
+    """
+    Send one batch of due outbox emails over a single backend connection.
+
+    Rows are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so several
+    workers can drain the outbox at once without sending anything twice.
+
+    Returns:
+        tuple: (sent, failed) counts for the batch
+    """
+    now = timezone.now()
+    sent = failed = 0
+    with transaction.atomic():
+        batch = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True).filter(
+                status='pending',
+                next_attempt_at__lte=now
+            ).order_by('next_attempt_at')[:batch_size]
+        )
+        if not batch:
+            return sent, failed
+
+        connection = get_connection(fail_silently=False)
+        try:
+            connection.open()
+        except Exception as e:
+            logger.error(f"Could not open email connection: {str(e)}")
+            for email in batch:
+                _record_failure(email, e, max_attempts, now)
+            failed = len(batch)
+        else:
+            try:
+                for email in batch:
+                    message = EmailMultiAlternatives(
+                        subject=email.subject,
+                        body=email.body,
+                        from_email=email.from_email,
+                        to=[email.to],
+                        connection=connection,
+                    )
+                    if email.html_body:
+                        message.attach_alternative(email.html_body, 'text/html')
+                    try:
+                        with tracing.span('email.send', {'email.id': email.pk}, tracing.CLIENT):
+                            message.send()
+                    except Exception as e:
+                        logger.warning(f"Failed to send email {email.pk} to {email.to}: {str(e)}")
+                        _record_failure(email, e, max_attempts, now)
+                        failed += 1
+                    else:
+                        email.status = 'sent'
+                        email.sent_at = timezone.now()
+                        email.attempts += 1
+                        sent += 1
+            finally:
+                connection.close()
+
+        OutboundEmail.objects.bulk_update(
+            batch, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+        )
+    return sent, failed
@@ -0,0 +1,122 @@
+"""
+Serialized profile payloads kept in the shared cache.
+
+Each user has a profile version in the cache, and their ProfileDetailSerializer
+payload is stored under a key that includes it. Saving the user or profile
+bumps the version after commit, so readers move to a new key and stale
+payloads simply expire; nothing ever has to be found and deleted. Avatar
+URLs are cached relative and made absolute for each request, so one
+viewer's scheme and host never reach another.
+
+User types (landlord or tenant), checked by permissions on most requests,
+are kept in a two-tier cache and dropped when the profile changes.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from core.cache import TwoTierCache
+from core.metrics import record_cache_lookups
+from .models import UserProfile
+from .serializers import ProfileDetailSerializer
+
+PROFILE_CACHE_TIMEOUT = 60 * 60  # seconds
+
+user_types = TwoTierCache('user-type', maxsize=4096, local_ttl=30, timeout=PROFILE_CACHE_TIMEOUT)
+
+
+def profile_version_key(user_id):
+    return f'accounts:profile-version:{user_id}'
+
+
+def profile_key(user_id, version):
+    return f'accounts:profile:{user_id}:v{version}'
+
+
+def _new_version():
+    # Time-based, so a version lost to eviction never restarts at a number
+    # whose payload may still be cached
+    return time.time_ns()
+
+
+def get_profile_versions(user_ids):
+    keys = {user_id: profile_version_key(user_id) for user_id in user_ids}
+    cached = cache.get_many(keys.values())
+    versions = {}
+    for user_id, key in keys.items():
+        version = cached.get(key)
+        if version is None:
+            version = _new_version()
+            # add() so concurrent readers settle on the same version
+            if not cache.add(key, version, timeout=None):
+                version = cache.get(key, version)
+        versions[user_id] = version
+    return versions
+
+
+def bump_profile_version(user_id):
+    key = profile_version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), timeout=None)
+
+
+def profile_changed(user_id):
+    """Invalidate the user's cached profile once the current transaction commits."""
+    transaction.on_commit(lambda: bump_profile_version(user_id))
+
+
+def with_absolute_urls(data, request):
+    """A copy of a cached payload with its avatar URLs made absolute for ``request``."""
+    if request is None:
+        return data
+    return {
+        **data,
+        'avatar': data['avatar'] and request.build_absolute_uri(data['avatar']),
+        'avatar_urls': {
+            size: url and request.build_absolute_uri(url) for size, url in data['avatar_urls'].items()
+        },
+    }
+
+
+def get_cached_profiles(user_ids, request=None):
+    """
+    Return {user_id: payload} for the given users, serializing only cache
+    misses (with one query). Users without a profile are left out.
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    versions = get_profile_versions(user_ids)
+    keys = {user_id: profile_key(user_id, versions[user_id]) for user_id in user_ids}
+    cached = cache.get_many(keys.values())
+    payloads = {user_id: cached[key] for user_id, key in keys.items() if key in cached}
+
+    missing = [user_id for user_id in user_ids if user_id not in payloads]
+    record_cache_lookups(hits=len(payloads), misses=len(missing))
+    if missing:
+        fresh = {}
+        for profile in UserProfile.objects.filter(user_id__in=missing).select_related('user'):
+            # No request in the context, so avatar URLs stay relative
+            data = dict(ProfileDetailSerializer(profile).data)
+            payloads[profile.user_id] = data
+            fresh[keys[profile.user_id]] = data
+        cache.set_many(fresh, PROFILE_CACHE_TIMEOUT)
+    return {user_id: with_absolute_urls(data, request) for user_id, data in payloads.items()}
+
+
+def get_cached_profile(user_id, request=None):
+    """Return the user's profile payload, or None if they have no profile."""
+    return get_cached_profiles([user_id], request).get(user_id)
+
+
+def get_user_type(user_id):
+    """The user's profile type ('landlord' or 'tenant'), or None without a profile."""
+    return user_types.get_or_set(
+        user_id,
+        lambda: UserProfile.objects.filter(user_id=user_id).values_list('user_type', flat=True).first()
+    )
+
+
+def user_type_changed(user_id):
+    transaction.on_commit(lambda: user_types.delete(user_id))
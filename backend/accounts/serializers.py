@@ -1,8 +1,10 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
+from django.db import transaction
 from rest_framework.validators import UniqueValidator
-from .models import UserProfile
+from .avatars import AVATAR_MAX_UPLOAD_SIZE, avatar_urls, reset_avatar_variants
+from .models import APIKey, UserProfile
 
 User = get_user_model()
 
@@ -54,23 +56,21 @@ class RegisterSerializer(serializers.ModelSerializer):
         
         return attrs
 
+    @transaction.atomic
     def create(self, validated_data):
         user_type = validated_data.pop('user_type')
         landlord_data = validated_data.pop('landlord', None)
         tenant_data = validated_data.pop('tenant', None)
         
-        # Create the user
+        # Create the user; the password is hashed once, in the same INSERT
         user = User.objects.create_user(
             email=validated_data['email'],
+            password=validated_data['password'],
             first_name=validated_data.get('first_name', ''),
             last_name=validated_data.get('last_name', ''),
             is_active=False
         )
         
-        # Set password and save user
-        user.set_password(validated_data['password'])
-        user.save()
-        
         # Create user profile with the appropriate type
         profile_data = landlord_data if user_type == 'landlord' else tenant_data
         profile_data['user_type'] = user_type
@@ -80,7 +80,22 @@ class RegisterSerializer(serializers.ModelSerializer):
         
         return user
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class AvatarUploadMixin:
+    """Size check and variant reset for serializers that accept an avatar upload."""
+    def validate_avatar(self, value):
+        if value and value.size > AVATAR_MAX_UPLOAD_SIZE:
+            raise serializers.ValidationError(
+                f'Avatar must be smaller than {AVATAR_MAX_UPLOAD_SIZE // (1024 * 1024)} MB.'
+            )
+        return value
+
+    def prepare_avatar(self, instance, validated_data):
+        # New uploads are resized later by the process_avatars worker
+        if 'avatar' in validated_data:
+            reset_avatar_variants(instance, validated_data['avatar'])
+
+
+class UserProfileSerializer(AvatarUploadMixin, serializers.ModelSerializer):
     email = serializers.EmailField(source='user.email', read_only=True)
     first_name = serializers.CharField(source='user.first_name')
     last_name = serializers.CharField(source='user.last_name')
@@ -101,6 +116,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
         user.save()
 
         # Update profile fields
+        self.prepare_avatar(instance, validated_data)
         return super().update(instance, validated_data)
 
 
@@ -114,15 +130,19 @@ class ProfileDetailSerializer(serializers.ModelSerializer):
     user_type = serializers.CharField()
     property_name = serializers.CharField(required=False)
     years_experience = serializers.IntegerField(required=False)
+    avatar_urls = serializers.SerializerMethodField()
 
     class Meta:
         model = UserProfile
         fields = ('email', 'first_name', 'last_name', 'phone_number', 
-                 'avatar', 'bio', 'date_of_birth', 'is_verified', 
+                 'avatar', 'avatar_urls', 'bio', 'location', 'date_of_birth', 'is_verified', 
                  'date_joined', 'user_type', 'property_name', 'years_experience')
 
+    def get_avatar_urls(self, obj):
+        return avatar_urls(obj, self.context.get('request'))
 
-class ProfileUpdateSerializer(serializers.ModelSerializer):
+
+class ProfileUpdateSerializer(AvatarUploadMixin, serializers.ModelSerializer):
     first_name = serializers.CharField(source='user.first_name', required=False)
     last_name = serializers.CharField(source='user.last_name', required=False)
     current_password = serializers.CharField(write_only=True, required=False, allow_blank=True)
@@ -176,4 +196,12 @@ class ProfileUpdateSerializer(serializers.ModelSerializer):
         user.save()
 
         # Update profile fields
+        self.prepare_avatar(instance, validated_data)
         return super().update(instance, validated_data)
+
+
+class APIKeySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = APIKey
+        fields = ('id', 'name', 'prefix', 'created_at', 'revoked_at')
+        read_only_fields = ('id', 'prefix', 'created_at', 'revoked_at')
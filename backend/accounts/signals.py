@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import UserProfile
+from .profile_cache import profile_changed, user_type_changed
+
+
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login, which is not part of the profile payload
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    profile_changed(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def user_profile_changed(sender, instance, **kwargs):
+    profile_changed(instance.user_id)
+    user_type_changed(instance.user_id)
@@ -0,0 +1,88 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import exceptions
+from rest_framework.test import APIClient
+from accounts.authentication import APIKeyAuthentication
+from accounts.models import APIKey, UserProfile
+
+User = get_user_model()
+
+
+class APIKeyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.landlord = User.objects.create_user(email='landlord@example.com')
+        UserProfile.objects.create(user=cls.landlord, user_type='landlord')
+        cls.tenant = User.objects.create_user(email='tenant@example.com')
+        UserProfile.objects.create(user=cls.tenant, user_type='tenant')
+
+    def setUp(self):
+        APIKeyAuthentication._verified.clear()
+        self.client = APIClient()
+
+    def create_key(self, user):
+        self.client.force_authenticate(user)
+        response = self.client.post(reverse('api-key-list-create'), {'name': 'Listing sync'})
+        self.client.force_authenticate(None)
+        return response
+
+    def test_landlord_key_authenticates_requests(self):
+        raw_key = self.create_key(self.landlord).data['key']
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Api-Key {raw_key}')
+        response = self.client.get(reverse('landlord-properties'))
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_only_the_digest_is_stored(self):
+        response = self.create_key(self.landlord)
+
+        api_key = APIKey.objects.get()
+        self.assertNotIn(response.data['key'], (api_key.prefix, api_key.digest))
+        self.assertEqual(api_key.digest, APIKey.hash_key(response.data['key']))
+
+    def test_tenants_cannot_create_keys(self):
+        self.assertEqual(self.create_key(self.tenant).status_code, 403)
+
+    def test_verified_keys_are_cached_per_process(self):
+        _, raw_key = APIKey.generate(self.landlord, 'Listing sync')
+        auth = APIKeyAuthentication()
+        first_user, first_key = auth.authenticate_key(raw_key)
+
+        # Only the user is loaded again
+        with self.assertNumQueries(1):
+            user, api_key = auth.authenticate_key(raw_key)
+
+        self.assertEqual(user, self.landlord)
+        self.assertEqual(api_key, first_key)
+        self.assertIsNot(user, first_user)
+        self.assertIsNot(api_key, first_key)
+
+    def test_user_changes_apply_to_cached_keys(self):
+        _, raw_key = APIKey.generate(self.landlord, 'Listing sync')
+        auth = APIKeyAuthentication()
+        auth.authenticate_key(raw_key)
+
+        User.objects.filter(pk=self.landlord.pk).update(is_staff=True)
+        self.assertTrue(auth.authenticate_key(raw_key)[0].is_staff)
+
+        User.objects.filter(pk=self.landlord.pk).update(is_active=False)
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            auth.authenticate_key(raw_key)
+
+    def test_revoked_keys_are_rejected(self):
+        api_key, raw_key = APIKey.generate(self.landlord, 'Listing sync')
+        APIKeyAuthentication().authenticate_key(raw_key)
+
+        self.client.force_authenticate(self.landlord)
+        response = self.client.delete(reverse('api-key-revoke', kwargs={'pk': api_key.pk}))
+
+        self.assertEqual(response.status_code, 204)
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            APIKeyAuthentication().authenticate_key(raw_key)
+
+    def test_malformed_and_unknown_keys_are_rejected(self):
+        for raw_key in ['not-a-key', 'gg_deadbeef.secret']:
+            with self.assertRaises(exceptions.AuthenticationFailed):
+                APIKeyAuthentication().authenticate_key(raw_key)
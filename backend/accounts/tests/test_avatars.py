@@ -0,0 +1,167 @@
+import shutil
+import tempfile
+from importlib import import_module
+from io import BytesIO, StringIO
+from unittest import mock
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework.test import APIClient
+from accounts.avatars import process_pending_avatars, render_variants
+from accounts.models import UserProfile
+
+User = get_user_model()
+
+
+def image_upload(size=(400, 300), name='me.png'):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class AvatarTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='tenant@example.com')
+        UserProfile.objects.create(user=cls.user, user_type='tenant')
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, upload):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.patch(reverse('my-profile'), {'avatar': upload}, format='multipart')
+
+    def process(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('process_avatars', once=True, stdout=StringIO())
+
+    def test_upload_is_deferred_to_the_worker(self):
+        response = self.upload(image_upload())
+
+        self.assertEqual(response.status_code, 200)
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertTrue(profile.avatar_pending)
+        self.assertFalse(profile.avatar_48)
+        # The original is served until the variants exist
+        urls = self.client.get(reverse('my-profile')).data['avatar_urls']
+        self.assertTrue(urls['48'].endswith(profile.avatar.url))
+
+    def test_worker_renders_square_webp_variants(self):
+        self.upload(image_upload())
+
+        self.process()
+
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertFalse(profile.avatar_pending)
+        for size in (48, 128, 256):
+            with Image.open(getattr(profile, f'avatar_{size}').path) as variant:
+                self.assertEqual(variant.format, 'WEBP')
+                self.assertEqual(variant.size, (size, size))
+        # The cached profile payload picks up the new URLs
+        urls = self.client.get(reverse('my-profile')).data['avatar_urls']
+        self.assertTrue(urls['128'].endswith('_128.webp'))
+
+    def test_new_upload_replaces_old_variants(self):
+        self.upload(image_upload())
+        self.process()
+        old_variant = UserProfile.objects.get(user=self.user).avatar_48
+
+        self.upload(image_upload(name='new.png'))
+
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertTrue(profile.avatar_pending)
+        self.assertFalse(profile.avatar_48)
+        self.assertFalse(old_variant.storage.exists(old_variant.name))
+
+    def test_unreadable_avatar_is_not_retried(self):
+        profile = UserProfile.objects.get(user=self.user)
+        profile.avatar.save('broken.png', SimpleUploadedFile('broken.png', b'not an image'), save=False)
+        profile.avatar_pending = True
+        profile.save()
+
+        self.process()
+
+        profile.refresh_from_db()
+        self.assertFalse(profile.avatar_pending)
+        self.assertFalse(profile.avatar_48)
+
+    def test_avatars_are_rendered_outside_the_claiming_transaction(self):
+        self.upload(image_upload())
+        pending_while_rendering = []
+
+        def render(image_file):
+            pending_while_rendering.append(UserProfile.objects.get(user=self.user).avatar_pending)
+            return render_variants(image_file)
+
+        with mock.patch('accounts.avatars.render_variants', side_effect=render):
+            self.process()
+
+        self.assertEqual(pending_while_rendering, [False])
+        self.assertTrue(UserProfile.objects.get(user=self.user).avatar_48)
+
+    def test_avatar_replaced_while_rendering_is_not_overwritten(self):
+        self.upload(image_upload())
+
+        def render(image_file):
+            # Another request uploads a new avatar meanwhile
+            self.upload(image_upload(name='new.png'))
+            return render_variants(image_file)
+
+        with mock.patch('accounts.avatars.render_variants', side_effect=render):
+            process_pending_avatars()
+
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertTrue(profile.avatar_pending)
+        self.assertFalse(profile.avatar_48)
+        self.process()
+        profile.refresh_from_db()
+        self.assertTrue(profile.avatar_48.name.startswith('avatars/variants/new'))
+
+    def test_existing_avatars_are_flagged_for_processing(self):
+        profile = UserProfile.objects.get(user=self.user)
+        profile.avatar.save('old.png', image_upload(), save=False)
+        profile.save()
+        other = User.objects.create_user(email='other@example.com')
+        UserProfile.objects.create(user=other, user_type='tenant')
+        backfill = import_module('accounts.migrations.0009_backfill_avatar_pending')
+
+        backfill.flag_existing_avatars(apps, None)
+
+        pending = set(UserProfile.objects.filter(avatar_pending=True).values_list('user_id', flat=True))
+        self.assertEqual(pending, {self.user.pk})
+        self.process()
+        self.assertTrue(UserProfile.objects.get(user=self.user).avatar_48)
+
+    def test_messages_link_the_small_variant(self):
+        from messaging.models import Conversation, Message
+        from messaging.serializers import MessageSerializer
+        from rooms.models import Property
+
+        self.upload(image_upload())
+        self.process()
+        landlord = User.objects.create_user(email='landlord@example.com')
+        UserProfile.objects.create(user=landlord, user_type='landlord')
+        property_obj = Property.objects.create(
+            landlord=landlord, title='Flat', location='Lagos', address='1 Road',
+            price=1000, area_sqft=500, description='A flat'
+        )
+        conversation = Conversation.objects.create(landlord=landlord, tenant=self.user, property=property_obj)
+        message = Message.objects.create(conversation=conversation, sender=self.user, content='Hi')
+        message = Message.objects.select_related('sender__profile').get(pk=message.pk)
+
+        data = MessageSerializer(message).data
+
+        self.assertTrue(data['sender_avatar'].endswith('_48.webp'))
@@ -0,0 +1,37 @@
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from accounts.models import EmailVerificationToken
+
+User = get_user_model()
+
+
+class CleanupTokensTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(email='tenant@example.com')
+        old = timezone.now() - timezone.timedelta(hours=25)
+        expired = [EmailVerificationToken.objects.create(user=user) for _ in range(3)]
+        EmailVerificationToken.objects.filter(pk__in=[t.pk for t in expired]).update(created_at=old)
+        EmailVerificationToken.objects.create(user=user, is_used=True)
+        cls.valid = EmailVerificationToken.objects.create(user=user)
+
+    def cleanup(self, *args):
+        out = StringIO()
+        call_command('cleanup_tokens', *args, stdout=out)
+        return out.getvalue()
+
+    def test_deletes_expired_and_used_tokens_in_batches(self):
+        output = self.cleanup('--batch-size', '2')
+
+        self.assertEqual(list(EmailVerificationToken.objects.all()), [self.valid])
+        self.assertIn('Deleted 2 expired tokens so far', output)
+        self.assertIn('Successfully deleted 4 expired or used tokens', output)
+
+    def test_dry_run_deletes_nothing(self):
+        output = self.cleanup('--dry-run')
+
+        self.assertEqual(EmailVerificationToken.objects.count(), 5)
+        self.assertIn('Would delete 3 expired and 1 used tokens', output)
@@ -0,0 +1,95 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from accounts.models import UserProfile
+from rooms.models import LandlordReview, Property
+
+User = get_user_model()
+
+
+class LandlordListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.landlords = []
+        for i, location in enumerate(['Lagos', 'Abuja', 'Lagos Island']):
+            user = User.objects.create_user(email=f'landlord{i}@example.com')
+            UserProfile.objects.create(user=user, user_type='landlord', location=location)
+            cls.landlords.append(user)
+        tenants = []
+        for i in range(2):
+            user = User.objects.create_user(email=f'tenant{i}@example.com')
+            UserProfile.objects.create(user=user, user_type='tenant')
+            tenants.append(user)
+
+        for _ in range(3):
+            cls.add_property(cls.landlords[0])
+        cls.add_property(cls.landlords[1])
+
+        LandlordReview.objects.create(landlord=cls.landlords[0], tenant=tenants[0], rating=2)
+        LandlordReview.objects.create(landlord=cls.landlords[0], tenant=tenants[1], rating=4)
+        LandlordReview.objects.create(landlord=cls.landlords[1], tenant=tenants[0], rating=5)
+
+    @classmethod
+    def add_property(cls, landlord):
+        return Property.objects.create(
+            landlord=landlord, title='Flat', location='Lagos', address='1 Road',
+            price=1000, area_sqft=500, description='A flat'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def get(self, **params):
+        response = self.client.get(reverse('landlord-list'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_stats_are_annotated(self):
+        data = self.get(ordering='-properties')
+
+        self.assertEqual(data['count'], 3)
+        first = data['results'][0]
+        self.assertEqual(first['email'], 'landlord0@example.com')
+        self.assertEqual(first['total_properties'], 3)
+        self.assertEqual(first['average_rating'], 3.0)
+        self.assertEqual(first['review_count'], 2)
+        last = data['results'][-1]
+        self.assertEqual(last['total_properties'], 0)
+        self.assertIsNone(last['average_rating'])
+        self.assertEqual(last['review_count'], 0)
+
+    def test_rating_ordering_puts_unrated_last(self):
+        data = self.get(ordering='-rating')
+
+        emails = [row['email'] for row in data['results']]
+        self.assertEqual(emails, ['landlord1@example.com', 'landlord0@example.com', 'landlord2@example.com'])
+
+    def test_location_filter(self):
+        data = self.get(location='lagos')
+
+        self.assertEqual(
+            {row['email'] for row in data['results']},
+            {'landlord0@example.com', 'landlord2@example.com'}
+        )
+
+    def test_pagination(self):
+        data = self.get(page_size=2, ordering='-properties')
+
+        self.assertEqual(len(data['results']), 2)
+        self.assertIsNotNone(data['next'])
+
+    def test_page_query_count_does_not_grow_with_landlords(self):
+        for i in range(10):
+            user = User.objects.create_user(email=f'extra{i}@example.com')
+            UserProfile.objects.create(user=user, user_type='landlord')
+            self.add_property(user)
+
+        # COUNT for the paginator, the page's stats, then the uncached profiles
+        with self.assertNumQueries(3):
+            self.get(ordering='-rating')
+        # Profiles are cached from then on
+        with self.assertNumQueries(2):
+            self.get(ordering='-rating')
@@ -0,0 +1,52 @@
+from io import StringIO
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from accounts.models import OutboundEmail
+from accounts.outbox import enqueue_email
+
+
+class FailingBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionError('SMTP relay unavailable')
+
+
+@override_settings(EMAIL_USE_OUTBOX=True, EMAIL_VERIFICATION_ENABLED=True)
+class EmailOutboxTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def drain(self):
+        call_command('send_queued_email', once=True, stdout=StringIO())
+
+    def test_worker_sends_queued_emails(self):
+        enqueue_email('Hello', 'Plain body', ['a@example.com', 'b@example.com'], html_message='<p>Hi</p>')
+
+        self.drain()
+
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ['a@example.com', 'b@example.com'])
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+        self.assertFalse(OutboundEmail.objects.exclude(status='sent').exists())
+
+    @override_settings(EMAIL_BACKEND='accounts.tests.test_outbox.FailingBackend')
+    def test_failed_sends_are_retried_with_backoff(self):
+        enqueue_email('Hello', 'Plain body', ['a@example.com'])
+
+        self.drain()
+
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.status, 'pending')
+        self.assertEqual(email.attempts, 1)
+        self.assertIn('SMTP relay unavailable', email.last_error)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+
+    @override_settings(EMAIL_BACKEND='accounts.tests.test_outbox.FailingBackend')
+    def test_gives_up_after_max_attempts(self):
+        enqueue_email('Hello', 'Plain body', ['a@example.com'])
+
+        call_command('send_queued_email', once=True, max_attempts=1, stdout=StringIO())
+
+        self.assertEqual(OutboundEmail.objects.get().status, 'failed')
@@ -0,0 +1,72 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from accounts.models import UserProfile
+
+User = get_user_model()
+
+
+class ProfileCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='landlord@example.com', first_name='Ada')
+        cls.profile = UserProfile.objects.create(user=cls.user, user_type='landlord', bio='Hello')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = reverse('profile-detail', kwargs={'user_id': self.user.pk})
+
+    def test_public_profile_is_served_from_cache(self):
+        self.assertEqual(self.client.get(self.url).data['bio'], 'Hello')
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['email'], 'landlord@example.com')
+
+    @override_settings(ALLOWED_HOSTS=['one.example', 'two.example'])
+    def test_avatar_urls_are_absolute_for_each_request(self):
+        self.profile.avatar = 'avatars/me.png'
+        self.profile.save()
+        self.client.get(self.url, HTTP_HOST='one.example')
+
+        response = self.client.get(self.url, HTTP_HOST='two.example', secure=True)
+
+        self.assertEqual(response.data['avatar'], 'https://two.example/media/avatars/me.png')
+        self.assertEqual(response.data['avatar_urls']['48'], 'https://two.example/media/avatars/me.png')
+
+    def test_missing_profile_is_404(self):
+        response = self.client.get(reverse('profile-detail', kwargs={'user_id': self.user.pk + 1000}))
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_profile_save_invalidates_after_commit(self):
+        self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.bio = 'Updated'
+            self.profile.save()
+
+        self.assertEqual(self.client.get(self.url).data['bio'], 'Updated')
+
+    def test_profile_update_through_api_invalidates_my_profile(self):
+        self.client.force_authenticate(self.user)
+        self.client.get(reverse('my-profile'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(reverse('my-profile'), {'first_name': 'Adaeze'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.client.get(reverse('my-profile')).data['first_name'], 'Adaeze')
+
+    def test_login_does_not_invalidate(self):
+        self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.user.save(update_fields=['last_login'])
+
+        self.assertEqual(callbacks, [])
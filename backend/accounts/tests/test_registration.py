@@ -0,0 +1,65 @@
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from accounts.models import OutboundEmail, UserProfile
+from accounts.serializers import RegisterSerializer
+
+User = get_user_model()
+
+
+@override_settings(EMAIL_VERIFICATION_ENABLED=True, EMAIL_USE_OUTBOX=True)
+class RegistrationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def payload(self, **overrides):
+        data = {
+            'email': 'new@example.com',
+            'password': 'Str0ng-password!',
+            'password2': 'Str0ng-password!',
+            'first_name': 'New',
+            'last_name': 'Landlord',
+            'user_type': 'landlord',
+            'landlord': {'property_name': 'Homes Ltd', 'years_experience': 2},
+        }
+        data.update(overrides)
+        return data
+
+    def test_password_is_hashed_once(self):
+        with mock.patch('django.contrib.auth.base_user.make_password', wraps=make_password) as hasher:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('register'), self.payload(), format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(hasher.call_count, 1)
+        user = User.objects.get(email='new@example.com')
+        self.assertTrue(user.check_password('Str0ng-password!'))
+        self.assertFalse(user.is_active)
+
+    def test_verification_email_is_sent_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = self.client.post(reverse('register'), self.payload(), format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(OutboundEmail.objects.exists())
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(len(mail.outbox), 0)
+        queued = OutboundEmail.objects.get()
+        self.assertEqual(queued.to, 'new@example.com')
+        self.assertIn('/api/accounts/verify-email/', queued.html_body)
+
+    def test_profile_failure_rolls_back_user(self):
+        serializer = RegisterSerializer(data=self.payload(landlord={'no_such_field': 'x'}))
+        self.assertTrue(serializer.is_valid())
+
+        with self.assertRaises(TypeError):
+            serializer.save()
+
+        self.assertFalse(User.objects.filter(email='new@example.com').exists())
+        self.assertFalse(UserProfile.objects.exists())
@@ -0,0 +1,65 @@
+import re
+import time
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from accounts.email_utils import send_verification_email
+from accounts.models import EmailVerificationToken, OutboundEmail, UserProfile
+from accounts.tokens import make_verification_token
+
+User = get_user_model()
+
+
+@override_settings(EMAIL_VERIFICATION_STATELESS=True, EMAIL_USE_OUTBOX=True)
+class SignedVerificationTokenTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='tenant@example.com', is_active=False)
+        UserProfile.objects.create(user=self.user, user_type='tenant')
+        self.client = APIClient()
+
+    def verify(self, token):
+        return self.client.post(f'/api/accounts/verify-email/signed/{token}/')
+
+    def test_issuing_a_token_writes_no_token_rows(self):
+        send_verification_email(self.user)
+
+        self.assertFalse(EmailVerificationToken.objects.exists())
+        link = re.search(r'/api/accounts/verify-email/signed/[^/"]+/', OutboundEmail.objects.get().body)
+        self.assertIsNotNone(link)
+
+    def test_valid_token_verifies_the_user(self):
+        response = self.verify(make_verification_token(self.user))
+
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_active)
+        self.assertTrue(self.user.profile.email_verified)
+
+    def test_token_cannot_be_reused_after_verification(self):
+        token = make_verification_token(self.user)
+        self.verify(token)
+
+        response = self.verify(token)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Invalid verification token')
+
+    def test_tampered_token_is_rejected(self):
+        token = make_verification_token(self.user)
+
+        response = self.verify(token[:-2] + ('aa' if not token.endswith('aa') else 'bb'))
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_expired_token_is_rejected(self):
+        token = make_verification_token(self.user)
+        later = time.time() + EmailVerificationToken.VALIDITY_PERIOD.total_seconds() + 60
+
+        with mock.patch('django.core.signing.time.time', return_value=later):
+            response = self.verify(token)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('expired', response.data['error'])
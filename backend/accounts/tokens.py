@@ -0,0 +1,45 @@
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.utils.crypto import constant_time_compare, salted_hmac
+from .models import EmailVerificationToken
+
+User = get_user_model()
+
+SIGNING_SALT = 'accounts.email-verification'
+
+def user_state_hash(user):
+    """
+    Hash of the user fields that change once the email is verified (or the
+    account is otherwise modified), so a signed link stops working after use.
+    """
+    state = f"{user.pk}{user.email}{user.password}{user.is_active}{user.profile.email_verified}"
+    return salted_hmac(SIGNING_SALT, state, algorithm='sha256').hexdigest()[:20]
+
+def make_verification_token(user):
+    """
+    Create a signed, timestamped verification token for the user.
+    Issuing a token writes nothing to the database.
+    """
+    signer = signing.TimestampSigner(salt=SIGNING_SALT)
+    return signer.sign_object({'u': user.pk, 's': user_state_hash(user)})
+
+def get_user_for_token(token):
+    """
+    Return the user a signed verification token was issued to.
+
+    The signature and age are checked without touching the database; the user
+    is then loaded once to confirm the token matches their current state.
+
+    Raises:
+        signing.SignatureExpired: If the token is older than the validity period
+        signing.BadSignature: If the token is invalid or no longer matches the user
+    """
+    signer = signing.TimestampSigner(salt=SIGNING_SALT)
+    data = signer.unsign_object(token, max_age=EmailVerificationToken.VALIDITY_PERIOD)
+    try:
+        user = User.objects.select_related('profile').get(pk=data['u'])
+    except User.DoesNotExist:
+        raise signing.BadSignature('Unknown user')
+    if not constant_time_compare(data['s'], user_state_hash(user)):
+        raise signing.BadSignature('Token no longer matches the user')
+    return user
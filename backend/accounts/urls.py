@@ -17,12 +17,17 @@ urlpatterns = [
     
     # Profile endpoints
     path('profile/', views.MyProfileView.as_view(), name='my-profile'),
-    path('profile/<str:username>/', views.ProfileDetailView.as_view(), name='profile-detail'),
+    path('profile/<int:user_id>/', views.ProfileDetailView.as_view(), name='profile-detail'),
     
     # Email Verification
     path('verify-email/<uuid:token>/', csrf_exempt(views.EmailVerificationView.as_view()), name='verify-email'),
+    path('verify-email/signed/<str:token>/', csrf_exempt(views.EmailVerificationView.as_view()), name='verify-email-signed'),
     path('resend-verification-email/', csrf_exempt(views.ResendVerificationEmailView.as_view()), name='resend-verification-email'),
     
+    # API keys for machine clients
+    path('api-keys/', views.APIKeyListCreateView.as_view(), name='api-key-list-create'),
+    path('api-keys/<int:pk>/', views.APIKeyRevokeView.as_view(), name='api-key-revoke'),
+    
     # Public endpoints
     path('landlords/', views.LandlordListView.as_view(), name='landlord-list'),
     
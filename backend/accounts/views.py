@@ -1,18 +1,33 @@
 import logging
+import uuid
+from functools import partial
 from rest_framework import generics, permissions, status, throttling
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.contrib.auth import authenticate, get_user_model
+from django.core import signing
+from django.db import transaction
+from django.db.models import Avg, Count, F, FloatField, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.conf import settings
-from django.http import HttpResponse, JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse
 from django.urls import reverse
 from django.utils import timezone
-from .serializers import RegisterSerializer, UserProfileSerializer, ProfileDetailSerializer, ProfileUpdateSerializer
-from .models import UserProfile, EmailVerificationToken, User
+from .serializers import (
+    RegisterSerializer, UserProfileSerializer, ProfileDetailSerializer, ProfileUpdateSerializer,
+    APIKeySerializer
+)
+from .models import APIKey, UserProfile, EmailVerificationToken, User
+from .authentication import APIKeyAuthentication
 from .email_utils import send_verification_email
+from .profile_cache import get_cached_profiles, get_cached_profile, get_user_type
+from .tokens import get_user_for_token
+from core.ratelimit import SlidingWindowRateLimiter
+from rooms.models import LandlordReview, Property
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -25,12 +40,12 @@ class RegisterView(generics.CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        # The serializer handles user and profile creation
+        # The serializer creates the user and profile in one transaction
         user = serializer.save()
         
-        # Send verification email if enabled
+        # Send verification email if enabled, once the signup is committed
         if settings.EMAIL_VERIFICATION_ENABLED:
-            send_verification_email(user)
+            transaction.on_commit(partial(send_verification_email, user), robust=True)
         
         # Get the user's profile
         profile = user.profile
@@ -60,6 +75,7 @@ class RegisterView(generics.CreateAPIView):
 @method_decorator(csrf_exempt, name='dispatch')
 class LoginView(APIView):
     permission_classes = [permissions.AllowAny]
+    rate_limit_scope = 'login'
     
     def post(self, request):
         email = request.data.get('email')
@@ -124,10 +140,11 @@ class ProfileDetailView(generics.RetrieveAPIView):
     serializer_class = ProfileDetailSerializer
     permission_classes = [permissions.AllowAny]
     
-    def get_object(self):
-        user_id = self.kwargs.get('user_id')
-        user = get_object_or_404(User, id=user_id)
-        return get_object_or_404(UserProfile, user=user)
+    def retrieve(self, request, *args, **kwargs):
+        data = get_cached_profile(self.kwargs['user_id'], request)
+        if data is None:
+            raise Http404('No profile found for this user.')
+        return Response(data)
 
 @method_decorator(csrf_exempt, name='dispatch')
 class MyProfileView(generics.RetrieveUpdateAPIView):
@@ -143,6 +160,12 @@ class MyProfileView(generics.RetrieveUpdateAPIView):
     
     def get_object(self):
         return get_object_or_404(UserProfile, user=self.request.user)
+    
+    def retrieve(self, request, *args, **kwargs):
+        data = get_cached_profile(request.user.pk, request)
+        if data is None:
+            raise Http404('No profile found for this user.')
+        return Response(data)
 
 logger = logging.getLogger(__name__)
 @method_decorator(csrf_exempt, name='dispatch')
@@ -153,11 +176,33 @@ class EmailVerificationView(APIView):
     permission_classes = [permissions.AllowAny]
     throttle_classes = [throttling.AnonRateThrottle]  # You can replace with custom throttle
 
-    def verify_token(self, token_obj):
+    def resolve_token(self, token):
+        """
+        Look up the user for a verification token.
+
+        Stored tokens arrive as UUIDs; signed tokens (EMAIL_VERIFICATION_STATELESS)
+        arrive as strings and are checked without a token table lookup.
+
+        Returns:
+            tuple: (user, token_obj, expired) - token_obj is None for signed tokens
+
+        Raises:
+            EmailVerificationToken.DoesNotExist: If the token is invalid
+        """
+        if isinstance(token, uuid.UUID):
+            token_obj = EmailVerificationToken.objects.select_related('user').get(token=token, is_used=False)
+            return token_obj.user, token_obj, not token_obj.is_valid()
+        try:
+            return get_user_for_token(token), None, False
+        except signing.SignatureExpired:
+            return None, None, True
+        except signing.BadSignature:
+            raise EmailVerificationToken.DoesNotExist
+
+    def verify_token(self, user, token_obj=None):
         """
         Helper function to perform the actual verification logic
         """
-        user = token_obj.user
         profile = user.profile
 
         if not profile.email_verified:
@@ -169,8 +214,9 @@ class EmailVerificationView(APIView):
             user.is_active = True
             user.save()
 
-        token_obj.is_used = True
-        token_obj.save()
+        if token_obj is not None:
+            token_obj.is_used = True
+            token_obj.save()
 
         return user
 
@@ -179,15 +225,15 @@ class EmailVerificationView(APIView):
         Verify email via browser link (renders HTML response)
         """
         try:
-            token_obj = EmailVerificationToken.objects.get(token=token, is_used=False)
+            user, token_obj, expired = self.resolve_token(token)
 
-            if not token_obj.is_valid():
+            if expired:
                 logger.warning(f"Expired token attempt: {token}")
                 return render(request, 'verification/error.html', 
                            {'error': 'expired'}, 
                            status=400)
 
-            user = self.verify_token(token_obj)
+            user = self.verify_token(user, token_obj)
             return render(request, 'verification/success.html', 
                         {'user': user, 'token': token})
 
@@ -202,16 +248,16 @@ class EmailVerificationView(APIView):
         API endpoint for email verification (programmatic)
         """
         try:
-            token_obj = EmailVerificationToken.objects.get(token=token, is_used=False)
+            user, token_obj, expired = self.resolve_token(token)
 
-            if not token_obj.is_valid():
+            if expired:
                 logger.warning(f"Expired token attempt (POST): {token}")
                 return Response(
                     {'error': 'Verification link has expired. Please request a new one.'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            self.verify_token(token_obj)
+            self.verify_token(user, token_obj)
             return Response({'message': 'Email verified successfully'}, status=status.HTTP_200_OK)
 
         except EmailVerificationToken.DoesNotExist:
@@ -243,6 +289,13 @@ class ResendVerificationEmailView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        # Check rate limiting (prevent abuse) before touching the database
+        if not SlidingWindowRateLimiter.for_scope('resend_verification').hit(email.lower()):
+            return Response(
+                {'error': 'Verification email was recently sent. Please wait before requesting another.'},
+                status=status.HTTP_429_TOO_MANY_REQUESTS
+            )
+        
         try:
             user = User.objects.get(email=email)
             profile = user.profile
@@ -253,18 +306,6 @@ class ResendVerificationEmailView(APIView):
                     status=status.HTTP_200_OK
                 )
                 
-            # Check rate limiting (prevent abuse)
-            last_sent = EmailVerificationToken.objects.filter(
-                user=user,
-                created_at__gt=timezone.now() - timezone.timedelta(minutes=5)
-            ).exists()
-            
-            if last_sent:
-                return Response(
-                    {'error': 'Verification email was recently sent. Please wait before requesting another.'},
-                    status=status.HTTP_429_TOO_MANY_REQUESTS
-                )
-            
             # Send verification email
             send_verification_email(user)
             
@@ -285,11 +326,117 @@ class ResendVerificationEmailView(APIView):
                 status=status.HTTP_200_OK
             )
 
+class LandlordPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+def _per_landlord(queryset, aggregate, output_field):
+    """Correlated subquery computing ``aggregate`` for the outer profile's user."""
+    return Subquery(
+        queryset.filter(landlord=OuterRef('user'))
+        .order_by()
+        .values('landlord')
+        .annotate(value=aggregate)
+        .values('value'),
+        output_field=output_field,
+    )
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class LandlordListView(generics.ListAPIView):
-    """List all landlords with their profiles and stats"""
+    """
+    List landlords with their profiles and stats, a page at a time.
+
+    Property count, average rating and review count are annotated on the
+    queryset, so each page is a single query (plus the paginator's count).
+    The profile part of each card comes from the profile cache.
+    Supports ?location=, and ?ordering= with one of ORDERINGS.
+    """
     serializer_class = ProfileDetailSerializer
     permission_classes = [permissions.AllowAny]
-    
+    pagination_class = LandlordPagination
+
+    ORDERINGS = {
+        'rating': F('average_rating').asc(nulls_last=True),
+        '-rating': F('average_rating').desc(nulls_last=True),
+        'properties': F('total_properties').asc(),
+        '-properties': F('total_properties').desc(),
+        'reviews': F('review_count').asc(),
+        '-reviews': F('review_count').desc(),
+        'newest': F('created_at').desc(),
+    }
+
+    def get_queryset(self):
+        queryset = UserProfile.objects.filter(user_type='landlord').select_related('user').annotate(
+            total_properties=Coalesce(
+                _per_landlord(Property.objects.all(), Count('pk'), IntegerField()), 0
+            ),
+            average_rating=_per_landlord(LandlordReview.objects.all(), Avg('rating'), FloatField()),
+            review_count=Coalesce(
+                _per_landlord(LandlordReview.objects.all(), Count('pk'), IntegerField()), 0
+            ),
+        )
+
+        location = self.request.query_params.get('location')
+        if location:
+            queryset = queryset.filter(location__icontains=location)
+
+        ordering = self.ORDERINGS.get(self.request.query_params.get('ordering'), F('created_at').desc())
+        # pk as a tie-breaker keeps pages stable
+        return queryset.order_by(ordering, 'pk')
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(
+            self.get_queryset().values('user_id', 'total_properties', 'average_rating', 'review_count')
+        )
+        profiles = get_cached_profiles([row['user_id'] for row in page], request)
+        data = [
+            {
+                **profiles[row['user_id']],
+                'total_properties': row['total_properties'],
+                'average_rating': row['average_rating'],
+                'review_count': row['review_count'],
+            }
+            for row in page
+        ]
+        return self.get_paginated_response(data)
+
+
+class IsLandlord(permissions.BasePermission):
+    """Only allow users with a landlord profile."""
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and get_user_type(request.user.pk) == 'landlord'
+
+@method_decorator(csrf_exempt, name='dispatch')
+class APIKeyListCreateView(generics.ListCreateAPIView):
+    """
+    List the landlord's API keys or create a new one.
+    The raw key is only returned in the create response.
+    """
+    serializer_class = APIKeySerializer
+    permission_classes = [permissions.IsAuthenticated, IsLandlord]
+
+    def get_queryset(self):
+        return APIKey.objects.filter(user=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        api_key, raw_key = APIKey.generate(request.user, serializer.validated_data['name'])
+        data = self.get_serializer(api_key).data
+        data['key'] = raw_key
+        return Response(data, status=status.HTTP_201_CREATED)
+
+@method_decorator(csrf_exempt, name='dispatch')
+class APIKeyRevokeView(generics.DestroyAPIView):
+    """Revoke one of the landlord's API keys."""
+    permission_classes = [permissions.IsAuthenticated, IsLandlord]
+
     def get_queryset(self):
-        return UserProfile.objects.filter(user_type='landlord').select_related('user')
+        return APIKey.objects.filter(user=self.request.user, revoked_at__isnull=True)
+
+    def perform_destroy(self, instance):
+        instance.revoke()
+        APIKeyAuthentication.forget(instance)
@@ -0,0 +1,452 @@
+"""
+Latency benchmark for the key user journeys, compared against a baseline.
+
+Each journey (browse and search, property detail, favorite, start a
+conversation, inbox, login) runs ``--iterations`` times from each of
+``--concurrency`` bench tenants. The runner reports p50/p95/p99 latency,
+throughput and database queries per request (from /metrics) per journey.
+
+By default it calls the WSGI app in-process (``--app asgi`` for the ASGI
+handler); ``--server gunicorn`` starts a local gunicorn instead and ``--url``
+targets a running server. Fixtures are created through the ORM,
+so the server must use the same database and SECRET_KEY as this script.
+Journeys write favorites, conversations and messages: use a disposable
+database, e.g. one filled by ``manage.py seed_synthetic``.
+
+    python benchmarks/journeys.py --iterations 50 --concurrency 8 --output base.json
+    python benchmarks/journeys.py --server gunicorn --workers 4 --baseline base.json \
+        --threshold p95=0.1 --threshold queries=0
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from stats import latency_summary
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+PASSWORD = 'Bench-password-123'
+
+# Relative limits for latency (slower by more than 20%, ...) and throughput
+# (lower by more than 15%). Queries per request is an absolute difference;
+# cold caches in new workers add a fraction of a query, an N+1 at least one.
+DEFAULT_THRESHOLDS = {'p50': 0.2, 'p95': 0.25, 'p99': 0.5, 'rps': 0.15, 'queries': 0.5}
+
+
+class Session:
+    """One bench tenant: its credentials, property sample and recorded requests."""
+
+    def __init__(self, transport, email, token, properties, seed):
+        self.transport = transport
+        self.email = email
+        self.token = token
+        self.properties = properties
+        self.rng = random.Random(seed)
+        self.results = []
+
+    def property(self):
+        return self.rng.choice(self.properties)
+
+    def call(self, method, path, data=None, authenticated=True):
+        start = time.perf_counter()
+        status = self.transport.request(method, path, data, self.token if authenticated else None)
+        self.results.append((status, time.perf_counter() - start))
+        return status
+
+
+def browse(session):
+    prop = session.property()
+    query = urllib.parse.urlencode({
+        'location': prop['location'], 'bedrooms': prop['bedrooms'], 'max_price': prop['price'],
+    })
+    session.call('GET', f'/api/rooms/properties/?{query}')
+    query = urllib.parse.urlencode({
+        'search': prop['title'].split()[-1], 'bedrooms': prop['bedrooms'], 'max_price': prop['price'],
+    })
+    session.call('GET', f'/api/rooms/properties/?{query}')
+
+
+def detail(session):
+    session.call('GET', f"/api/rooms/properties/{session.property()['id']}/")
+
+
+def favorite(session):
+    property_id = session.property()['id']
+    session.call('POST', '/api/rooms/favorites/', {'property': property_id})
+    session.call('DELETE', f'/api/rooms/favorites/{property_id}/')
+
+
+def start_conversation(session):
+    session.call('POST', '/api/messaging/start-conversation/', {
+        'property_id': session.property()['id'], 'message': 'Is this still available?',
+    })
+
+
+def inbox(session):
+    session.call('GET', '/api/messaging/conversations/')
+    session.call('GET', '/api/messaging/unread-count/')
+
+
+def login(session):
+    session.call('POST', '/api/accounts/login/', {'email': session.email, 'password': PASSWORD}, authenticated=False)
+
+
+JOURNEYS = {
+    'browse': browse,
+    'detail': detail,
+    'favorite': favorite,
+    'start_conversation': start_conversation,
+    'inbox': inbox,
+    'login': login,
+}
+
+
+class InProcessTransport:
+    """Calls the app through Django's test client, one client per thread."""
+
+    def __init__(self, app='wsgi'):
+        self.app = app
+        self.local = threading.local()
+
+    def client(self):
+        if not hasattr(self.local, 'client'):
+            from django.test import AsyncClient, Client
+            client_class = AsyncClient if self.app == 'asgi' else Client
+            self.local.client = client_class(raise_request_exception=False)
+        return self.local.client
+
+    def request(self, method, path, data=None, token=None, read=False):
+        headers = {'authorization': f'Bearer {token}'} if token else {}
+        body = json.dumps(data) if data is not None else ''
+        client = self.client()
+        if self.app == 'asgi':
+            from asgiref.sync import async_to_sync
+            response = async_to_sync(self.asgi_request)(client, method, path, body, headers)
+        else:
+            response = client.generic(method, path, body, 'application/json', headers=headers)
+        return response.content.decode() if read else response.status_code
+
+    @staticmethod
+    async def asgi_request(client, method, path, body, headers):
+        return await client.generic(method, path, body, 'application/json', headers=headers)
+
+
+class HTTPTransport:
+    """Calls a server over HTTP."""
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def request(self, method, path, data=None, token=None, read=False):
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        body = json.dumps(data).encode('utf-8') if data is not None else None
+        request = urllib.request.Request(self.base_url + path, data=body, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                content = response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            content = e.read()
+            status = e.code
+        except (urllib.error.URLError, TimeoutError):
+            return None if read else 'error'
+        return content.decode() if read else status
+
+
+class GunicornServer:
+    """A gunicorn on a free local port, with metrics shared across its workers."""
+
+    def __init__(self, app, workers, worker_class=None):
+        self.app = app
+        self.workers = workers
+        self.worker_class = worker_class
+
+    def __enter__(self):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        self.metrics_dir = tempfile.TemporaryDirectory(prefix='bench-metrics-')
+        command = [
+            sys.executable, '-m', 'gunicorn', f'HouseListing_Backend.{self.app}',
+            '--bind', f'127.0.0.1:{port}', '--workers', str(self.workers),
+        ]
+        if self.worker_class:
+            command += ['--worker-class', self.worker_class]
+        self.process = subprocess.Popen(
+            command, cwd=BACKEND_DIR, stdout=subprocess.DEVNULL,
+            env={**os.environ, 'PROMETHEUS_MULTIPROC_DIR': self.metrics_dir.name},
+        )
+        self.url = f'http://127.0.0.1:{port}'
+        transport = HTTPTransport(self.url, timeout=1)
+        deadline = time.monotonic() + 30
+        while transport.request('GET', '/metrics', token=os.environ.get('METRICS_TOKEN')) != 200:
+            if self.process.poll() is not None or time.monotonic() > deadline:
+                self.__exit__(None, None, None)
+                raise RuntimeError('gunicorn did not start')
+            time.sleep(0.2)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.process.terminate()
+        self.process.wait()
+        self.metrics_dir.cleanup()
+
+
+def query_totals(transport, metrics_token):
+    """Total queries and requests recorded by /metrics, or None without metrics."""
+    from prometheus_client.parser import text_string_to_metric_families
+
+    text = transport.request('GET', '/metrics', token=metrics_token, read=True)
+    if not text or not text.startswith('#'):
+        return None
+    queries = requests = 0
+    for family in text_string_to_metric_families(text):
+        if family.name != 'http_request_db_queries':
+            continue
+        for sample in family.samples:
+            if sample.labels.get('view') == 'metrics':
+                continue
+            if sample.name.endswith('_sum'):
+                queries += sample.value
+            elif sample.name.endswith('_count'):
+                requests += sample.value
+    return queries, requests
+
+
+def create_tenants(count):
+    """Active, verified bench tenants without favorites, with a JWT each."""
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from accounts.models import UserProfile
+    from rooms.models import Favorite
+
+    User = get_user_model()
+    password_hash = make_password(PASSWORD)
+    tenants = []
+    for n in range(count):
+        user, _ = User.objects.update_or_create(
+            email=f'bench-tenant{n}@benchmark.example',
+            defaults={'password': password_hash, 'is_active': True, 'first_name': 'Bench', 'last_name': f'Tenant {n}'},
+        )
+        UserProfile.objects.update_or_create(user=user, defaults={'user_type': 'tenant', 'email_verified': True})
+        tenants.append((user.email, str(RefreshToken.for_user(user).access_token)))
+    Favorite.objects.filter(tenant__email__endswith='@benchmark.example').delete()
+    return tenants
+
+
+def sample_properties(size, seed):
+    """``size`` random properties, sampled by id; creates some in an empty database."""
+    from django.contrib.auth import get_user_model
+    from django.db.models import Max, Min
+
+    from accounts.models import UserProfile
+    from rooms.models import Property
+
+    fields = ('id', 'title', 'location', 'bedrooms', 'price')
+    bounds = Property.objects.aggregate(low=Min('id'), high=Max('id'))
+    if bounds['low'] is None:
+        landlord, _ = get_user_model().objects.get_or_create(email='bench-landlord@benchmark.example')
+        UserProfile.objects.get_or_create(user=landlord, defaults={'user_type': 'landlord'})
+        Property.objects.bulk_create(
+            Property(
+                landlord=landlord, title=f'Bench flat {n}', location=['Lagos', 'Abuja', 'Ibadan'][n % 3],
+                address=f'{n} Bench Road', price=500 + 25 * n, bedrooms=n % 4 + 1, area_sqft=600,
+                description='Created by benchmarks/journeys.py',
+            )
+            for n in range(50)
+        )
+        return sample_properties(size, seed)
+
+    rng = random.Random(seed)
+    ids = range(bounds['low'], bounds['high'] + 1)
+    properties = list(Property.objects.filter(id__in=rng.sample(ids, min(size, len(ids)))).values(*fields))
+    if len(properties) < size:
+        properties += Property.objects.exclude(id__in=[p['id'] for p in properties]).values(*fields)[:size - len(properties)]
+    return [{**p, 'price': str(p['price'])} for p in properties]
+
+
+def run_journey(journey, sessions, iterations, warmup, pool, transport, metrics_token):
+    for session in sessions:
+        for _ in range(warmup):
+            journey(session)
+        session.results = []
+
+    def client(session):
+        for _ in range(iterations):
+            journey(session)
+
+    before = query_totals(transport, metrics_token)
+    start = time.perf_counter()
+    for future in [pool.submit(client, session) for session in sessions]:
+        future.result()
+    elapsed = time.perf_counter() - start
+    after = query_totals(transport, metrics_token)
+
+    results = [result for session in sessions for result in session.results]
+    latencies = [latency * 1000 for _, latency in results]
+    queries = None
+    if before and after and after[1] > before[1]:
+        queries = round((after[0] - before[0]) / (after[1] - before[1]), 2)
+    return {
+        'requests': len(results),
+        'elapsed_s': round(elapsed, 3),
+        'rps': round(len(results) / elapsed, 2),
+        'latency_ms': latency_summary(latencies),
+        'queries_per_request': queries,
+        'statuses': {str(k): v for k, v in Counter(status for status, _ in results).items()},
+    }
+
+
+def metric(result, name):
+    if name == 'rps':
+        return result['rps']
+    if name == 'queries':
+        return result['queries_per_request']
+    return result['latency_ms'][name]
+
+
+def compare(results, baseline, thresholds):
+    """
+    Compare each journey against the baseline.
+
+    Returns:
+        list: One entry per journey and metric, with ``regression`` set where
+        the change exceeds its threshold
+    """
+    comparison = []
+    for name, current in results['journeys'].items():
+        previous = baseline['journeys'].get(name)
+        if previous is None:
+            continue
+        for key, limit in thresholds.items():
+            old, new = metric(previous, key), metric(current, key)
+            if old is None or new is None:
+                continue
+            if key == 'queries':
+                regression = new > old + limit
+            elif key == 'rps':
+                regression = new < old * (1 - limit)
+            else:
+                regression = new > old * (1 + limit)
+            change = round((new - old) / old, 3) if old else None
+            comparison.append({
+                'journey': name, 'metric': key, 'baseline': old, 'current': new,
+                'change': change, 'regression': regression,
+            })
+    return comparison
+
+
+def parse_threshold(value):
+    key, _, limit = value.partition('=')
+    if key not in DEFAULT_THRESHOLDS:
+        raise argparse.ArgumentTypeError(f"unknown metric '{key}', expected one of {', '.join(DEFAULT_THRESHOLDS)}")
+    try:
+        return key, float(limit)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{value}' is not <metric>=<number>")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--url', help='Base URL of a running server (default: call the app in-process)')
+    target.add_argument('--server', choices=['gunicorn'], help='Start a local server to benchmark')
+    parser.add_argument('--app', choices=['wsgi', 'asgi'], default='wsgi', help='Application to serve (default: wsgi)')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn workers (default: 4)')
+    parser.add_argument('--worker-class', help='gunicorn worker class; --app asgi needs an ASGI one, '
+                                               'e.g. uvicorn.workers.UvicornWorker')
+    parser.add_argument('--journey', action='append', dest='journeys', choices=list(JOURNEYS),
+                        help='Journey to run; repeat for several (default: all)')
+    parser.add_argument('--iterations', type=int, default=20, help='Journeys per client (default: 20)')
+    parser.add_argument('--warmup', type=int, default=2, help='Unmeasured journeys per client (default: 2)')
+    parser.add_argument('--concurrency', type=int, default=4, help='Parallel clients (default: 4)')
+    parser.add_argument('--properties', type=int, default=200, help='Properties sampled per run (default: 200)')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed for the samples (default: 1)')
+    parser.add_argument('--metrics-token', default=os.environ.get('METRICS_TOKEN'),
+                        help='Bearer token for /metrics (default: $METRICS_TOKEN)')
+    parser.add_argument('--output', help='Write the results to this JSON file, e.g. to use as a baseline')
+    parser.add_argument('--baseline', help='Compare against results saved with --output')
+    parser.add_argument('--threshold', action='append', type=parse_threshold, default=[],
+                        help='Allowed change as <metric>=<limit>, metric one of p50, p95, p99, rps (relative, '
+                             f'0.2 = 20%%) or queries (per request); repeat for several (default: {DEFAULT_THRESHOLDS})')
+    args = parser.parse_args(argv)
+    if args.server and args.app == 'asgi' and not args.worker_class:
+        parser.error('--server gunicorn --app asgi needs an ASGI --worker-class')
+
+    # The journeys log in and send messages far faster than the default limits
+    os.environ.setdefault('RATE_LIMIT_LOGIN', '1000000/min')
+    os.environ.setdefault('RATE_LIMIT_MESSAGE_SEND', '1000000/min')
+    os.environ.setdefault('ALLOWED_HOSTS', '127.0.0.1')
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'HouseListing_Backend.settings')
+    sys.path.insert(0, str(BACKEND_DIR))
+    import django
+    django.setup()
+    if not (args.server or args.url):
+        # Host of the test client's requests
+        from django.conf import settings
+        settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+
+    tenants = create_tenants(args.concurrency)
+    properties = sample_properties(args.properties, args.seed)
+    thresholds = {**DEFAULT_THRESHOLDS, **dict(args.threshold)}
+
+    server = GunicornServer(args.app, args.workers, args.worker_class) if args.server else None
+    if server:
+        server.__enter__()
+    try:
+        if server or args.url:
+            transport = HTTPTransport(server.url if server else args.url)
+        else:
+            transport = InProcessTransport(args.app)
+        sessions = [
+            Session(transport, email, token, properties, args.seed + n) for n, (email, token) in enumerate(tenants)
+        ]
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            journeys = {
+                name: run_journey(JOURNEYS[name], sessions, args.iterations, args.warmup, pool, transport,
+                                  args.metrics_token)
+                for name in args.journeys or JOURNEYS
+            }
+    finally:
+        if server:
+            server.__exit__(None, None, None)
+
+    results = {
+        'target': args.url or f"{args.server or 'in-process'} {args.app}",
+        'concurrency': args.concurrency,
+        'iterations': args.iterations,
+        'journeys': journeys,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + '\n')
+    failed = any(
+        not str(status).startswith(('2', '3')) for journey in journeys.values() for status in journey['statuses']
+    )
+    if args.baseline:
+        results['thresholds'] = thresholds
+        results['comparison'] = compare(results, json.loads(Path(args.baseline).read_text()), thresholds)
+        failed = failed or any(entry['regression'] for entry in results['comparison'])
+    json.dump(results, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
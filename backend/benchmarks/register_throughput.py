@@ -0,0 +1,102 @@
+"""
+Throughput benchmark for /api/accounts/register/ under concurrent signups.
+
+Run it against a running server (ideally with production settings and the
+real password hasher, since hashing dominates signup cost):
+
+    python benchmarks/register_throughput.py --url http://localhost:8000 \
+        --requests 500 --concurrency 16
+
+Every request registers a fresh landlord, so point it at a disposable
+database.
+"""
+import argparse
+import json
+import sys
+import time
+import uuid
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from stats import latency_summary
+
+REGISTER_PATH = '/api/accounts/register/'
+
+
+def signup_payload(run_id, n):
+    return {
+        'email': f'bench-{run_id}-{n}@example.com',
+        'password': 'Bench-password-123',
+        'password2': 'Bench-password-123',
+        'first_name': 'Bench',
+        'last_name': f'User {n}',
+        'user_type': 'landlord',
+        'landlord': {
+            'property_name': 'Bench Properties',
+            'years_experience': 1,
+        },
+    }
+
+
+def register(url, payload, timeout):
+    body = json.dumps(payload).encode('utf-8')
+    request = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except (urllib.error.URLError, TimeoutError):
+        status = 'error'
+    return status, time.perf_counter() - start
+
+
+def run(base_url, total, concurrency, timeout=30):
+    """
+    Register ``total`` users with ``concurrency`` parallel clients.
+
+    Returns:
+        dict: Throughput, latency percentiles (ms) and a count per status
+    """
+    url = base_url.rstrip('/') + REGISTER_PATH
+    run_id = uuid.uuid4().hex[:8]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(
+            lambda n: register(url, signup_payload(run_id, n), timeout),
+            range(total)
+        ))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency * 1000 for _, latency in results]
+    return {
+        'requests': total,
+        'concurrency': concurrency,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(total / elapsed, 2),
+        'latency_ms': latency_summary(latencies),
+        'statuses': {str(k): v for k, v in Counter(status for status, _ in results).items()},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:8000', help='Base URL of the server')
+    parser.add_argument('--requests', type=int, default=200, help='Total signups to send')
+    parser.add_argument('--concurrency', type=int, default=8, help='Parallel clients')
+    parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds')
+    args = parser.parse_args(argv)
+
+    result = run(args.url, args.requests, args.concurrency, args.timeout)
+    json.dump(result, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+    return 0 if set(result['statuses']) == {'201'} else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
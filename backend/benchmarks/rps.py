@@ -0,0 +1,99 @@
+"""
+Requests-per-second benchmark for read endpoints.
+
+Run it against a running server, once per configuration being compared,
+for example the development settings and settings_production under the
+same gunicorn command:
+
+    python benchmarks/rps.py --url http://localhost:8000 --duration 20 \
+        --concurrency 16 --path /api/accounts/landlords/
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from stats import latency_summary
+
+DEFAULT_PATHS = ['/api/accounts/landlords/', '/api/rooms/properties/']
+
+
+def fetch(url, timeout):
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except (urllib.error.URLError, TimeoutError):
+        status = 'error'
+    return status, time.perf_counter() - start
+
+
+def client(urls, deadline, timeout, results, lock):
+    local = []
+    n = 0
+    while time.perf_counter() < deadline:
+        local.append(fetch(urls[n % len(urls)], timeout))
+        n += 1
+    with lock:
+        results.extend(local)
+
+
+def run(base_url, paths, duration, concurrency, timeout=30, warmup=2):
+    """
+    Hit ``paths`` round-robin from ``concurrency`` clients for ``duration`` seconds.
+
+    Returns:
+        dict: Requests per second, latency percentiles (ms) and a count per status
+    """
+    urls = [base_url.rstrip('/') + path for path in paths]
+    # Warm up connections, caches and template loaders before measuring
+    for url in urls * warmup:
+        fetch(url, timeout)
+
+    results = []
+    lock = threading.Lock()
+    start = time.perf_counter()
+    deadline = start + duration
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(client, urls, deadline, timeout, results, lock)
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency * 1000 for _, latency in results]
+    return {
+        'paths': paths,
+        'concurrency': concurrency,
+        'elapsed_s': round(elapsed, 3),
+        'requests': len(results),
+        'rps': round(len(results) / elapsed, 2),
+        'latency_ms': latency_summary(latencies),
+        'statuses': {str(k): v for k, v in Counter(status for status, _ in results).items()},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:8000', help='Base URL of the server')
+    parser.add_argument('--path', action='append', dest='paths',
+                        help='Path to request; repeat for several (default: landlord and property lists)')
+    parser.add_argument('--duration', type=float, default=20, help='Seconds to run (default: 20)')
+    parser.add_argument('--concurrency', type=int, default=8, help='Parallel clients (default: 8)')
+    parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds')
+    args = parser.parse_args(argv)
+
+    result = run(args.url, args.paths or DEFAULT_PATHS, args.duration, args.concurrency, args.timeout)
+    json.dump(result, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+    return 0 if set(result['statuses']) == {'200'} else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,18 @@
+"""Latency statistics shared by the benchmark scripts."""
+import statistics
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def latency_summary(latencies_ms):
+    """Mean and p50/p95/p99 of ``latencies_ms``, rounded to 0.01 ms."""
+    return {
+        'mean': round(statistics.mean(latencies_ms), 2),
+        'p50': round(percentile(latencies_ms, 50), 2),
+        'p95': round(percentile(latencies_ms, 95), 2),
+        'p99': round(percentile(latencies_ms, 99), 2),
+    }
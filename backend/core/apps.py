@@ -5,3 +5,7 @@ class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
     verbose_name = 'Core'
+
+    def ready(self):
+        # Install the slow-query and tracing execute wrappers on new connections
+        from . import slow_queries, tracing  # noqa: F401
@@ -0,0 +1,133 @@
+"""
+Two-tier caching: a small in-process LRU in front of the shared cache.
+
+Very hot keys (property detail payloads, user roles) are read from a bounded
+per-process LRU with a short TTL, then from the shared cache, and only then
+rebuilt. Deleting a key removes it from the shared cache and from this
+process, and bumps a shared epoch for the tier; every other process compares
+the epoch at most once per ``sync_interval`` seconds and drops its local
+entries when it has moved. Stale local reads are therefore bounded by
+``sync_interval`` after an invalidation, and by ``local_ttl`` otherwise.
+
+Hit and miss counters are kept per tier and per process; see tier_stats().
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+
+from .metrics import record_cache_lookups
+
+_MISSING = object()
+
+# name -> TwoTierCache, for stats
+TIERS = {}
+
+
+class TwoTierCache:
+    def __init__(self, name, maxsize=1024, local_ttl=5, timeout=300, sync_interval=1):
+        self.name = name
+        self.maxsize = maxsize
+        self.local_ttl = local_ttl
+        self.timeout = timeout
+        self.sync_interval = sync_interval
+        self._local = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._epoch = None
+        self._synced_at = None
+        self.local_hits = self.shared_hits = self.misses = 0
+        TIERS[name] = self
+
+    def _shared_key(self, key):
+        return f'tier:{self.name}:{key}'
+
+    @property
+    def _epoch_key(self):
+        return f'tier:{self.name}:epoch'
+
+    def _sync(self, now):
+        if self._synced_at is not None and now - self._synced_at < self.sync_interval:
+            return
+        epoch = cache.get(self._epoch_key)
+        with self._lock:
+            if epoch != self._epoch:
+                # Another process invalidated something in this tier
+                self._local.clear()
+                self._epoch = epoch
+            self._synced_at = now
+
+    def _set_local(self, key, value, now):
+        with self._lock:
+            self._local[key] = (now + self.local_ttl, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.maxsize:
+                self._local.popitem(last=False)
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        self._sync(now)
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._local.move_to_end(key)
+                    self.local_hits += 1
+                    record_cache_lookups(hits=1)
+                    return entry[1]
+                del self._local[key]
+
+        value = cache.get(self._shared_key(key), _MISSING)
+        if value is _MISSING:
+            self.misses += 1
+            record_cache_lookups(misses=1)
+            return default
+        self.shared_hits += 1
+        record_cache_lookups(hits=1)
+        self._set_local(key, value, now)
+        return value
+
+    def set(self, key, value, timeout=None):
+        cache.set(self._shared_key(key), value, self.timeout if timeout is None else timeout)
+        self._set_local(key, value, time.monotonic())
+
+    def get_or_set(self, key, default, timeout=None):
+        """Return the cached value, computing and storing ``default()`` on a miss."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = default() if callable(default) else default
+            self.set(key, value, timeout)
+        return value
+
+    def delete(self, *keys):
+        """Invalidate ``keys`` in the shared cache and in every process."""
+        cache.delete_many([self._shared_key(key) for key in keys])
+        with self._lock:
+            for key in keys:
+                self._local.pop(key, None)
+        # add() makes sure incr() has something to increment
+        cache.add(self._epoch_key, 0, timeout=None)
+        try:
+            cache.incr(self._epoch_key)
+        except ValueError:
+            cache.set(self._epoch_key, time.time_ns(), timeout=None)
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+    def stats(self):
+        lookups = self.local_hits + self.shared_hits + self.misses
+        return {
+            'local_hits': self.local_hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'hit_ratio': round((self.local_hits + self.shared_hits) / lookups, 4) if lookups else None,
+            'local_size': len(self._local),
+            'maxsize': self.maxsize,
+        }
+
+
+def tier_stats():
+    """Hit/miss counters for every tier in this process."""
+    return {name: tier.stats() for name, tier in TIERS.items()}
@@ -0,0 +1,167 @@
+"""
+Read-replica routing with read-your-writes stickiness.
+
+ReplicationMiddleware records, per request, whether reads may go to a
+replica: only safe-method requests qualify, and only until the request
+writes something. Once a user has written, their reads are pinned to the
+primary for READ_REPLICA_STICKY_SECONDS (tracked in the shared cache), so a
+landlord immediately sees the property they just created.
+
+ReplicaRouter sends reads of ROUTED_APPS models to a random healthy replica
+from settings.DATABASE_REPLICAS. A replica is healthy when it answers and
+its replay lag is under REPLICA_MAX_LAG seconds; health is rechecked every
+REPLICA_CHECK_INTERVAL seconds per process. With no healthy replica, reads
+fall back to the primary.
+"""
+import contextvars
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils.functional import SimpleLazyObject, empty
+
+logger = logging.getLogger(__name__)
+
+ROUTED_APPS = {'rooms', 'accounts', 'messaging'}
+
+# On a standby, lag is the age of the last replayed transaction, or 0 when
+# everything received has been replayed. On a primary both LSNs are NULL.
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+
+class RequestState:
+    def __init__(self, request):
+        self.request = request
+        self.replica_ok = request.method in ('GET', 'HEAD', 'OPTIONS')
+        self.pinned = None
+        self.wrote = False
+
+
+_request_state = contextvars.ContextVar('db_request_state', default=None)
+
+
+def primary_pin_key(user_id):
+    return f'db:primary-pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """Keep the user's reads on the primary for the stickiness window."""
+    cache.set(primary_pin_key(user_id), True, settings.READ_REPLICA_STICKY_SECONDS)
+
+
+def authenticated_user_id(request):
+    """
+    The request's user id if authentication has already happened, without
+    triggering it (that would query the database from inside the router).
+    """
+    user = request.__dict__.get('user')
+    if isinstance(user, SimpleLazyObject):
+        user = user._wrapped
+        if user is empty:
+            return None
+    if user is None or not user.is_authenticated:
+        return None
+    return user.pk
+
+
+def replica_lag(alias):
+    """Replication lag of ``alias`` in seconds (0 for a primary)."""
+    with connections[alias].cursor() as cursor:
+        cursor.execute(REPLICA_LAG_SQL)
+        lag = cursor.fetchone()[0]
+    return float(lag or 0)
+
+
+class ReplicaRouter:
+    def __init__(self):
+        self._health = {}  # alias -> (checked_at, healthy)
+
+    @property
+    def replicas(self):
+        return getattr(settings, 'DATABASE_REPLICAS', [])
+
+    def _is_healthy(self, alias):
+        now = time.monotonic()
+        checked_at, healthy = self._health.get(alias, (None, False))
+        if checked_at is not None and now - checked_at < settings.REPLICA_CHECK_INTERVAL:
+            return healthy
+        try:
+            lag = replica_lag(alias)
+            healthy = lag <= settings.REPLICA_MAX_LAG
+            if not healthy:
+                logger.warning(f"Replica {alias} is {lag:.1f}s behind; reading from the primary")
+        except DatabaseError as e:
+            logger.warning(f"Replica {alias} unavailable; reading from the primary: {str(e)}")
+            healthy = False
+        self._health[alias] = (now, healthy)
+        return healthy
+
+    def _use_primary(self):
+        state = _request_state.get()
+        if state is None or not state.replica_ok or state.wrote:
+            return True
+        # Reads inside a transaction must see its writes
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return True
+        if state.pinned is None:
+            user_id = authenticated_user_id(state.request)
+            if user_id is None:
+                # Not authenticated (yet); decide again on the next query
+                return False
+            state.pinned = bool(cache.get(primary_pin_key(user_id)))
+        return state.pinned
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in ROUTED_APPS or not self.replicas:
+            return None
+        if self._use_primary():
+            return DEFAULT_DB_ALIAS
+        healthy = [alias for alias in self.replicas if self._is_healthy(alias)]
+        return random.choice(healthy) if healthy else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            # Later reads in this request, and the user's next requests, go to the primary
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *self.replicas}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in self.replicas:
+            return False
+        return None
+
+
+class ReplicationMiddleware:
+    """Tracks each request's replica eligibility for ReplicaRouter."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = RequestState(request)
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+
+        if state.wrote:
+            user_id = authenticated_user_id(request)
+            if user_id is not None:
+                pin_to_primary(user_id)
+        return response
@@ -0,0 +1,34 @@
+import json
+import logging
+from datetime import datetime, timezone
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Format log records as one JSON object per line, for log collectors.
+
+    Request logs from django.request and django.server also carry the status
+    code and request path, and slow-query logs their record (see
+    core/slow_queries.py).
+    """
+
+    def format(self, record):
+        payload = {
+            'time': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        status_code = getattr(record, 'status_code', None)
+        if status_code is not None:
+            payload['status_code'] = status_code
+        request = getattr(record, 'request', None)
+        if request is not None and hasattr(request, 'path'):
+            payload['method'] = request.method
+            payload['path'] = request.path
+        slow_query = getattr(record, 'slow_query', None)
+        if slow_query is not None:
+            payload['slow_query'] = slow_query
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
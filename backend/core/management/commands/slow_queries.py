@@ -0,0 +1,109 @@
+import json
+import re
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+DURATION = re.compile(r'^(\d+(?:\.\d+)?)([smhd])$')
+UNITS = {'s': 'seconds', 'm': 'minutes', 'h': 'hours', 'd': 'days'}
+
+
+def parse_time(value):
+    """An ISO timestamp, or a duration before now such as ``90m`` or ``2d``."""
+    match = DURATION.match(value)
+    if match:
+        return timezone.now() - timedelta(**{UNITS[match[2]]: float(match[1])})
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"'{value}' is neither a duration like 30m nor an ISO timestamp")
+    return moment if timezone.is_aware(moment) else timezone.make_aware(moment)
+
+
+def read_records(paths):
+    """(time, slow_query) pairs from JSON log lines; other lines are skipped."""
+    for path in paths:
+        try:
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if isinstance(entry, dict) and 'slow_query' in entry:
+                        yield datetime.fromisoformat(entry['time']), entry['slow_query']
+        except OSError as e:
+            raise CommandError(f'Cannot read {path}: {e}')
+
+
+class Command(BaseCommand):
+    help = 'Reports the slowest query fingerprints by total time from the slow-query log (see core/slow_queries.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'files',
+            nargs='*',
+            help='JSON log files to read, e.g. rotated logs (default: SLOW_QUERY_LOG)',
+        )
+        parser.add_argument('--since', help='Start of the window: a duration before now such as 1h, or an ISO time')
+        parser.add_argument('--until', help='End of the window, in the same formats')
+        parser.add_argument('--top', type=int, default=10, help='Fingerprints to report (default: 10)')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        paths = options['files'] or ([settings.SLOW_QUERY_LOG] if settings.SLOW_QUERY_LOG else [])
+        if not paths:
+            raise CommandError('Pass log files or set SLOW_QUERY_LOG')
+        since = parse_time(options['since']) if options['since'] else None
+        until = parse_time(options['until']) if options['until'] else None
+
+        groups = defaultdict(lambda: {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'views': Counter()})
+        for moment, record in read_records(paths):
+            if (since and moment < since) or (until and moment > until):
+                continue
+            group = groups[record['fingerprint']]
+            group['count'] += 1
+            group['total_ms'] += record['duration_ms']
+            if record['duration_ms'] >= group['max_ms']:
+                group['max_ms'] = record['duration_ms']
+                group['slowest_stack'] = record['stack']
+            group['views'][record['view'] or '-'] += 1
+            group['sql'] = record['sql']
+
+        total = sum(group['total_ms'] for group in groups.values())
+        report = [
+            {
+                'fingerprint': key,
+                'count': group['count'],
+                'total_ms': round(group['total_ms'], 1),
+                'mean_ms': round(group['total_ms'] / group['count'], 1),
+                'max_ms': round(group['max_ms'], 1),
+                'share': round(group['total_ms'] / total, 3) if total else 0,
+                'views': dict(group['views'].most_common(5)),
+                'sql': group['sql'],
+                'slowest_stack': group['slowest_stack'],
+            }
+            for key, group in sorted(groups.items(), key=lambda item: -item[1]['total_ms'])[:options['top']]
+        ]
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        if not report:
+            self.stdout.write('No slow queries in the window')
+            return
+        count = sum(group['count'] for group in groups.values())
+        self.stdout.write(f'{count} slow queries, {total / 1000:.1f}s in total')
+        for rank, entry in enumerate(report, start=1):
+            self.stdout.write(self.style.WARNING(
+                f"{rank}. {entry['fingerprint']}  {entry['total_ms']:.0f}ms total ({entry['share']:.0%}), "
+                f"{entry['count']} queries, mean {entry['mean_ms']:.1f}ms, max {entry['max_ms']:.1f}ms"
+            ))
+            self.stdout.write(f"   {entry['sql'][:300]}")
+            views = ', '.join(f'{view} ({count})' for view, count in entry['views'].items())
+            self.stdout.write(f'   views: {views}')
+            if entry['slowest_stack']:
+                self.stdout.write(f"   at: {entry['slowest_stack'][-1]}")
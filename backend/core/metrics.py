@@ -0,0 +1,145 @@
+"""
+Per-endpoint request metrics in the Prometheus text format.
+
+MetricsMiddleware records, for every request and labelled by the resolved
+view name (e.g. ``property-list-create``), the latency, the number and total
+time of database queries, cache hits and misses, and the response size.
+metrics_view serves them at /metrics.
+
+Under gunicorn each worker has its own registry. Set PROMETHEUS_MULTIPROC_DIR
+to an empty directory before the workers start and the values are written
+there and merged on scrape; gunicorn.conf.py cleans up after dead workers.
+"""
+import contextvars
+import os
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+)
+
+UNRESOLVED = '<unresolved>'
+# Clients can send any method token; the rest share one label so they cannot
+# create unbounded latency series
+METHODS = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'})
+OTHER_METHOD = 'other'
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Request latency', ['view', 'method', 'status'],
+)
+DB_QUERIES = Histogram(
+    'http_request_db_queries', 'Database queries per request', ['view'],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, float('inf')),
+)
+DB_TIME = Histogram(
+    'http_request_db_seconds', 'Time spent in database queries per request', ['view'],
+    buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, float('inf')),
+)
+CACHE_LOOKUPS = Counter(
+    'http_request_cache_lookups', 'Cache lookups made while serving requests', ['view', 'result'],
+)
+RESPONSE_SIZE = Histogram(
+    'http_response_size_bytes', 'Response body size', ['view'],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, float('inf')),
+)
+
+
+class RequestMetrics:
+    __slots__ = ('queries', 'db_time', 'cache_hits', 'cache_misses')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Database execute wrapper
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+
+_request_metrics = contextvars.ContextVar('request_metrics', default=None)
+
+
+def record_cache_lookups(hits=0, misses=0):
+    """Count cache hits and misses against the current request, if any."""
+    metrics = _request_metrics.get()
+    if metrics is not None:
+        metrics.cache_hits += hits
+        metrics.cache_misses += misses
+
+
+def view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNRESOLVED
+    return match.view_name or match._func_path
+
+
+def method_label(request):
+    return request.method if request.method in METHODS else OTHER_METHOD
+
+
+class MetricsMiddleware:
+    """Records per-view request metrics; see the module docstring."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _request_metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _request_metrics.reset(token)
+        duration = time.perf_counter() - start
+
+        view = view_label(request)
+        REQUEST_LATENCY.labels(view, method_label(request), response.status_code).observe(duration)
+        DB_QUERIES.labels(view).observe(metrics.queries)
+        DB_TIME.labels(view).observe(metrics.db_time)
+        if metrics.cache_hits:
+            CACHE_LOOKUPS.labels(view, 'hit').inc(metrics.cache_hits)
+        if metrics.cache_misses:
+            CACHE_LOOKUPS.labels(view, 'miss').inc(metrics.cache_misses)
+        if not response.streaming:
+            RESPONSE_SIZE.labels(view).observe(len(response.content))
+        return response
+
+
+def metrics_registry():
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def metrics_view(request):
+    """
+    Serve the metrics; with METRICS_TOKEN set, require it as a bearer token.
+    Without one, METRICS_REQUIRE_TOKEN refuses every request.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token:
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        if not constant_time_compare(header, f'Bearer {token}'):
+            return HttpResponseForbidden()
+    elif settings.METRICS_REQUIRE_TOKEN:
+        return HttpResponseForbidden()
+    return HttpResponse(generate_latest(metrics_registry()), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,283 @@
+"""
+On-demand profiling of single requests, for staff.
+
+A staff member gets a signed token from ProfilingTokenView and sends it with
+the request to profile, in the X-Profile header or the ``_profile`` query
+parameter. ProfilingMiddleware then records, for that one request:
+
+- a profile: stack samples in the folded format read by flamegraph.pl and
+  speedscope or, for tokens made with ``mode=cprofile``, a cProfile dump
+  for snakeviz and pstats,
+- the SQL it ran, with durations,
+- the lines that allocated the most memory, from tracemalloc; tracing is
+  process-wide, so these include other threads' allocations made meanwhile,
+- its cache calls, with durations and hits.
+
+The report is kept in the shared cache for PROFILING_REPORT_TTL seconds and
+its id is returned in the X-Profile-Id response header. Requests without a
+token only pay for a header and query string lookup.
+"""
+import cProfile
+import functools
+import marshal
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import cache, caches
+from django.db import connections
+from django.utils import timezone
+
+HEADER = 'HTTP_X_PROFILE'
+QUERY_PARAM = '_profile'
+MODES = ('sample', 'cprofile')
+SALT = 'core.profiling'
+TOP_ALLOCATIONS = 25
+
+
+def make_token(user, mode='sample'):
+    return signing.dumps({'user': user.pk, 'mode': mode}, salt=SALT)
+
+
+def read_token(token):
+    """The token's payload, or None if it is invalid, expired or no longer a staff member's."""
+    try:
+        payload = signing.loads(token, salt=SALT, max_age=settings.PROFILING_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    if payload.get('mode') not in MODES:
+        return None
+    staff = get_user_model().objects.filter(pk=payload.get('user'), is_staff=True, is_active=True)
+    return payload if staff.exists() else None
+
+
+def request_token(request):
+    token = request.META.get(HEADER)
+    if token is None and f'{QUERY_PARAM}=' in request.META.get('QUERY_STRING', ''):
+        token = request.GET.get(QUERY_PARAM)
+    return token
+
+
+def report_key(report_id):
+    return f'profiling:report:{report_id}'
+
+
+def get_report(report_id):
+    return cache.get(report_key(report_id))
+
+
+class StackSampler:
+    """Samples one thread's stack every ``interval`` seconds from a background thread."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiling-sampler', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def folded(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        # Database execute wrapper
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'database': context['connection'].alias,
+                'sql': sql,
+                'many': many,
+                'ms': round((time.perf_counter() - start) * 1000, 3),
+            })
+
+
+class CacheRecorder:
+    """Stands in for a cache backend and records the calls made through it."""
+
+    RECORDED = {
+        'add', 'get', 'set', 'touch', 'delete', 'get_many', 'get_or_set', 'has_key',
+        'incr', 'decr', 'set_many', 'delete_many', 'clear',
+    }
+
+    def __init__(self, backend, alias, calls):
+        self._backend = backend
+        self._alias = alias
+        self._calls = calls
+
+    def __getattr__(self, name):
+        attr = getattr(self._backend, name)
+        if name not in self.RECORDED:
+            return attr
+
+        @functools.wraps(attr)
+        def recorded(*args, **kwargs):
+            start = time.perf_counter()
+            result = attr(*args, **kwargs)
+            call = {
+                'cache': self._alias,
+                'method': name,
+                'key': str(args[0])[:200] if args else None,
+                'ms': round((time.perf_counter() - start) * 1000, 3),
+            }
+            if name == 'get':
+                default = args[1] if len(args) > 1 else kwargs.get('default')
+                call['hit'] = result is not default
+            elif name == 'get_many':
+                call['hits'] = len(result)
+            self._calls.append(call)
+            return result
+
+        return recorded
+
+
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_started_tracemalloc = False
+
+
+def start_tracemalloc():
+    """
+    Make sure tracemalloc is running until the matching stop_tracemalloc().
+
+    Tracing is process-wide, so overlapping profiled requests in threaded
+    workers share it: the first starts it and the last one out stops it.
+    """
+    global _tracemalloc_users, _started_tracemalloc
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracemalloc = True
+        _tracemalloc_users += 1
+
+
+def stop_tracemalloc():
+    global _tracemalloc_users, _started_tracemalloc
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and _started_tracemalloc:
+            tracemalloc.stop()
+            _started_tracemalloc = False
+
+
+def top_allocations(before, after):
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    stats = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), 'lineno')
+    return [
+        {'location': str(stat.traceback[0]), 'size_diff': stat.size_diff, 'count_diff': stat.count_diff}
+        for stat in stats[:TOP_ALLOCATIONS]
+    ]
+
+
+def profile_request(get_response, request, mode):
+    """Serve ``request`` under the profilers; returns the response and the report."""
+    queries = QueryRecorder()
+    cache_calls = []
+    backends = {alias: caches[alias] for alias in caches}
+
+    start_tracemalloc()
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    for alias, backend in backends.items():
+        caches[alias] = CacheRecorder(backend, alias, cache_calls)
+
+    profiler = sampler = None
+    start = time.perf_counter()
+    try:
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(queries))
+            if mode == 'cprofile':
+                profiler = cProfile.Profile()
+                stack.callback(profiler.disable)
+                profiler.enable()
+            else:
+                sampler = stack.enter_context(
+                    StackSampler(threading.get_ident(), settings.PROFILING_SAMPLE_INTERVAL)
+                )
+            response = get_response(request)
+    finally:
+        duration = time.perf_counter() - start
+        for alias, backend in backends.items():
+            caches[alias] = backend
+        after = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        stop_tracemalloc()
+
+    if profiler is not None:
+        profiler.create_stats()
+        profile = marshal.dumps(profiler.stats)
+    else:
+        profile = sampler.folded()
+    report = {
+        'id': uuid.uuid4().hex,
+        'created_at': timezone.now().isoformat(),
+        'mode': mode,
+        'method': request.method,
+        'path': request.path,
+        'status': response.status_code,
+        'duration_ms': round(duration * 1000, 3),
+        'queries': queries.queries,
+        'query_ms': round(sum(query['ms'] for query in queries.queries), 3),
+        'cache_calls': cache_calls,
+        # tracemalloc sees every thread, not just this request's
+        'memory': {'scope': 'process', 'peak_bytes': peak, 'top_allocations': top_allocations(before, after)},
+        'profile': profile,
+    }
+    return response, report
+
+
+class ProfilingMiddleware:
+    """Profiles requests that carry a staff profiling token; see the module docstring."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = request_token(request)
+        if token is None:
+            return self.get_response(request)
+
+        payload = read_token(token)
+        if payload is None:
+            response = self.get_response(request)
+            response['X-Profile-Error'] = 'Invalid or expired profiling token'
+            return response
+
+        response, report = profile_request(self.get_response, request, payload['mode'])
+        report['user'] = payload['user']
+        cache.set(report_key(report['id']), report, settings.PROFILING_REPORT_TTL)
+        response['X-Profile-Id'] = report['id']
+        return response
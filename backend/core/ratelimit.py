@@ -0,0 +1,73 @@
+"""
+Sliding-window rate limiting over the shared cache.
+
+Each limiter keeps one counter per fixed window and estimates the rate over
+the last full window by weighting the previous window's count by how much of
+it still overlaps. Counters are bumped with cache.incr(), which is atomic on
+the shared backends (Redis, memcached), so every worker sees the same count
+and no database queries are involved.
+"""
+import hashlib
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+
+
+def parse_rate(rate):
+    """
+    Parse a rate such as '10/min', '5/hour' or '1/5min' into
+    (limit, window_seconds).
+    """
+    limit, period = rate.split('/')
+    match = re.fullmatch(r'(\d*)\s*([a-z]+)', period.strip().lower())
+    if not match or match.group(2)[0] not in PERIODS:
+        raise ValueError(f"Invalid rate: {rate!r}")
+    multiplier = int(match.group(1) or 1)
+    return int(limit), multiplier * PERIODS[match.group(2)[0]]
+
+
+class SlidingWindowRateLimiter:
+    def __init__(self, scope, limit, window):
+        self.scope = scope
+        self.limit = limit
+        self.window = window
+
+    @classmethod
+    def for_scope(cls, scope):
+        """Build the limiter configured for ``scope`` in settings.RATE_LIMITS."""
+        limit, window = parse_rate(settings.RATE_LIMITS[scope])
+        return cls(scope, limit, window)
+
+    def _key(self, ident, bucket):
+        digest = hashlib.sha256(str(ident).encode('utf-8')).hexdigest()[:32]
+        return f'ratelimit:{self.scope}:{digest}:{bucket}'
+
+    def hit(self, ident):
+        """
+        Record one request for ``ident`` and return True if it is within the
+        limit, False if it should be rejected.
+        """
+        now = time.time()
+        bucket = int(now // self.window)
+        current_key = self._key(ident, bucket)
+
+        # add() is a no-op when the counter exists, so incr() always has a key
+        cache.add(current_key, 0, timeout=self.window * 2)
+        try:
+            current = cache.incr(current_key)
+        except ValueError:
+            # Evicted between add() and incr()
+            cache.set(current_key, 1, timeout=self.window * 2)
+            current = 1
+        previous = cache.get(self._key(ident, bucket - 1), 0)
+
+        overlap = 1 - (now % self.window) / self.window
+        return previous * overlap + current <= self.limit
+
+    def reset(self, ident):
+        bucket = int(time.time() // self.window)
+        cache.delete_many([self._key(ident, bucket), self._key(ident, bucket - 1)])
@@ -0,0 +1,134 @@
+"""
+Slow-query log with request attribution.
+
+Every database connection gets an execute wrapper that times each query and
+logs those taking at least SLOW_QUERY_MS to the ``core.slow_queries`` logger.
+The record, in ``record.slow_query``, carries:
+
+- the query's fingerprint, its SQL with literals, placeholders and IN lists
+  replaced so that repeats of one statement group together, and a short
+  hash of it,
+- the duration and database alias,
+- the view name and user id of the request that ran it (None outside
+  requests, e.g. in workers),
+- the innermost project frames of the call site.
+
+With SLOW_QUERY_LOG set the records are also appended to that file as JSON
+lines; ``manage.py slow_queries`` reports the top fingerprints by total time.
+"""
+import contextvars
+import functools
+import hashlib
+import logging
+import os
+import re
+import time
+import traceback
+from importlib import import_module
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .db_router import authenticated_user_id
+from .metrics import view_label
+
+logger = logging.getLogger(__name__)
+
+STACK_FRAMES = 5
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDER = re.compile(r'%s|\$\d+')
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_SPACE = re.compile(r'\s+')
+
+_current_request = contextvars.ContextVar('slow_query_request', default=None)
+
+
+def fingerprint(sql):
+    """``sql`` with its variable parts replaced, e.g. ``WHERE id IN (?+)``."""
+    sql = _STRING.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _LIST.sub('(?+)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def fingerprint_id(normalized):
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:12]
+
+
+@functools.cache
+def _middleware_files():
+    return {import_module(path.rpartition('.')[0]).__file__ for path in settings.MIDDLEWARE}
+
+
+def call_site():
+    """
+    The innermost project frames of the current stack, skipping third-party
+    code and the middleware every request passes through.
+    """
+    base = str(settings.BASE_DIR)
+    middleware = _middleware_files()
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(base) and 'site-packages' not in frame.filename
+        and frame.filename != __file__
+        and not (frame.name == '__call__' and frame.filename in middleware)
+    ]
+    return [
+        f'{os.path.relpath(frame.filename, base)}:{frame.lineno} in {frame.name}'
+        for frame in frames[-STACK_FRAMES:]
+    ]
+
+
+def log_slow_query(sql, duration, alias):
+    request = _current_request.get()
+    normalized = fingerprint(sql)
+    record = {
+        'fingerprint': fingerprint_id(normalized),
+        'sql': normalized,
+        'duration_ms': round(duration * 1000, 3),
+        'database': alias,
+        'view': view_label(request) if request is not None else None,
+        'user_id': authenticated_user_id(request) if request is not None else None,
+        'stack': call_site(),
+    }
+    logger.warning(
+        f"Slow query {record['fingerprint']} took {record['duration_ms']:.1f}ms in {record['view'] or '-'}",
+        extra={'slow_query': record},
+    )
+
+
+def time_query(execute, sql, params, many, context):
+    # Database execute wrapper
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        if duration * 1000 >= settings.SLOW_QUERY_MS:
+            log_slow_query(sql, duration, context['connection'].alias)
+
+
+@receiver(connection_created)
+def install_wrapper(sender, connection, **kwargs):
+    # First in the list, so execute_wrapper() blocks entered before the
+    # connection opened still pop their own wrapper on exit
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, time_query)
+
+
+class SlowQueryMiddleware:
+    """Makes the request available to the slow-query log for attribution."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _current_request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            _current_request.reset(token)
@@ -0,0 +1,326 @@
+"""
+Deterministic synthetic data for load testing.
+
+SyntheticPlan fixes how many users, properties, conversations, messages and
+property views to create (VOLUMES times a scale factor) and the ids they
+get, so rows can be generated in independent chunks, by any number of
+processes, and still reference each other. Who owns, views or messages what
+is a pure function of the row index and the seed, drawn from skewed
+distributions: a few landlords own most listings, a few listings get most
+views and inquiries, and a few conversations hold most messages.
+
+Each chunk is loaded with COPY on PostgreSQL (bulk_create elsewhere) in its
+own transaction. The same seed, scale and chunk size produce the same rows.
+"""
+import io
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from accounts.models import User, UserProfile
+from messaging.models import Conversation, Message
+from rooms.models import Property, PropertyView
+
+# Rows at scale 1.0, in load order
+VOLUMES = {
+    'users': 100_000,
+    'properties': 1_000_000,
+    'conversations': 500_000,
+    'messages': 5_000_000,
+    'property_views': 10_000_000,
+}
+LANDLORD_SHARE = 0.1
+ANONYMOUS_VIEW_SHARE = 0.4
+HISTORY_DAYS = 730
+
+CITIES = [
+    'Lagos', 'Abuja', 'Port Harcourt', 'Ibadan', 'Kano', 'Enugu',
+    'Benin City', 'Kaduna', 'Jos', 'Calabar', 'Owerri', 'Abeokuta',
+]
+STREETS = ['Marina Road', 'Allen Avenue', 'Adeola Odeku Street', 'Awolowo Road', 'Herbert Macaulay Way',
+           'Ahmadu Bello Way', 'Aminu Kano Crescent', 'Ogui Road', 'Ring Road', 'Bishop Street']
+ADJECTIVES = ['Bright', 'Spacious', 'Cosy', 'Modern', 'Quiet', 'Renovated', 'Furnished', 'Sunny']
+FIRST_NAMES = ['Ada', 'Chidi', 'Emeka', 'Fatima', 'Ifeoma', 'Kemi', 'Musa', 'Ngozi', 'Tunde', 'Zainab']
+LAST_NAMES = ['Adeyemi', 'Bello', 'Eze', 'Ibrahim', 'Nwosu', 'Obi', 'Okafor', 'Okonkwo', 'Sani', 'Usman']
+MESSAGES = [
+    'Is the property still available?',
+    'Can I come and see it this weekend?',
+    'Yes, it is still available.',
+    'Are utilities included in the rent?',
+    'The viewing is confirmed for Saturday at 10am.',
+    'Is there parking for two cars?',
+    'Pets are allowed with a small deposit.',
+    'Thanks, I will send the documents today.',
+]
+
+_MASK64 = (1 << 64) - 1
+# Independent streams of the per-index hash
+_LANDLORD, _CONVERSATION_PROPERTY, _CONVERSATION_TIME, _MESSAGE, _VIEW = range(5)
+
+
+def _unit(seed, stream, index):
+    """A uniform float in [0, 1) that depends only on (seed, stream, index)."""
+    x = (seed * 0x9E3779B97F4A7C15 + stream * 0xBF58476D1CE4E5B9 + index) & _MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return (x ^ (x >> 31)) / 2 ** 64
+
+
+def _skewed(u, n, skew):
+    """Map uniform ``u`` to [0, n), favouring low indexes more as ``skew`` grows."""
+    return min(int(n * u ** skew), n - 1)
+
+
+@dataclass(frozen=True)
+class SyntheticPlan:
+    seed: int
+    counts: dict   # table -> rows
+    bases: dict    # table -> id of the row before the first generated one
+    password: str  # hashed once and shared by every user
+    now: datetime
+
+    @classmethod
+    def create(cls, scale=1.0, seed=42, password_hash='!'):
+        counts = {table: max(int(rows * scale), 1) for table, rows in VOLUMES.items()}
+        # At least one landlord and one tenant
+        counts['users'] = max(counts['users'], 2)
+        bases = {table: (model.objects.aggregate(top=Max('pk'))['top'] or 0) for table, model in MODELS.items()}
+        return cls(seed, counts, bases, password_hash, timezone.now())
+
+    @property
+    def landlords(self):
+        return min(max(int(self.counts['users'] * LANDLORD_SHARE), 1), self.counts['users'] - 1)
+
+    @property
+    def tenants(self):
+        return self.counts['users'] - self.landlords
+
+    def user_id(self, index):
+        return self.bases['users'] + index + 1
+
+    def landlord_of(self, property_index):
+        return _skewed(_unit(self.seed, _LANDLORD, property_index), self.landlords, 2.0)
+
+    def conversation(self, index):
+        """(tenant index, property index) of a conversation; unique per conversation."""
+        tenant = self.landlords + index % self.tenants
+        round_ = index // self.tenants
+        # Each tenant asks about consecutive listings after a popular one,
+        # so (tenant, property) never repeats
+        first = _skewed(_unit(self.seed, _CONVERSATION_PROPERTY, tenant), self.counts['properties'], 3.0)
+        return tenant, (first + round_) % self.counts['properties']
+
+    def conversation_started(self, index):
+        return self.now - timedelta(days=HISTORY_DAYS * _unit(self.seed, _CONVERSATION_TIME, index))
+
+
+def _users(plan, rng, start, stop):
+    for i in range(start, stop):
+        user_id = plan.user_id(i)
+        yield (
+            user_id, plan.password, f'user{user_id}@synthetic.example',
+            rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), True, False, False,
+            plan.now - timedelta(days=HISTORY_DAYS * rng.random()),
+        )
+
+
+def _profiles(plan, rng, start, stop):
+    for i in range(start, stop):
+        landlord = i < plan.landlords
+        joined = plan.now - timedelta(days=HISTORY_DAYS * rng.random())
+        yield (
+            plan.bases['profiles'] + i + 1, plan.user_id(i), 'landlord' if landlord else 'tenant',
+            CITIES[_skewed(rng.random(), len(CITIES), 2.0)], 'Synthetic user',
+            f'{rng.choice(LAST_NAMES)} Homes' if landlord else '',
+            rng.randint(0, 25) if landlord else None, True, joined, joined,
+        )
+
+
+PROPERTY_TYPES = [choice for choice, _ in Property.PROPERTY_TYPES]
+
+
+def _properties(plan, rng, start, stop):
+    for i in range(start, stop):
+        city_index = _skewed(rng.random(), len(CITIES), 2.0)
+        city = CITIES[city_index]
+        bedrooms = rng.choices((1, 2, 3, 4, 5), weights=(30, 35, 20, 10, 5))[0]
+        property_type = PROPERTY_TYPES[_skewed(rng.random(), len(PROPERTY_TYPES), 1.5)]
+        # Bigger cities and homes cost more, with some noise
+        price = Decimal(int(400 * bedrooms * (2.0 - city_index / len(CITIES)) * rng.uniform(0.7, 1.4)))
+        created = plan.now - timedelta(days=HISTORY_DAYS * rng.random())
+        yield (
+            plan.bases['properties'] + i + 1, plan.user_id(plan.landlord_of(i)),
+            f'{rng.choice(ADJECTIVES)} {bedrooms}-bed {property_type} in {city}', property_type, city,
+            f'{rng.randint(1, 300)} {rng.choice(STREETS)}, {city}', price, bedrooms,
+            max(1, bedrooms - rng.randint(0, 1)), bedrooms * rng.randint(350, 600),
+            f'A {bedrooms} bedroom {property_type} in {city}.',
+            'available' if rng.random() < 0.8 else 'rented',
+            rng.random() < 0.4, rng.random() < 0.5, rng.random() < 0.3, rng.random() < 0.2,
+            created, created,
+        )
+
+
+def _conversations(plan, rng, start, stop):
+    for i in range(start, stop):
+        tenant, property_index = plan.conversation(i)
+        started = plan.conversation_started(i)
+        yield (
+            plan.bases['conversations'] + i + 1, plan.user_id(plan.landlord_of(property_index)),
+            plan.user_id(tenant), plan.bases['properties'] + property_index + 1,
+            f'Inquiry about listing {property_index + 1}', started, started,
+        )
+
+
+def _messages(plan, rng, start, stop):
+    conversations = plan.counts['conversations']
+    for i in range(start, stop):
+        index = _skewed(_unit(plan.seed, _MESSAGE, i), conversations, 2.0)
+        tenant, property_index = plan.conversation(index)
+        from_tenant = rng.random() < 0.55
+        sender = tenant if from_tenant else plan.landlord_of(property_index)
+        sent = plan.conversation_started(index) + timedelta(days=30 * rng.random())
+        yield (
+            plan.bases['messages'] + i + 1, plan.bases['conversations'] + index + 1,
+            plan.user_id(sender), rng.choice(MESSAGES), rng.random() < 0.8, min(sent, plan.now),
+        )
+
+
+def _property_views(plan, rng, start, stop):
+    properties = plan.counts['properties']
+    for i in range(start, stop):
+        property_index = _skewed(_unit(plan.seed, _VIEW, i), properties, 3.0)
+        viewer = None
+        if rng.random() >= ANONYMOUS_VIEW_SHARE:
+            viewer = plan.user_id(plan.landlords + rng.randrange(plan.tenants))
+        yield (
+            plan.bases['property_views'] + i + 1, plan.bases['properties'] + property_index + 1, viewer,
+            f'10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}',
+            plan.now - timedelta(days=365 * rng.random()),
+        )
+
+
+MODELS = {
+    'users': User,
+    'profiles': UserProfile,
+    'properties': Property,
+    'conversations': Conversation,
+    'messages': Message,
+    'property_views': PropertyView,
+}
+
+# table -> (columns, row generator); other columns get their field default
+TABLES = {
+    'users': (
+        ('id', 'password', 'email', 'first_name', 'last_name', 'is_active', 'is_staff',
+         'is_superuser', 'date_joined'),
+        _users,
+    ),
+    'profiles': (
+        ('id', 'user_id', 'user_type', 'location', 'bio', 'property_name', 'years_experience',
+         'email_verified', 'created_at', 'updated_at'),
+        _profiles,
+    ),
+    'properties': (
+        ('id', 'landlord_id', 'title', 'property_type', 'location', 'address', 'price', 'bedrooms',
+         'bathrooms', 'area_sqft', 'description', 'status', 'furnished', 'parking', 'pets_allowed',
+         'utilities_included', 'created_at', 'updated_at'),
+        _properties,
+    ),
+    'conversations': (
+        ('id', 'landlord_id', 'tenant_id', 'property_id', 'subject', 'created_at', 'updated_at'),
+        _conversations,
+    ),
+    'messages': (
+        ('id', 'conversation_id', 'sender_id', 'content', 'is_read', 'created_at'),
+        _messages,
+    ),
+    'property_views': (
+        ('id', 'property_id', 'viewer_id', 'ip_address', 'viewed_at'),
+        _property_views,
+    ),
+}
+
+# Tables that can load in parallel once the ones before them are done
+PHASES = (('users',), ('profiles', 'properties'), ('conversations',), ('messages', 'property_views'))
+
+
+def table_rows(plan, table):
+    """Rows to create in ``table``; profiles follow users one to one."""
+    return plan.counts['users'] if table == 'profiles' else plan.counts[table]
+
+
+def chunks(plan, table, chunk_size):
+    total = table_rows(plan, table)
+    return [(table, start, min(start + chunk_size, total)) for start in range(0, total, chunk_size)]
+
+
+def _copy_value(value):
+    if value is None:
+        return '\\N'
+    if value is True:
+        return 't'
+    if value is False:
+        return 'f'
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _defaults(model, columns, now):
+    """Values for the concrete columns the generator leaves out."""
+    defaults = {}
+    for field in model._meta.concrete_fields:
+        if field.column in columns:
+            continue
+        value = field.get_default()
+        if value is None and not field.null and getattr(field, 'auto_now', False):
+            value = now
+        defaults[field.column] = value
+    return defaults
+
+
+def load_chunk(plan, table, start, stop):
+    """Generate rows [start, stop) of ``table`` and load them in one transaction."""
+    model = MODELS[table]
+    columns, generate = TABLES[table]
+    defaults = _defaults(model, columns, plan.now)
+    rng = random.Random(f'{plan.seed}:{table}:{start}')
+    rows = generate(plan, rng, start, stop)
+
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            suffix = ''.join('\t' + _copy_value(value) for value in defaults.values())
+            buffer = io.StringIO()
+            for row in rows:
+                buffer.write('\t'.join(map(_copy_value, row)) + suffix + '\n')
+            buffer.seek(0)
+            quoted = ', '.join(connection.ops.quote_name(column) for column in (*columns, *defaults))
+            with connection.cursor() as cursor:
+                cursor.copy_expert(
+                    f'COPY {connection.ops.quote_name(model._meta.db_table)} ({quoted}) FROM STDIN', buffer
+                )
+        else:
+            attnames = {field.column: field.attname for field in model._meta.concrete_fields}
+            model.objects.bulk_create(
+                [model(**{attnames[c]: v for c, v in zip((*columns, *defaults), (*row, *defaults.values()))})
+                 for row in rows],
+                batch_size=1000,
+            )
+    return table, stop - start
+
+
+def finish(plan):
+    """Move id sequences past the generated rows and refresh planner statistics."""
+    models = list(MODELS.values())
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), models):
+            cursor.execute(sql)
+        if connection.vendor == 'postgresql':
+            for model in models:
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
@@ -0,0 +1,320 @@
+"""
+Query-count regression harness for the API.
+
+Every named URL in the rooms, messaging, accounts and core URLconfs is called
+against fixtures seeded at each size in SIZES. The number of queries a call
+makes must not grow with the size of the data (no N+1 queries), and must stay
+within the budget recorded for it in query_budgets.json. Failures list the
+statements the call ran, repeated statements first.
+
+Each call starts with empty caches, so the counts are for a cold request.
+
+    QUERY_BUDGETS_RECORD=1     rewrite query_budgets.json with the current counts
+    QUERY_BUDGETS_REPORT=path  write the query counts and latencies per size to path
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from collections import Counter
+from importlib import import_module
+from io import BytesIO
+from pathlib import Path
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, reverse
+from PIL import Image
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.models import APIKey, EmailVerificationToken, UserProfile
+from accounts.tokens import make_verification_token
+from core.models import Property as CoreProperty
+from messaging.models import Conversation, Message
+from rooms.models import Favorite, LandlordReview, Property, PropertyImage, PropertyReview, PropertyView
+from .cache import TIERS
+from .profiling import report_key
+
+User = get_user_model()
+
+BUDGETS_PATH = Path(__file__).with_name('query_budgets.json')
+URLCONFS = ('rooms.urls', 'messaging.urls', 'accounts.urls', 'core.urls')
+SIZES = (1, 5, 12)
+PASSWORD = 'Budget-password-1'
+
+
+def url_names(urlconf):
+    """Names of the URL patterns in ``urlconf``, namespaced by its app_name."""
+    module = import_module(urlconf)
+    prefix = f'{module.app_name}:' if getattr(module, 'app_name', None) else ''
+
+    def walk(patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                yield from walk(pattern.url_patterns)
+            elif isinstance(pattern, URLPattern) and pattern.name:
+                yield prefix + pattern.name
+
+    return set(walk(module.urlpatterns))
+
+
+def seed(size):
+    """Create fixtures with ``size`` rows behind every list endpoint."""
+    f = SimpleNamespace()
+    f.landlord = User.objects.create_user(email='landlord@example.com', first_name='Lena')
+    UserProfile.objects.create(user=f.landlord, user_type='landlord', location='Lagos')
+    f.tenant = User.objects.create_user(email='tenant@example.com', password=PASSWORD)
+    UserProfile.objects.create(user=f.tenant, user_type='tenant', email_verified=True)
+    f.staff = User.objects.create_user(email='staff@example.com', is_staff=True)
+    f.unverified = User.objects.create_user(email='unverified@example.com', is_active=False)
+    UserProfile.objects.create(user=f.unverified, user_type='tenant')
+    f.verification_token = EmailVerificationToken.objects.create(user=f.unverified).token
+    # Each verification call needs a user it has not verified yet
+    f.signed_user = User.objects.create_user(email='signed@example.com', is_active=False)
+    UserProfile.objects.create(user=f.signed_user, user_type='tenant')
+    f.signed_token = make_verification_token(f.signed_user)
+    f.resend_user = User.objects.create_user(email='resend@example.com', is_active=False)
+    UserProfile.objects.create(user=f.resend_user, user_type='tenant')
+    f.refresh_token = str(RefreshToken.for_user(f.tenant))
+
+    f.properties = []
+    for i in range(size):
+        property_obj = Property.objects.create(
+            landlord=f.landlord, title=f'Flat {i}', location='Lagos', address=f'{i} Marina Road',
+            price='1500.00', area_sqft=800, description='Two bed flat'
+        )
+        PropertyImage.objects.create(property=property_obj, image=f'property_images/{i}.jpg', is_primary=True)
+        PropertyImage.objects.create(property=property_obj, image=f'property_images/{i}-b.jpg')
+        Favorite.objects.create(tenant=f.tenant, property=property_obj)
+        conversation = Conversation.objects.create(
+            landlord=f.landlord, tenant=f.tenant, property=property_obj, subject=f'Flat {i}'
+        )
+        Message.objects.create(conversation=conversation, sender=f.tenant, content='Is the flat still free?')
+        Message.objects.create(conversation=conversation, sender=f.landlord, content='Yes, come and see it')
+        CoreProperty.objects.create(
+            landlord=f.landlord, title=f'House {i}', description='Family house', property_type='house',
+            price='2500.00', bedrooms=3, bathrooms='2.0', square_feet=1800, address=f'{i} Main St',
+            city='Springfield', state='IL', zip_code='62701'
+        )
+        APIKey.generate(f.landlord, f'Key {i}')
+        f.properties.append(property_obj)
+
+        reviewer = User.objects.create_user(email=f'reviewer{i}@example.com')
+        UserProfile.objects.create(user=reviewer, user_type='tenant')
+        PropertyReview.objects.create(property=f.properties[0], tenant=reviewer, rating=4, comment='Nice')
+        LandlordReview.objects.create(landlord=f.landlord, tenant=reviewer, rating=5, comment='Helpful')
+        PropertyView.objects.create(property=f.properties[0], viewer=reviewer, ip_address='127.0.0.1')
+
+        other_landlord = User.objects.create_user(email=f'landlord{i}@example.com')
+        UserProfile.objects.create(user=other_landlord, user_type='landlord')
+
+    f.property = f.properties[0]
+    f.conversation = Conversation.objects.filter(property=f.property).get()
+    f.api_key = APIKey.objects.filter(user=f.landlord).first()
+    f.core_property = CoreProperty.objects.first()
+    return f
+
+
+def png_upload():
+    buffer = BytesIO()
+    Image.new('RGB', (8, 8), 'green').save(buffer, format='PNG')
+    return SimpleUploadedFile('flat.png', buffer.getvalue(), content_type='image/png')
+
+
+class Call:
+    """How to call one URL: method, user, URL kwargs and request data (all from fixtures)."""
+
+    def __init__(self, method='get', user=None, kwargs=None, data=None, query='', multipart=False):
+        self.method = method
+        self.user = user
+        self.kwargs = kwargs or (lambda f: {})
+        self.data = data or (lambda f: None)
+        self.query = query
+        self.multipart = multipart
+
+
+def profile_report(f):
+    # measure() empties the cache before each call
+    cache.set(report_key('budget'), {'id': 'budget', 'mode': 'sample', 'profile': 'main 1\n'})
+    return {'report_id': 'budget'}
+
+
+CALLS = {
+    # rooms
+    'property-list-create': Call(user='tenant'),
+    'property-detail': Call(user='tenant', kwargs=lambda f: {'pk': f.property.pk}),
+    'landlord-properties': Call(user='landlord'),
+    'property-image-upload': Call(
+        'post', 'landlord', kwargs=lambda f: {'property_id': f.property.pk},
+        data=lambda f: {'images': [png_upload()]}, multipart=True
+    ),
+    'property-reviews': Call(kwargs=lambda f: {'property_id': f.property.pk}),
+    'property-views': Call(user='landlord', kwargs=lambda f: {'property_id': f.property.pk}),
+    'landlord-reviews': Call(kwargs=lambda f: {'landlord_id': f.landlord.pk}),
+    'favorites': Call(user='tenant'),
+    'favorite-delete': Call('delete', 'tenant', kwargs=lambda f: {'property_id': f.property.pk}),
+    # messaging
+    'conversation-list-create': Call(user='tenant'),
+    'conversation-detail': Call(user='tenant', kwargs=lambda f: {'pk': f.conversation.pk}),
+    'message-create': Call(
+        'post', 'tenant', kwargs=lambda f: {'conversation_id': f.conversation.pk},
+        data=lambda f: {'content': 'When can I move in?'}
+    ),
+    'message-history': Call(user='tenant', kwargs=lambda f: {'conversation_id': f.conversation.pk}),
+    'start-conversation': Call(
+        'post', 'tenant', data=lambda f: {'property_id': f.property.pk, 'message': 'Hello again'}
+    ),
+    'message-search': Call(user='tenant', query='?q=flat'),
+    'unread-count': Call(user='tenant'),
+    # accounts
+    'register': Call('post', data=lambda f: {
+        'email': 'new@example.com', 'password': PASSWORD, 'password2': PASSWORD,
+        'first_name': 'New', 'last_name': 'Landlord', 'user_type': 'landlord',
+        'landlord': {'property_name': 'Homes Ltd', 'years_experience': 2}
+    }),
+    'login': Call('post', data=lambda f: {'email': f.tenant.email, 'password': PASSWORD}),
+    'token_obtain_pair': Call('post', data=lambda f: {'email': f.tenant.email, 'password': PASSWORD}),
+    'token_refresh': Call('post', data=lambda f: {'refresh': f.refresh_token}),
+    'my-profile': Call(user='landlord'),
+    'profile-detail': Call(user='tenant', kwargs=lambda f: {'user_id': f.landlord.pk}),
+    'resend-verification-email': Call('post', data=lambda f: {'email': f.resend_user.email}),
+    'verify-email': Call('post', kwargs=lambda f: {'token': f.verification_token}),
+    'verify-email-signed': Call('post', kwargs=lambda f: {'token': f.signed_token}),
+    'api-key-list-create': Call(user='landlord'),
+    'api-key-revoke': Call('delete', 'landlord', kwargs=lambda f: {'pk': f.api_key.pk}),
+    'landlord-list': Call(),
+    # core
+    'core:cache-stats': Call(user='staff'),
+    'core:profiling-token': Call('post', 'staff'),
+    'core:profile-report': Call(user='staff', kwargs=profile_report),
+    'core:profile-download': Call(user='staff', kwargs=profile_report),
+    'core:api-root': Call(user='tenant'),
+    'core:property-list': Call(user='tenant'),
+    'core:property-detail': Call(user='tenant', kwargs=lambda f: {'pk': f.core_property.pk}),
+    'core:property-toggle-availability': Call(
+        'post', 'landlord', kwargs=lambda f: {'pk': f.core_property.pk}
+    ),
+}
+
+
+def normalize_sql(sql):
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    return re.sub(r'\b\d+\b', '?', sql)
+
+
+def format_queries(queries):
+    """The statements run, most repeated first, with literals replaced by ?."""
+    counts = Counter(normalize_sql(sql) for sql in queries)
+    return '\n'.join(f'  {count}x {sql}' for sql, count in counts.most_common())
+
+
+def measure(client, name, call, fixtures):
+    cache.clear()
+    for tier in TIERS.values():
+        tier.clear_local()
+    client.force_authenticate(getattr(fixtures, call.user) if call.user else None)
+    url = reverse(name, kwargs=call.kwargs(fixtures)) + call.query
+    data = call.data(fixtures)
+    request = getattr(client, call.method)
+
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        if call.multipart:
+            response = request(url, data, format='multipart')
+        else:
+            response = request(url, data, format='json')
+        elapsed = time.perf_counter() - start
+
+    return {
+        'status': response.status_code,
+        'queries': [query['sql'] for query in queries.captured_queries],
+        'ms': round(elapsed * 1000, 2),
+    }
+
+
+def load_budgets():
+    with open(BUDGETS_PATH, encoding='utf-8') as f:
+        return json.load(f)
+
+
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=media_root))
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.results = {name: {} for name in CALLS}
+        client = APIClient()
+        for size in SIZES:
+            # Each size starts from an empty database
+            with transaction.atomic():
+                fixtures = seed(size)
+                for name, call in CALLS.items():
+                    cls.results[name][size] = measure(client, name, call, fixtures)
+                transaction.set_rollback(True)
+
+        report_path = os.getenv('QUERY_BUDGETS_REPORT')
+        if report_path:
+            report = {
+                name: {
+                    'queries': {size: len(result['queries']) for size, result in by_size.items()},
+                    'ms': {size: result['ms'] for size, result in by_size.items()},
+                }
+                for name, by_size in cls.results.items()
+            }
+            with open(report_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+
+        if os.getenv('QUERY_BUDGETS_RECORD'):
+            budgets = {
+                name: max(len(result['queries']) for result in by_size.values())
+                for name, by_size in cls.results.items()
+            }
+            with open(BUDGETS_PATH, 'w', encoding='utf-8') as f:
+                json.dump(budgets, f, indent=2, sort_keys=True)
+                f.write('\n')
+
+    def test_every_url_is_called_and_budgeted(self):
+        names = set().union(*(url_names(urlconf) for urlconf in URLCONFS))
+
+        self.assertEqual(names - set(CALLS), set(), 'URLs without a Call in CALLS')
+        self.assertEqual(set(CALLS) - names, set(), 'Calls for URLs that no longer exist')
+        self.assertEqual(set(load_budgets()), names, 'Budgets out of date; record them again')
+
+    def test_calls_succeed(self):
+        for name, by_size in self.results.items():
+            for size, result in by_size.items():
+                with self.subTest(name, size=size):
+                    self.assertLess(result['status'], 400)
+
+    def test_query_counts_do_not_grow_with_data(self):
+        for name, by_size in self.results.items():
+            counts = {size: len(result['queries']) for size, result in by_size.items()}
+            with self.subTest(name):
+                if len(set(counts.values())) > 1:
+                    largest = by_size[max(SIZES)]
+                    self.fail(f'{name} query count grows with data {counts}:\n{format_queries(largest["queries"])}')
+
+    def test_query_counts_within_budget(self):
+        budgets = load_budgets()
+        for name, by_size in self.results.items():
+            if name not in budgets:
+                continue
+            with self.subTest(name):
+                worst = max(by_size.values(), key=lambda result: len(result['queries']))
+                self.assertLessEqual(
+                    len(worst['queries']), budgets[name],
+                    f'{name} is over its budget of {budgets[name]} queries:\n{format_queries(worst["queries"])}'
+                )
@@ -1,3 +1,717 @@
-from django.test import TestCase
+import json
+import logging
+import marshal
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.contrib.sessions.models import Session
+from django.db import DatabaseError
+from django.db.models import Count, F, Max
+from django.template.loader import render_to_string
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient
+
+from accounts.avatars import render_variants
+from accounts.models import User, UserProfile
+from accounts.outbox import deliver_batch, enqueue_email
+from messaging.models import Conversation, Message
+from rooms.models import Property, PropertyView
+
+from . import db_router, profiling, slow_queries, synthetic, tracing
+from .cache import TIERS, TwoTierCache
+from .logging import JSONFormatter
+from .metrics import UNRESOLVED
+from .ratelimit import SlidingWindowRateLimiter, parse_rate
+
+
+class ParseRateTests(TestCase):
+    def test_parses_common_rates(self):
+        self.assertEqual(parse_rate('10/min'), (10, 60))
+        self.assertEqual(parse_rate('5/hour'), (5, 3600))
+        self.assertEqual(parse_rate('1/5min'), (1, 300))
+        self.assertEqual(parse_rate('100/d'), (100, 86400))
+
+    def test_rejects_unknown_periods(self):
+        with self.assertRaises(ValueError):
+            parse_rate('10/fortnight')
+
+
+class SlidingWindowRateLimiterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.limiter = SlidingWindowRateLimiter('test', limit=3, window=60)
+
+    def hits_at(self, timestamp, count):
+        with mock.patch('core.ratelimit.time.time', return_value=timestamp):
+            return [self.limiter.hit('client') for _ in range(count)]
+
+    def test_allows_up_to_the_limit(self):
+        self.assertEqual(self.hits_at(6000, 4), [True, True, True, False])
+
+    def test_previous_window_is_weighted_by_overlap(self):
+        self.hits_at(6000, 3)
+
+        # A third of the way into the next window, 2 of the 3 earlier hits still count
+        self.assertEqual(self.hits_at(6080, 2), [True, False])
+
+    def test_limits_are_per_identity(self):
+        self.hits_at(6000, 3)
+
+        with mock.patch('core.ratelimit.time.time', return_value=6000):
+            self.assertTrue(self.limiter.hit('someone-else'))
+
+
+@override_settings(RATE_LIMITS={**settings.RATE_LIMITS, 'login': '2/min', 'resend_verification': '1/5min'})
+class RateLimitedViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_login_is_throttled_per_client(self):
+        url = reverse('login')
+        statuses = [
+            self.client.post(url, {'email': 'nobody@example.com', 'password': 'x'}).status_code
+            for _ in range(3)
+        ]
+
+        self.assertEqual(statuses, [401, 401, 429])
+
+    def test_repeat_resend_is_rejected_without_database_queries(self):
+        url = reverse('resend-verification-email')
+        self.client.post(url, {'email': 'nobody@example.com'})
+
+        with self.assertNumQueries(0):
+            response = self.client.post(url, {'email': 'nobody@example.com'})
+
+        self.assertEqual(response.status_code, 429)
+
+
+@mock.patch.dict(TIERS)
+class TwoTierCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_second_read_is_served_locally(self):
+        tier = TwoTierCache('test', sync_interval=0)
+        self.assertIsNone(tier.get('k'))
+        tier.set('k', {'v': 1})
+
+        self.assertEqual(tier.get('k'), {'v': 1})
+        self.assertEqual((tier.local_hits, tier.shared_hits, tier.misses), (1, 0, 1))
+
+    def test_other_processes_read_through_the_shared_cache(self):
+        TwoTierCache('test').set('k', 'v')
+        other = TwoTierCache('test')
+
+        self.assertEqual(other.get('k'), 'v')
+        self.assertEqual(other.get('k'), 'v')
+        self.assertEqual((other.local_hits, other.shared_hits), (1, 1))
+
+    def test_delete_reaches_other_processes(self):
+        writer = TwoTierCache('test', sync_interval=0)
+        reader = TwoTierCache('test', sync_interval=0)
+        writer.set('k', 'old')
+        self.assertEqual(reader.get('k'), 'old')
+
+        writer.delete('k')
+
+        self.assertIsNone(reader.get('k'))
+
+    def test_local_tier_is_bounded(self):
+        tier = TwoTierCache('test', maxsize=2)
+        for key in 'abc':
+            tier.set(key, key)
+        tier.get('b')
+
+        self.assertEqual(list(tier._local), ['c', 'b'])
+
+    def test_expired_local_entries_fall_back_to_the_shared_cache(self):
+        tier = TwoTierCache('test', local_ttl=0)
+        tier.set('k', 'v')
+
+        self.assertEqual(tier.get('k'), 'v')
+        self.assertEqual((tier.local_hits, tier.shared_hits), (0, 1))
+
+    def test_get_or_set_builds_once(self):
+        tier = TwoTierCache('test')
+        build = mock.Mock(return_value='v')
+
+        self.assertEqual(tier.get_or_set('k', build), 'v')
+        self.assertEqual(tier.get_or_set('k', build), 'v')
+        build.assert_called_once_with()
+        self.assertEqual(tier.stats()['hit_ratio'], 0.5)
+
+
+class CacheStatsViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('core:cache-stats')
+
+    def test_staff_only(self):
+        user = User.objects.create_user(email='user@example.com', password='pw-12345678')
+        self.client.force_authenticate(user)
+
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_reports_tiers(self):
+        staff = User.objects.create_user(email='staff@example.com', password='pw-12345678', is_staff=True)
+        self.client.force_authenticate(staff)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('property-detail', response.data['tiers'])
+        self.assertIn('user-type', response.data['tiers'])
+
+
+class MetricsMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_records_per_view_metrics(self):
+        user = User.objects.create_user(email='staff@example.com', password='pw-12345678', is_staff=True)
+        self.client.force_authenticate(user)
+        view = 'core:cache-stats'
+        before = {
+            'count': self.sample('http_request_duration_seconds_count', view=view, method='GET', status='200'),
+            'size': self.sample('http_response_size_bytes_sum', view=view),
+        }
+
+        response = self.client.get(reverse('core:cache-stats'))
+
+        self.assertEqual(
+            self.sample('http_request_duration_seconds_count', view=view, method='GET', status='200'),
+            before['count'] + 1
+        )
+        self.assertEqual(
+            self.sample('http_response_size_bytes_sum', view=view), before['size'] + len(response.content)
+        )
+        self.assertGreaterEqual(self.sample('http_request_db_queries_count', view=view), 1)
+
+    def test_unknown_methods_share_one_series(self):
+        def series():
+            return {
+                sample.labels['method']
+                for metric in REGISTRY.collect() if metric.name == 'http_request_duration_seconds'
+                for sample in metric.samples
+            }
+        before = self.sample('http_request_duration_seconds_count', view=UNRESOLVED, method='other', status='404')
+
+        for method in ('FOO', 'BAR'):
+            self.client.generic(method, '/no/such/page/')
+
+        self.assertFalse({'FOO', 'BAR'} & series())
+        self.assertEqual(
+            self.sample('http_request_duration_seconds_count', view=UNRESOLVED, method='other', status='404'),
+            before + 2
+        )
+
+    def test_counts_queries_and_cache_lookups(self):
+        landlord = User.objects.create_user(email='landlord@example.com', password='pw-12345678')
+        prop = Property.objects.create(
+            landlord=landlord, title='Flat', location='Lagos', address='1 Marina Road',
+            price='1500.00', area_sqft=800, description='Two bed flat'
+        )
+        url = reverse('property-detail', args=[prop.pk])
+        view = 'property-detail'
+        self.client.get(url)
+        queries = self.sample('http_request_db_queries_sum', view=view)
+        hits = self.sample('http_request_cache_lookups_total', view=view, result='hit')
+
+        self.client.get(url)
+
+        # The cached payload leaves the view row, the counter update and nothing else
+        self.assertEqual(self.sample('http_request_db_queries_sum', view=view), queries + 2)
+        self.assertEqual(self.sample('http_request_cache_lookups_total', view=view, result='hit'), hits + 1)
+
+    def test_unresolved_requests_share_a_label(self):
+        before = self.sample('http_request_duration_seconds_count', view='<unresolved>', method='GET', status='404')
+
+        self.client.get('/no/such/page/')
+
+        self.assertEqual(
+            self.sample('http_request_duration_seconds_count', view='<unresolved>', method='GET', status='404'),
+            before + 1
+        )
+
+    def test_metrics_endpoint(self):
+        self.client.get('/no/such/page/')
+
+        response = self.client.get('/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'http_request_duration_seconds_bucket{', response.content)
+
+    @override_settings(METRICS_TOKEN='scrape-token')
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-token')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_TOKEN=None, METRICS_REQUIRE_TOKEN=True)
+    def test_metrics_fail_closed_without_a_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.staff = User.objects.create_user(email='staff@example.com', password='pw-12345678', is_staff=True)
+        landlord = User.objects.create_user(email='landlord@example.com', password='pw-12345678')
+        prop = Property.objects.create(
+            landlord=landlord, title='Flat', location='Lagos', address='1 Marina Road',
+            price='1500.00', area_sqft=800, description='Two bed flat'
+        )
+        self.url = reverse('property-detail', args=[prop.pk])
+
+    def token(self, mode='sample'):
+        self.client.force_authenticate(self.staff)
+        response = self.client.post(reverse('core:profiling-token'), {'mode': mode}, format='json')
+        self.client.force_authenticate(None)
+        return response.data['token']
+
+    def report(self, response):
+        self.client.force_authenticate(self.staff)
+        return self.client.get(reverse('core:profile-report', args=[response['X-Profile-Id']]))
+
+    def test_requests_without_a_token_are_not_profiled(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-Id', response)
+
+    def test_token_is_staff_only(self):
+        user = User.objects.create_user(email='user@example.com', password='pw-12345678')
+        self.client.force_authenticate(user)
+
+        self.assertEqual(self.client.post(reverse('core:profiling-token')).status_code, 403)
+
+    def test_profiles_request(self):
+        response = self.client.get(self.url, HTTP_X_PROFILE=self.token())
+
+        self.assertEqual(response.status_code, 200)
+        report = self.report(response).data
+        self.assertEqual(report['path'], self.url)
+        self.assertEqual(report['status'], 200)
+        self.assertTrue(any('rooms_property' in query['sql'] for query in report['queries']))
+        self.assertTrue(any(
+            call['method'] == 'get' and 'property-detail' in call['key'] for call in report['cache_calls']
+        ))
+        self.assertEqual(report['memory']['scope'], 'process')
+        self.assertGreater(report['memory']['peak_bytes'], 0)
+        self.assertTrue(report['memory']['top_allocations'])
+
+        download = self.client.get(report['download'])
+        self.assertEqual(download['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertIn('.folded', download['Content-Disposition'])
+
+    def test_cprofile_mode_and_query_parameter(self):
+        response = self.client.get(self.url, {profiling.QUERY_PARAM: self.token('cprofile')})
+
+        report = self.report(response).data
+        self.assertEqual(report['mode'], 'cprofile')
+        download = self.client.get(report['download'])
+        stats = marshal.loads(download.content)
+        self.assertTrue(any(function == 'retrieve' for _, _, function in stats))
+
+    def test_tokens_of_former_staff_are_ignored(self):
+        token = self.token()
+        self.staff.is_staff = False
+        self.staff.save()
+
+        response = self.client.get(self.url, HTTP_X_PROFILE=token)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertIn('X-Profile-Error', response)
+
+    def test_overlapping_profiles_share_tracemalloc(self):
+        self.assertFalse(tracemalloc.is_tracing())
+        profiling.start_tracemalloc()
+        profiling.start_tracemalloc()
+
+        # The first request to finish leaves tracing on for the other
+        profiling.stop_tracemalloc()
+        self.assertTrue(tracemalloc.is_tracing())
+        tracemalloc.take_snapshot()
+        profiling.stop_tracemalloc()
+        self.assertFalse(tracemalloc.is_tracing())
+
+
+class SeedSyntheticTests(TestCase):
+    def seed(self, **options):
+        call_command('seed_synthetic', scale=0.0002, workers=0, chunk_size=150, stdout=StringIO(), **options)
+
+    def test_seeds_scaled_volumes(self):
+        self.seed(password='Load-test-1')
+
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(User.objects.filter(profile__user_type='landlord').count(), 2)
+        self.assertEqual(Property.objects.count(), 200)
+        self.assertEqual(Conversation.objects.count(), 100)
+        self.assertEqual(Message.objects.count(), 1000)
+        self.assertEqual(PropertyView.objects.count(), 2000)
+        self.assertTrue(User.objects.first().check_password('Load-test-1'))
+
+    def test_rows_reference_consistent_users(self):
+        self.seed()
+
+        self.assertFalse(Property.objects.exclude(landlord__profile__user_type='landlord').exists())
+        self.assertFalse(Conversation.objects.exclude(landlord=F('property__landlord')).exists())
+        self.assertFalse(
+            Message.objects.exclude(sender=F('conversation__tenant')).exclude(sender=F('conversation__landlord')).exists()
+        )
+
+    def test_sequences_continue_after_seeded_rows(self):
+        self.seed()
+
+        user = User.objects.create_user(email='after@example.com')
+
+        self.assertGreater(user.pk, User.objects.exclude(pk=user.pk).aggregate(top=Max('pk'))['top'])
+
+    def test_generation_is_deterministic(self):
+        plan = synthetic.SyntheticPlan.create(scale=0.0002, seed=7)
+        columns, generate = synthetic.TABLES['messages']
+
+        def rows():
+            return list(generate(plan, random.Random(f'{plan.seed}:messages:0'), 0, 100))
+
+        self.assertEqual(rows(), rows())
+
+    def test_popular_listings_get_most_views(self):
+        self.seed()
+
+        views = list(PropertyView.objects.values('property').annotate(n=Count('*')).order_by('-n').values_list('n', flat=True))
+
+        # The top 10% of viewed listings get well over 10% of the views
+        self.assertGreater(sum(views[:len(views) // 10]), 0.3 * sum(views))
+
+
+class JSONFormatterTests(TestCase):
+    def make_record(self, **extra):
+        record = logging.LogRecord('django.request', logging.ERROR, __file__, 1, 'Failed %s', ('x',), None)
+        record.__dict__.update(extra)
+        return record
+
+    def test_formats_one_json_object(self):
+        line = JSONFormatter().format(self.make_record())
+
+        payload = json.loads(line)
+        self.assertEqual(payload['level'], 'ERROR')
+        self.assertEqual(payload['logger'], 'django.request')
+        self.assertEqual(payload['message'], 'Failed x')
+        self.assertNotIn('\n', line)
+
+    def test_includes_request_details_and_exceptions(self):
+        request = mock.Mock(method='GET', path='/api/rooms/properties/')
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            record = self.make_record(status_code=500, request=request, exc_info=sys.exc_info())
+
+        payload = json.loads(JSONFormatter().format(record))
+
+        self.assertEqual(payload['status_code'], 500)
+        self.assertEqual(payload['path'], '/api/rooms/properties/')
+        self.assertIn('ValueError: boom', payload['exc_info'])
+
+
+class TracingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        # Export anything left queued by other tests before switching files
+        tracing.exporter().flush()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.trace_file = f'{directory.name}/traces.jsonl'
+        settings_override = self.settings(TRACING_FILE=self.trace_file, TRACING_SAMPLE_RATE=1)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def exported_spans(self):
+        tracing.exporter().flush()
+        spans = []
+        try:
+            with open(self.trace_file, encoding='utf-8') as f:
+                for line in f:
+                    for resource in json.loads(line)['resourceSpans']:
+                        for scope in resource['scopeSpans']:
+                            spans.extend(scope['spans'])
+        except FileNotFoundError:
+            pass
+        return spans
+
+    def make_property(self):
+        landlord = User.objects.create_user(email='landlord@example.com', password='pw-12345678')
+        return Property.objects.create(
+            landlord=landlord, title='Flat', location='Lagos', address='1 Marina Road',
+            price='1500.00', area_sqft=800, description='Two bed flat'
+        )
+
+    def test_unsampled_requests_are_not_traced(self):
+        url = reverse('property-detail', args=[self.make_property().pk])
+
+        with self.settings(TRACING_SAMPLE_RATE=0):
+            response = self.client.get(url)
+
+        self.assertNotIn('X-Trace-Id', response)
+        self.assertEqual(self.exported_spans(), [])
+
+    def test_request_spans(self):
+        response = self.client.get(reverse('property-detail', args=[self.make_property().pk]))
+
+        spans = self.exported_spans()
+        root = next(span for span in spans if 'parentSpanId' not in span)
+        self.assertEqual(root['traceId'], response['X-Trace-Id'])
+        self.assertEqual(root['name'], 'GET property-detail')
+        self.assertEqual(root['kind'], tracing.SERVER)
+        self.assertIn({'key': 'http.status_code', 'value': {'intValue': '200'}}, root['attributes'])
+        names = Counter(span['name'] for span in spans)
+        self.assertGreater(names['db.query'], 0)
+        self.assertGreater(names['cache.get'], 0)
+        self.assertEqual({span['traceId'] for span in spans}, {root['traceId']})
+        self.assertTrue(all(span['parentSpanId'] == root['spanId'] for span in spans if span is not root))
+
+    def test_continues_the_callers_trace(self):
+        trace_id, parent_id = 'ab' * 16, 'cd' * 8
+
+        with self.settings(TRACING_SAMPLE_RATE=0):
+            response = self.client.get('/no/such/page/', HTTP_TRACEPARENT=f'00-{trace_id}-{parent_id}-01')
+
+        self.assertEqual(response['X-Trace-Id'], trace_id)
+        root = self.exported_spans()[-1]
+        self.assertEqual(root['parentSpanId'], parent_id)
+
+    def test_template_email_and_image_spans(self):
+        buffer = BytesIO()
+        Image.new('RGB', (64, 48), 'green').save(buffer, format='PNG')
+        buffer.seek(0)
+
+        with tracing.trace('job') as root:
+            html = render_to_string('emails/verify_email.html', {'user': User(first_name='Ada'), 'verification_url': 'http://x/'})
+            enqueue_email('Verify', 'Body', ['user@example.com'], html_message=html)
+            deliver_batch()
+            render_variants(buffer)
+
+        self.assertEqual(len(mail.outbox), 1)
+        spans = self.exported_spans()
+        names = Counter(span['name'] for span in spans)
+        self.assertEqual(names['template.render'], 1)
+        self.assertEqual(names['email.send'], 1)
+        self.assertEqual(names['image.decode'], 1)
+        self.assertEqual(names['image.resize'], 3)
+        self.assertEqual({span['traceId'] for span in spans}, {root.trace_id})
+
+    def test_errors_mark_the_span(self):
+        with self.assertRaises(ValueError), tracing.trace('job'), tracing.span('step'):
+            raise ValueError('boom')
+
+        step = next(span for span in self.exported_spans() if span['name'] == 'step')
+        self.assertEqual(step['status'], {'code': 2, 'message': 'ValueError: boom'})
+
+    def test_spans_outside_a_trace_are_not_recorded(self):
+        with tracing.span('step') as step:
+            User.objects.count()
+
+        self.assertIs(step, tracing.NOOP_SPAN)
+        self.assertEqual(self.exported_spans(), [])
+
+
+class SlowQueryLogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_fingerprint_groups_repeats(self):
+        literal = slow_queries.fingerprint("SELECT * FROM t WHERE id IN (1, 2, 3) AND name = 'it''s'\n  LIMIT 21")
+        placeholders = slow_queries.fingerprint('SELECT * FROM t WHERE id IN (%s, %s) AND name = %s LIMIT %s')
+
+        self.assertEqual(literal, 'SELECT * FROM t WHERE id IN (?+) AND name = ? LIMIT ?')
+        self.assertEqual(literal, placeholders)
+
+    def test_attributes_queries_to_the_request(self):
+        tenant = User.objects.create_user(email='tenant@example.com', password='pw-12345678')
+        UserProfile.objects.create(user=tenant, user_type='tenant')
+        prop = Property.objects.create(
+            landlord=User.objects.create_user(email='landlord@example.com'), title='Flat', location='Lagos',
+            address='1 Marina Road', price='1500.00', area_sqft=800, description='Two bed flat'
+        )
+        self.client.force_authenticate(tenant)
+
+        with self.settings(SLOW_QUERY_MS=0), self.assertLogs('core.slow_queries', 'WARNING') as logs:
+            self.client.post(reverse('favorites'), {'property': prop.pk}, format='json')
+
+        lookups = [
+            record.slow_query for record in logs.records if 'FROM "rooms_property"' in record.slow_query['sql']
+        ]
+        for lookup in lookups:
+            self.assertEqual(lookup['view'], 'favorites')
+            self.assertEqual(lookup['user_id'], tenant.pk)
+            self.assertEqual(lookup['fingerprint'], slow_queries.fingerprint_id(lookup['sql']))
+            self.assertIn('"rooms_property"."id" = ?', lookup['sql'])
+        # The serializer's lookup, then perform_create's
+        self.assertTrue(lookups[-1]['stack'][-1].startswith('rooms/views.py:'), lookups[-1]['stack'])
+
+    def test_queries_outside_requests_have_no_view(self):
+        with self.settings(SLOW_QUERY_MS=0), self.assertLogs('core.slow_queries', 'WARNING') as logs:
+            User.objects.count()
+
+        self.assertIsNone(logs.records[0].slow_query['view'])
+        self.assertIsNone(logs.records[0].slow_query['user_id'])
+
+    def test_fast_queries_are_not_logged(self):
+        with self.settings(SLOW_QUERY_MS=10_000), self.assertNoLogs('core.slow_queries'):
+            User.objects.count()
+
+    def test_report_ranks_fingerprints_by_total_time(self):
+        def line(age, fingerprint, duration_ms, view='property-list-create'):
+            record = logging.makeLogRecord({
+                'name': 'core.slow_queries', 'levelname': 'WARNING', 'msg': 'Slow query',
+                'created': time.time() - age,
+                'slow_query': {
+                    'fingerprint': fingerprint, 'sql': f'SELECT {fingerprint}', 'duration_ms': duration_ms,
+                    'database': 'default', 'view': view, 'user_id': None, 'stack': ['rooms/views.py:1 in get'],
+                },
+            })
+            return JSONFormatter().format(record) + '\n'
+
+        with tempfile.NamedTemporaryFile('w', suffix='.log', delete=False) as log:
+            log.write(line(60, 'aaa', 300))
+            log.write(line(60, 'bbb', 250))
+            log.write('not json\n')
+            log.write(line(30, 'bbb', 250, view='favorites'))
+            log.write(line(2 * 86400, 'aaa', 5000))
+        out = StringIO()
+
+        call_command('slow_queries', log.name, since='1h', json=True, stdout=out)
+
+        report = json.loads(out.getvalue())
+        self.assertEqual([entry['fingerprint'] for entry in report], ['bbb', 'aaa'])
+        self.assertEqual(report[0]['count'], 2)
+        self.assertEqual(report[0]['total_ms'], 500)
+        self.assertEqual(report[0]['views'], {'property-list-create': 1, 'favorites': 1})
+        self.assertEqual(report[1]['max_ms'], 300)
+
+        out = StringIO()
+        call_command('slow_queries', log.name, stdout=out)
+        self.assertIn('1. aaa', out.getvalue())
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], READ_REPLICA_STICKY_SECONDS=5,
+                   REPLICA_MAX_LAG=10, REPLICA_CHECK_INTERVAL=5)
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.router = db_router.ReplicaRouter()
+        self.user = User(pk=1, email='landlord@example.com')
+        lag = mock.patch.object(db_router, 'replica_lag', return_value=0.0)
+        self.replica_lag = lag.start()
+        self.addCleanup(lag.stop)
+
+    def route(self, method='get', user=None, before_read=None):
+        """Run a request through the middleware and return where a Property read goes."""
+        request = getattr(RequestFactory(), method)('/')
+        if user is not None:
+            request.user = user
+        routed = []
+
+        def view(request):
+            if before_read:
+                before_read()
+            routed.append(self.router.db_for_read(Property))
+            return mock.Mock()
+
+        db_router.ReplicationMiddleware(view)(request)
+        return routed[0]
+
+    def test_safe_reads_go_to_a_replica(self):
+        self.assertEqual(self.route(), 'replica1')
+
+    def test_other_apps_and_unsafe_methods_use_the_primary(self):
+        self.assertIsNone(self.router.db_for_read(Session))
+        self.assertEqual(self.route('post'), 'default')
+        # Outside a request (commands, shells) everything stays on the primary
+        self.assertEqual(self.router.db_for_read(Property), 'default')
+
+    def test_reads_after_a_write_use_the_primary(self):
+        routed = self.route(user=self.user, before_read=lambda: self.router.db_for_write(Property))
+
+        self.assertEqual(routed, 'default')
+        # The user stays pinned to the primary for their next requests
+        self.assertEqual(self.route(user=self.user), 'default')
+        self.assertEqual(self.route(user=User(pk=2)), 'replica1')
+
+    def test_pin_expires(self):
+        db_router.pin_to_primary(self.user.pk)
+        cache.delete(db_router.primary_pin_key(self.user.pk))
+
+        self.assertEqual(self.route(user=self.user), 'replica1')
+
+    def test_lagging_or_broken_replica_falls_back_to_primary(self):
+        self.replica_lag.return_value = 30.0
+        self.assertEqual(self.route(), 'default')
+
+        self.router = db_router.ReplicaRouter()
+        self.replica_lag.side_effect = DatabaseError('connection refused')
+        self.assertEqual(self.route(), 'default')
+        # The result is reused until the next check is due
+        self.replica_lag.side_effect = None
+        self.replica_lag.return_value = 0.0
+        self.assertEqual(self.route(), 'default')
+        self.router._health.clear()
+        self.assertEqual(self.route(), 'replica1')
+
+    def test_replicas_are_never_migrated(self):
+        self.assertFalse(self.router.allow_migrate('replica1', 'rooms'))
+        self.assertIsNone(self.router.allow_migrate('default', 'rooms'))
+
+
+class ProductionSettingsTests(SimpleTestCase):
+    def production_settings(self, script, **env):
+        # Settings modules change the dicts they import, so load them in a
+        # separate interpreter rather than into this test run
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'HouseListing_Backend.settings_production', **env}
+        result = subprocess.run(
+            [sys.executable, '-c', f'from django.conf import settings\n{script}'],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return json.loads(result.stdout)
+
+    def test_replicas_keep_connections_open(self):
+        databases = self.production_settings(
+            'import json; print(json.dumps({alias: [db["CONN_MAX_AGE"], db["CONN_HEALTH_CHECKS"]] '
+            'for alias, db in settings.DATABASES.items()}))',
+            DB_REPLICAS='127.0.0.1:5433,127.0.0.1:5434/replica',
+        )
+
+        self.assertEqual(databases, {alias: [60, True] for alias in ('default', 'replica1', 'replica2')})
+
+    def test_metrics_require_a_token(self):
+        self.assertIs(self.production_settings('print(str(settings.METRICS_REQUIRE_TOKEN).lower())'), True)
+
+
+class ReplicaLagTests(TestCase):
+    def test_primary_reports_no_lag(self):
+        self.assertEqual(db_router.replica_lag('default'), 0.0)
@@ -0,0 +1,29 @@
+from rest_framework import permissions
+from rest_framework.throttling import BaseThrottle
+
+from .ratelimit import SlidingWindowRateLimiter
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    Throttle writes to a view using the shared sliding-window limiter.
+
+    The view names its limit with ``rate_limit_scope`` (a key of
+    settings.RATE_LIMITS). Requests are counted per authenticated user, or per
+    client IP for anonymous requests. Safe methods are never throttled.
+    """
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'rate_limit_scope', None)
+        if scope is None or request.method in permissions.SAFE_METHODS:
+            return True
+
+        self.limiter = SlidingWindowRateLimiter.for_scope(scope)
+        if request.user and request.user.is_authenticated:
+            ident = f'user:{request.user.pk}'
+        else:
+            ident = f'ip:{self.get_ident(request)}'
+        return self.limiter.hit(ident)
+
+    def wait(self):
+        return self.limiter.window
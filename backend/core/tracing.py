@@ -0,0 +1,340 @@
+"""
+Lightweight request tracing.
+
+A trace is a tree of timed spans. TracingMiddleware starts one per request,
+and the email and avatar workers one per batch, for a TRACING_SAMPLE_RATE
+fraction of them; a request whose W3C ``traceparent`` header says sampled is
+always traced, under the caller's trace id. Inside a trace, spans are
+recorded around:
+
+- every database query (an execute wrapper on each connection),
+- cache calls,
+- template rendering (TracedDjangoTemplates, the TEMPLATES backend),
+- email delivery and avatar image processing,
+
+and anywhere else with ``with span('name', {'attribute': value}):``. Outside a
+sampled trace ``span`` records nothing.
+
+Finished traces are exported in batches from a background thread as OTLP/JSON:
+POSTed to TRACING_OTLP_ENDPOINT (an OpenTelemetry collector's OTLP/HTTP
+receiver) and/or appended as one JSON document per line to TRACING_FILE,
+the format the collector's otlpjsonfile receiver reads.
+"""
+import atexit
+import contextvars
+import functools
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates
+
+from .metrics import view_label
+from .profiling import CacheRecorder
+
+logger = logging.getLogger(__name__)
+
+# OTLP span kinds
+INTERNAL, SERVER, CLIENT = 1, 2, 3
+
+TRACEPARENT = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+_current_span = contextvars.ContextVar('tracing_span', default=None)
+# Finished spans of the trace in progress, exported when its root span ends
+_trace_spans = contextvars.ContextVar('tracing_spans', default=None)
+
+
+class Span:
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'kind', 'start_ns', 'end_ns', 'attributes', 'error')
+
+    def __init__(self, trace_id, parent_id, name, kind, attributes):
+        self.trace_id = trace_id
+        self.span_id = f'{random.getrandbits(64):016x}'
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.error = None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    def set(self, attributes):
+        self.attributes.update(attributes)
+
+
+class NoopSpan:
+    """Stands in for a span when nothing is being traced."""
+
+    trace_id = None
+
+    def set(self, attributes):
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+
+@contextmanager
+def _record(span_obj, finished):
+    token = _current_span.set(span_obj)
+    try:
+        yield span_obj
+    except BaseException as e:
+        span_obj.error = f'{type(e).__name__}: {e}'
+        raise
+    finally:
+        span_obj.end_ns = time.time_ns()
+        _current_span.reset(token)
+        finished.append(span_obj)
+
+
+@contextmanager
+def span(name, attributes=None, kind=INTERNAL):
+    """Record a child span of the current span, if a sampled trace is in progress."""
+    parent = _current_span.get()
+    if parent is None:
+        yield NOOP_SPAN
+        return
+    with _record(Span(parent.trace_id, parent.span_id, name, kind, attributes), _trace_spans.get()) as child:
+        yield child
+
+
+def parse_traceparent(header):
+    """(trace id, parent span id, sampled) from a W3C traceparent header, or None."""
+    match = TRACEPARENT.match(header.strip().lower()) if header else None
+    if match is None or match[1] == '0' * 32 or match[2] == '0' * 16:
+        return None
+    return match[1], match[2], bool(int(match[3], 16) & 1)
+
+
+@contextmanager
+def trace(name, attributes=None, kind=INTERNAL, traceparent=None):
+    """
+    Start a trace with a root span, sampled at TRACING_SAMPLE_RATE unless
+    ``traceparent`` decides. Inside another trace this is just a span.
+    """
+    if _current_span.get() is not None:
+        with span(name, attributes, kind) as child:
+            yield child
+        return
+
+    parent = parse_traceparent(traceparent)
+    if parent is not None:
+        trace_id, parent_id, sampled = parent
+    else:
+        trace_id, parent_id = f'{random.getrandbits(128):032x}', None
+        sampled = random.random() < settings.TRACING_SAMPLE_RATE
+    if not sampled:
+        yield NOOP_SPAN
+        return
+
+    spans = []
+    spans_token = _trace_spans.set(spans)
+    backends = {alias: caches[alias] for alias in caches}
+    for alias, backend in backends.items():
+        caches[alias] = TracedCache(backend, alias)
+    try:
+        with _record(Span(trace_id, parent_id, name, kind, attributes), spans) as root:
+            yield root
+    finally:
+        for alias, backend in backends.items():
+            caches[alias] = backend
+        _trace_spans.reset(spans_token)
+        exporter().submit(spans)
+
+
+def trace_query(execute, sql, params, many, context):
+    # Database execute wrapper
+    if _current_span.get() is None:
+        return execute(sql, params, many, context)
+    connection = context['connection']
+    attributes = {'db.system': connection.vendor, 'db.name': connection.alias, 'db.statement': sql[:2000]}
+    with span('db.query', attributes, CLIENT):
+        return execute(sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_wrapper(sender, connection, **kwargs):
+    # First in the list, like the slow-query wrapper, so execute_wrapper()
+    # blocks entered before the connection opened pop their own wrapper
+    if trace_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, trace_query)
+
+
+class TracedCache:
+    """Stands in for a cache backend during a trace and records a span per call."""
+
+    def __init__(self, backend, alias):
+        self._backend = backend
+        self._alias = alias
+
+    def __getattr__(self, name):
+        attr = getattr(self._backend, name)
+        if name not in CacheRecorder.RECORDED:
+            return attr
+
+        @functools.wraps(attr)
+        def traced(*args, **kwargs):
+            attributes = {'cache.alias': self._alias}
+            if args:
+                attributes['cache.key'] = str(args[0])[:200]
+            with span(f'cache.{name}', attributes, CLIENT) as call:
+                result = attr(*args, **kwargs)
+                if name == 'get':
+                    default = args[1] if len(args) > 1 else kwargs.get('default')
+                    call.set({'cache.hit': result is not default})
+                return result
+
+        return traced
+
+
+class TracedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        with span('template.render', {'template.name': self.template.origin.template_name or '<string>'}):
+            return self.template.render(context, request)
+
+
+class TracedDjangoTemplates(DjangoTemplates):
+    """The Django template engine, rendering each template inside a span."""
+
+    def from_string(self, template_code):
+        return TracedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TracedTemplate(super().get_template(template_name))
+
+
+class TracingMiddleware:
+    """Traces sampled requests; see the module docstring."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        attributes = {'http.method': request.method, 'http.target': request.path}
+        traceparent = request.META.get('HTTP_TRACEPARENT')
+        with trace(request.method, attributes, SERVER, traceparent) as root:
+            response = self.get_response(request)
+            if root.trace_id is not None:
+                root.name = f'{request.method} {view_label(request)}'
+                root.set({'http.route': view_label(request), 'http.status_code': response.status_code})
+                response['X-Trace-Id'] = root.trace_id
+        return response
+
+
+def _attribute(key, value):
+    if isinstance(value, bool):
+        return {'key': key, 'value': {'boolValue': value}}
+    if isinstance(value, int):
+        return {'key': key, 'value': {'intValue': str(value)}}
+    if isinstance(value, float):
+        return {'key': key, 'value': {'doubleValue': value}}
+    return {'key': key, 'value': {'stringValue': str(value)}}
+
+
+def otlp_payload(spans):
+    """An OTLP/JSON ExportTraceServiceRequest for ``spans``."""
+    encoded = []
+    for span_obj in spans:
+        encoded_span = {
+            'traceId': span_obj.trace_id,
+            'spanId': span_obj.span_id,
+            'name': span_obj.name,
+            'kind': span_obj.kind,
+            'startTimeUnixNano': str(span_obj.start_ns),
+            'endTimeUnixNano': str(span_obj.end_ns),
+            'attributes': [_attribute(key, value) for key, value in span_obj.attributes.items()],
+            'status': {'code': 2, 'message': span_obj.error} if span_obj.error else {'code': 0},
+        }
+        if span_obj.parent_id:
+            encoded_span['parentSpanId'] = span_obj.parent_id
+        encoded.append(encoded_span)
+    return {'resourceSpans': [{
+        'resource': {'attributes': [
+            _attribute('service.name', settings.TRACING_SERVICE_NAME),
+            _attribute('process.pid', os.getpid()),
+        ]},
+        'scopeSpans': [{'scope': {'name': __name__}, 'spans': encoded}],
+    }]}
+
+
+class Exporter:
+    """Exports submitted traces every TRACING_EXPORT_INTERVAL seconds from a background thread."""
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='tracing-exporter', daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def submit(self, spans):
+        self._queue.put(spans)
+
+    def _run(self):
+        while True:
+            time.sleep(settings.TRACING_EXPORT_INTERVAL)
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            spans = []
+            while True:
+                try:
+                    spans.extend(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if spans:
+                self.export(spans)
+
+    def export(self, spans):
+        body = json.dumps(otlp_payload(spans))
+        if settings.TRACING_FILE:
+            try:
+                with open(settings.TRACING_FILE, 'a', encoding='utf-8') as f:
+                    f.write(body + '\n')
+            except OSError as e:
+                logger.warning(f"Could not write {len(spans)} spans to {settings.TRACING_FILE}: {str(e)}")
+        if settings.TRACING_OTLP_ENDPOINT:
+            request = urllib.request.Request(
+                settings.TRACING_OTLP_ENDPOINT.rstrip('/') + '/v1/traces',
+                data=body.encode('utf-8'),
+                headers={'Content-Type': 'application/json'},
+            )
+            try:
+                with urllib.request.urlopen(request, timeout=5) as response:
+                    response.read()
+            except (urllib.error.URLError, OSError) as e:
+                logger.warning(f"Could not export {len(spans)} spans to the collector: {str(e)}")
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def exporter():
+    """This process's exporter; worker processes forked from a parent start their own."""
+    global _exporter
+    with _exporter_lock:
+        if _exporter is None or _exporter.pid != os.getpid():
+            _exporter = Exporter()
+        return _exporter
@@ -8,5 +8,9 @@ router.register(r'properties', views.PropertyViewSet, basename='property')
 app_name = 'core'
 
 urlpatterns = [
+    path('cache-stats/', views.CacheStatsView.as_view(), name='cache-stats'),
+    path('profiling/token/', views.ProfilingTokenView.as_view(), name='profiling-token'),
+    path('profiles/<str:report_id>/', views.ProfileReportView.as_view(), name='profile-report'),
+    path('profiles/<str:report_id>/profile/', views.ProfileDownloadView.as_view(), name='profile-download'),
     path('', include(router.urls)),
 ]
@@ -1,9 +1,17 @@
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, BasePermission
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, BasePermission
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
 from django.db.models import Q
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+import os
+
+from . import profiling
+from .cache import tier_stats
 
 from .models import Property
 from .serializers import PropertySerializer
@@ -115,3 +123,75 @@ class PropertyViewSet(viewsets.ModelViewSet):
             'format': self.format_kwarg,
             'view': self
         }
+
+
+
+class CacheStatsView(APIView):
+    """
+    Hit/miss counters of the in-process cache tiers. Counters are per worker
+    process, so the pid is included to tell responses apart.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({'pid': os.getpid(), 'tiers': tier_stats()})
+
+
+class ProfilingTokenView(APIView):
+    """
+    Signed token that profiles the requests sending it, as the X-Profile
+    header or the _profile query parameter (see core/profiling.py).
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        mode = request.data.get('mode', 'sample')
+        if mode not in profiling.MODES:
+            return Response(
+                {"error": f"mode must be one of: {', '.join(profiling.MODES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response({
+            'token': profiling.make_token(request.user, mode),
+            'mode': mode,
+            'header': 'X-Profile',
+            'query_param': profiling.QUERY_PARAM,
+            'expires_in': settings.PROFILING_TOKEN_MAX_AGE,
+        })
+
+
+class ProfileReportView(APIView):
+    """
+    A profiled request's SQL, cache calls and allocations, with a link to
+    download the profile itself.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, report_id):
+        report = profiling.get_report(report_id)
+        if report is None:
+            raise Http404
+        data = {key: value for key, value in report.items() if key != 'profile'}
+        data['download'] = request.build_absolute_uri(reverse('core:profile-download', args=[report_id]))
+        return Response(data)
+
+
+class ProfileDownloadView(APIView):
+    """
+    A profiled request's profile: folded stacks for flame graph tools, or a
+    cProfile dump for pstats and snakeviz.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, report_id):
+        report = profiling.get_report(report_id)
+        if report is None:
+            raise Http404
+        if report['mode'] == 'cprofile':
+            response = HttpResponse(report['profile'], content_type='application/octet-stream')
+            filename = f'{report_id}.prof'
+        else:
+            response = HttpResponse(report['profile'], content_type='text/plain; charset=utf-8')
+            filename = f'{report_id}.folded'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
@@ -0,0 +1,23 @@
+"""
+Gunicorn settings, loaded automatically when gunicorn starts in this directory.
+
+With PROMETHEUS_MULTIPROC_DIR set, each worker writes its metrics to files in
+that directory (see core/metrics.py). Values left by a previous run are
+removed at startup, and dead workers are marked so their live values drop out.
+"""
+import glob
+import os
+
+
+def on_starting(server):
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for path in glob.glob(os.path.join(directory, '*.db')):
+            os.remove(path)
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,119 @@
+"""
+Cold storage for old messages.
+
+Messages in inactive conversations are moved out of the hot Message table
+into MessageArchive rows, one compressed JSON blob per conversation per
+month. Zstandard is used when the ``zstandard`` package is installed,
+otherwise zlib from the standard library.
+"""
+import json
+import zlib
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+
+from .models import Conversation, Message, MessageArchive
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+User = get_user_model()
+
+
+def compress(data):
+    """Compress bytes with the best available codec. Returns (codec, blob)."""
+    if zstandard is not None:
+        return 'zstd', zstandard.ZstdCompressor(level=10).compress(data)
+    return 'zlib', zlib.compress(data, 9)
+
+
+def decompress(codec, blob):
+    blob = bytes(blob)
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("The zstandard package is required to read this archive")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    return zlib.decompress(blob)
+
+
+def read_archive(archive):
+    """Return the list of message records stored in an archive row."""
+    return json.loads(decompress(archive.codec, archive.payload))
+
+
+def write_archive(archive, records):
+    archive.codec, archive.payload = compress(
+        json.dumps(records, separators=(',', ':')).encode('utf-8')
+    )
+    archive.message_count = len(records)
+
+
+def archive_conversation(conversation_id, cutoff):
+    """
+    Move messages created before ``cutoff`` in one conversation into monthly
+    archive rows. Must be called inside a transaction. Returns the number of
+    messages archived.
+    """
+    # Lock the conversation so concurrent runs don't archive the same rows twice
+    Conversation.objects.select_for_update().filter(pk=conversation_id).first()
+
+    by_month = {}
+    rows = Message.objects.filter(
+        conversation_id=conversation_id,
+        created_at__lt=cutoff
+    ).order_by('created_at').values('id', 'sender_id', 'content', 'is_read', 'created_at')
+    for row in rows.iterator(chunk_size=2000):
+        month = row['created_at'].date().replace(day=1)
+        row['created_at'] = row['created_at'].isoformat()
+        by_month.setdefault(month, []).append(row)
+
+    if not by_month:
+        return 0
+
+    archived_ids = []
+    for month, records in by_month.items():
+        archive, created = MessageArchive.objects.select_for_update().get_or_create(
+            conversation_id=conversation_id,
+            month=month,
+            defaults={'codec': 'zlib', 'payload': b''}
+        )
+        if not created:
+            seen = {record['id'] for record in records}
+            records = [r for r in read_archive(archive) if r['id'] not in seen] + records
+            records.sort(key=lambda r: r['created_at'])
+        write_archive(archive, records)
+        archive.save()
+        archived_ids.extend(record['id'] for record in by_month[month])
+
+    Message.objects.filter(conversation_id=conversation_id, id__in=archived_ids).delete()
+    return len(archived_ids)
+
+
+def load_archived_messages(conversation):
+    """
+    Rebuild unsaved Message instances from a conversation's archives, oldest
+    first, with senders and their profiles loaded in one query.
+    """
+    records = []
+    for archive in conversation.archives.all():
+        records.extend(read_archive(archive))
+
+    sender_ids = {record['sender_id'] for record in records}
+    senders = User.objects.select_related('profile').in_bulk(sender_ids)
+
+    messages = []
+    for record in records:
+        sender = senders.get(record['sender_id'])
+        if sender is None:
+            continue
+        messages.append(Message(
+            id=record['id'],
+            conversation=conversation,
+            sender=sender,
+            content=record['content'],
+            is_read=record['is_read'],
+            created_at=datetime.fromisoformat(record['created_at']),
+        ))
+    return messages
@@ -0,0 +1,77 @@
+from datetime import timedelta
+import logging
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from messaging.archive import archive_conversation
+from messaging.models import Conversation, Message
+from messaging.unread import invalidate_unread_count
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Moves old messages in inactive conversations into compressed monthly archives'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days',
+            type=int,
+            default=365,
+            help='Archive messages created more than this many days ago (default: 365)',
+        )
+        parser.add_argument(
+            '--inactive-days',
+            type=int,
+            default=90,
+            help='Only archive conversations with no activity for this many days (default: 90)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show what would be archived without moving anything',
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        cutoff = now - timedelta(days=options['older_than_days'])
+        inactive_cutoff = now - timedelta(days=options['inactive_days'])
+
+        conversation_ids = Conversation.objects.filter(
+            updated_at__lt=inactive_cutoff,
+            messages__created_at__lt=cutoff
+        ).order_by('pk').values_list('pk', flat=True).distinct()
+
+        if options['dry_run']:
+            count = Message.objects.filter(
+                conversation__in=conversation_ids,
+                created_at__lt=cutoff
+            ).count()
+            self.stdout.write(
+                self.style.WARNING(
+                    f'[DRY RUN] Would archive {count} messages from '
+                    f'{conversation_ids.count()} conversations'
+                )
+            )
+            return
+
+        total = 0
+        conversations = 0
+        # One short transaction per conversation keeps locks brief
+        for conversation_id in conversation_ids.iterator():
+            with transaction.atomic():
+                archived = archive_conversation(conversation_id, cutoff)
+            if archived:
+                total += archived
+                conversations += 1
+                # Archived messages no longer count towards cached unread totals
+                landlord_id, tenant_id = Conversation.objects.filter(
+                    pk=conversation_id
+                ).values_list('landlord_id', 'tenant_id').get()
+                invalidate_unread_count(landlord_id, tenant_id)
+
+        logger.info(f'Archived {total} messages from {conversations} conversations')
+        self.stdout.write(
+            self.style.SUCCESS(f'Archived {total} messages from {conversations} conversations')
+        )
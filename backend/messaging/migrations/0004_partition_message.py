@@ -0,0 +1,123 @@
+"""
+Store messaging_message as a PostgreSQL table hash-partitioned on
+conversation_id.
+
+Message queries that filter on concrete conversation ids let the planner
+prune to the matching partitions, and vacuum and index maintenance run per
+partition instead of over one large table. PostgreSQL requires the primary
+key of a partitioned table to include the partition key, so the table's key
+is (id, conversation_id), and id comes from an owned sequence because
+identity columns are not allowed on partitioned tables.
+
+Existing rows are copied into the new table, which then replaces the old one.
+The table's indexes and foreign keys are read from the catalog and recreated
+on the replacement, so their names are whatever the database has. The
+migration does nothing on other database backends.
+
+Django's migration state is left unchanged (see SeparateDatabaseAndState
+below): it cannot express a composite primary key on an existing model, so
+the model keeps id as its primary key. That stays correct because ids come
+from a single sequence, but schema changes to Message.id must be written by
+hand rather than generated.
+"""
+from django.db import migrations
+
+PARTITIONS = 16
+
+COLUMNS = '"id", "content", "is_read", "created_at", "conversation_id", "sender_id"'
+
+
+def indexes_and_foreign_keys(schema_editor, table):
+    """SQL recreating ``table``'s indexes and foreign keys, other than its primary key."""
+    quote_name = schema_editor.quote_name
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT pg_get_indexdef(indexrelid) FROM pg_index '
+            'WHERE indrelid = %s::regclass AND NOT indisprimary',
+            [table],
+        )
+        # Partitioned tables report their indexes ON ONLY the parent; plain
+        # CREATE INDEX covers the partitions as well
+        statements = [row[0].replace(' ON ONLY ', ' ON ', 1) + ';' for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [table],
+        )
+        statements += [
+            f'ALTER TABLE {quote_name(table)} ADD CONSTRAINT {quote_name(name)} {definition};'
+            for name, definition in cursor.fetchall()
+        ]
+    return '\n'.join(statements)
+
+
+def partition_messages(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    recreate = indexes_and_foreign_keys(schema_editor, 'messaging_message')
+    partitions = '\n'.join(
+        f'CREATE TABLE "messaging_message_p{i:02d}" PARTITION OF "messaging_message" '
+        f'FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {i});'
+        for i in range(PARTITIONS)
+    )
+    schema_editor.execute(f"""
+        ALTER TABLE "messaging_message" RENAME TO "messaging_message_unpartitioned";
+        CREATE TABLE "messaging_message" (
+            "id" bigint NOT NULL,
+            "content" text NOT NULL,
+            "is_read" boolean NOT NULL,
+            "created_at" timestamp with time zone NOT NULL,
+            "conversation_id" bigint NOT NULL,
+            "sender_id" bigint NOT NULL,
+            PRIMARY KEY ("id", "conversation_id")
+        ) PARTITION BY HASH ("conversation_id");
+        {partitions}
+        INSERT INTO "messaging_message" ({COLUMNS})
+            SELECT {COLUMNS} FROM "messaging_message_unpartitioned";
+        DROP TABLE "messaging_message_unpartitioned";
+        CREATE SEQUENCE "messaging_message_id_seq" OWNED BY "messaging_message"."id";
+        SELECT setval('"messaging_message_id_seq"', COALESCE(MAX("id"), 0) + 1, false) FROM "messaging_message";
+        ALTER TABLE "messaging_message" ALTER COLUMN "id" SET DEFAULT nextval('"messaging_message_id_seq"');
+        {recreate}
+    """)
+
+
+def unpartition_messages(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    recreate = indexes_and_foreign_keys(schema_editor, 'messaging_message')
+    schema_editor.execute(f"""
+        ALTER TABLE "messaging_message" RENAME TO "messaging_message_partitioned";
+        CREATE TABLE "messaging_message" (
+            "id" bigint NOT NULL PRIMARY KEY GENERATED BY DEFAULT AS IDENTITY,
+            "content" text NOT NULL,
+            "is_read" boolean NOT NULL,
+            "created_at" timestamp with time zone NOT NULL,
+            "conversation_id" bigint NOT NULL,
+            "sender_id" bigint NOT NULL
+        );
+        INSERT INTO "messaging_message" ({COLUMNS})
+            SELECT {COLUMNS} FROM "messaging_message_partitioned";
+        DROP TABLE "messaging_message_partitioned";
+        SELECT setval(pg_get_serial_sequence('"messaging_message"', 'id'), COALESCE(MAX("id"), 0) + 1, false)
+            FROM "messaging_message";
+        {recreate}
+    """)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0003_messagearchive'),
+    ]
+
+    operations = [
+        # Database only: the state keeps Message as declared in models.py,
+        # with id as its sole primary key (see the module docstring)
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(partition_messages, unpartition_messages),
+            ],
+            state_operations=[],
+        ),
+    ]
@@ -1,3 +1,5 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
 from django.db import models
 from django.conf import settings
 from rooms.models import Property
@@ -21,9 +23,35 @@ class Conversation(models.Model):
         property_info = f" about {self.property.title}" if self.property else ""
         return f"Conversation between {self.landlord.username} and {self.tenant.username}{property_info}"
 
+def message_search_vector():
+    """
+    Text-search document for a message. Queries must build the vector the same
+    way as the GIN index below for PostgreSQL to use it.
+    """
+    return SearchVector('content', config='english')
+
+def user_conversation_ids(user):
+    """
+    Ids of the conversations ``user`` takes part in. Message queries filter on
+    these values, rather than joining or subquerying conversations, so the
+    planner can prune the message partitions they cannot be in.
+    """
+    return list(Conversation.objects.filter(
+        models.Q(landlord=user) | models.Q(tenant=user)
+    ).values_list('id', flat=True))
+
 class Message(models.Model):
     """
-    Individual messages within a conversation
+    Individual messages within a conversation.
+
+    On PostgreSQL the table is hash-partitioned on conversation_id (see
+    migration 0004), so queries should filter on concrete conversation ids to
+    let the planner prune partitions; joins and subqueries scan them all.
+
+    The migration's changes are not reflected in Django's model state: the
+    table's primary key is (id, conversation_id) and id comes from an owned
+    sequence rather than an identity column, while the model still declares
+    id as its sole primary key.
     """
     conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='messages')
     sender = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='sent_messages')
@@ -33,6 +61,35 @@ class Message(models.Model):
     
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # Expression index matched by message_search_vector() in search queries
+            GinIndex(message_search_vector(), name='message_content_search_idx'),
+        ]
         
     def __str__(self):
         return f"Message from {self.sender.username} at {self.created_at}"
+
+class MessageArchive(models.Model):
+    """
+    Compressed batch of one conversation's messages for one calendar month,
+    moved out of the Message table by the archive_messages command
+    """
+    CODEC_CHOICES = [
+        ('zlib', 'zlib'),
+        ('zstd', 'Zstandard'),
+    ]
+    
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='archives')
+    month = models.DateField(help_text="First day of the archived month")
+    codec = models.CharField(max_length=10, choices=CODEC_CHOICES)
+    payload = models.BinaryField()
+    message_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['conversation', 'month']
+        ordering = ['month']
+        
+    def __str__(self):
+        return f"Archive of conversation {self.conversation_id} for {self.month:%Y-%m}"
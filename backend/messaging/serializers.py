@@ -1,24 +1,61 @@
+from django.utils.html import escape
 from rest_framework import serializers
 from .models import Conversation, Message
+from accounts.avatars import avatar_url
 from accounts.models import UserProfile
 from django.contrib.auth.models import User
 
+AVATAR_SIZE = 48  # px, the size message lists and conversation cards display
+
+def participant_avatar(user, request):
+    return avatar_url(getattr(user, 'profile', None), AVATAR_SIZE, request)
+
+# Search snippets mark matches with control characters, which are swapped
+# for <mark> tags only after the message text has been HTML-escaped
+HIGHLIGHT_START, HIGHLIGHT_STOP = '\x02', '\x03'
+
+def highlight_snippet(snippet):
+    """The HTML for a search snippet: escaped message text with marked matches."""
+    return escape(snippet).replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_STOP, '</mark>')
+
 class MessageSerializer(serializers.ModelSerializer):
     sender_name = serializers.CharField(source='sender.username', read_only=True)
     sender_type = serializers.SerializerMethodField()
+    sender_avatar = serializers.SerializerMethodField()
     
     class Meta:
         model = Message
-        fields = ('id', 'content', 'sender', 'sender_name', 'sender_type', 'is_read', 'created_at')
+        fields = ('id', 'content', 'sender', 'sender_name', 'sender_type', 'sender_avatar',
+                 'is_read', 'created_at')
         read_only_fields = ('id', 'sender', 'created_at')
     
+    def get_sender_avatar(self, obj):
+        return participant_avatar(obj.sender, self.context.get('request'))
+    
     def get_sender_type(self, obj):
+        # Views select the sender's profile along with the message, so this
+        # reads the cached relation instead of querying once per message.
         try:
-            profile = UserProfile.objects.get(user=obj.sender)
-            return profile.user_type
+            return obj.sender.profile.user_type
         except UserProfile.DoesNotExist:
             return None
 
+class MessageSearchSerializer(serializers.ModelSerializer):
+    conversation_id = serializers.IntegerField(read_only=True)
+    conversation_subject = serializers.CharField(source='conversation.subject', read_only=True)
+    sender_name = serializers.CharField(source='sender.username', read_only=True)
+    snippet = serializers.SerializerMethodField()
+    rank = serializers.FloatField(read_only=True)
+    
+    class Meta:
+        model = Message
+        fields = ('id', 'conversation_id', 'conversation_subject', 'sender', 'sender_name',
+                 'snippet', 'rank', 'created_at')
+        read_only_fields = fields
+
+    def get_snippet(self, obj):
+        return highlight_snippet(obj.snippet)
+
 class MessageCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Message
@@ -28,18 +65,29 @@ class ConversationSerializer(serializers.ModelSerializer):
     landlord_name = serializers.CharField(source='landlord.username', read_only=True)
     tenant_name = serializers.CharField(source='tenant.username', read_only=True)
     property_title = serializers.CharField(source='property.title', read_only=True)
+    landlord_avatar = serializers.SerializerMethodField()
+    tenant_avatar = serializers.SerializerMethodField()
     last_message = serializers.SerializerMethodField()
     unread_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Conversation
         fields = ('id', 'landlord', 'tenant', 'property', 'subject', 'landlord_name', 
-                 'tenant_name', 'property_title', 'last_message', 'unread_count', 
-                 'created_at', 'updated_at')
+                 'tenant_name', 'landlord_avatar', 'tenant_avatar', 'property_title', 
+                 'last_message', 'unread_count', 'created_at', 'updated_at')
         read_only_fields = ('id', 'created_at', 'updated_at')
     
+    def get_landlord_avatar(self, obj):
+        return participant_avatar(obj.landlord, self.context.get('request'))
+    
+    def get_tenant_avatar(self, obj):
+        return participant_avatar(obj.tenant, self.context.get('request'))
+    
     def get_last_message(self, obj):
-        last_message = obj.messages.last()
+        if hasattr(obj, 'latest_messages'):
+            last_message = obj.latest_messages[0] if obj.latest_messages else None
+        else:
+            last_message = obj.messages.last()
         if last_message:
             return {
                 'content': last_message.content,
@@ -49,6 +97,8 @@ class ConversationSerializer(serializers.ModelSerializer):
         return None
     
     def get_unread_count(self, obj):
+        if hasattr(obj, 'unread_messages'):
+            return obj.unread_messages
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.messages.filter(is_read=False).exclude(sender=request.user).count()
@@ -83,9 +133,18 @@ class ConversationDetailSerializer(serializers.ModelSerializer):
     landlord_name = serializers.CharField(source='landlord.username', read_only=True)
     tenant_name = serializers.CharField(source='tenant.username', read_only=True)
     property_title = serializers.CharField(source='property.title', read_only=True)
+    landlord_avatar = serializers.SerializerMethodField()
+    tenant_avatar = serializers.SerializerMethodField()
     
     class Meta:
         model = Conversation
         fields = ('id', 'landlord', 'tenant', 'property', 'subject', 'landlord_name', 
-                 'tenant_name', 'property_title', 'messages', 'created_at', 'updated_at')
+                 'tenant_name', 'landlord_avatar', 'tenant_avatar', 'property_title', 
+                 'messages', 'created_at', 'updated_at')
         read_only_fields = ('id', 'created_at', 'updated_at')
+    
+    def get_landlord_avatar(self, obj):
+        return participant_avatar(obj.landlord, self.context.get('request'))
+    
+    def get_tenant_avatar(self, obj):
+        return participant_avatar(obj.tenant, self.context.get('request'))
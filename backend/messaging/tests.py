@@ -1,3 +1,288 @@
+import re
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import UserProfile
+from rooms.models import Property
+from .archive import read_archive
+from .models import Conversation, Message, MessageArchive
+from .unread import count_unread_messages
+
+User = get_user_model()
+
+
+class MessagingTestCase(TestCase):
+    """
+    Shared fixtures: a landlord, a tenant and one of the landlord's properties
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.landlord = User.objects.create_user(email='landlord@example.com')
+        cls.tenant = User.objects.create_user(email='tenant@example.com')
+        UserProfile.objects.create(user=cls.landlord, user_type='landlord')
+        UserProfile.objects.create(user=cls.tenant, user_type='tenant')
+        cls.property = Property.objects.create(
+            landlord=cls.landlord, title='Garden flat', location='Leeds',
+            address='1 Park Row', price='850.00', area_sqft=600,
+            description='Quiet flat near the park',
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def create_conversation(self, message_count):
+        conversation = Conversation.objects.create(
+            landlord=self.landlord, tenant=self.tenant, property=self.property
+        )
+        Message.objects.bulk_create([
+            Message(
+                conversation=conversation,
+                sender=self.tenant if i % 2 else self.landlord,
+                content=f'Message {i}',
+            )
+            for i in range(message_count)
+        ])
+        return conversation
+
+    def count_queries(self, func):
+        with CaptureQueriesContext(connection) as ctx:
+            response = func()
+        return response, len(ctx.captured_queries)
+
+
+class ConversationQueryCountTests(MessagingTestCase):
+    def get_detail(self, message_count):
+        conversation = self.create_conversation(message_count)
+        self.client.force_authenticate(self.tenant)
+        url = reverse('conversation-detail', kwargs={'pk': conversation.pk})
+        response, queries = self.count_queries(lambda: self.client.get(url))
+        conversation.delete()
+        return response, queries
+
+    def test_conversation_detail_queries_do_not_grow_with_messages(self):
+        small_response, small_queries = self.get_detail(2)
+        large_response, large_queries = self.get_detail(40)
+
+        self.assertEqual(small_response.status_code, 200)
+        self.assertEqual(len(large_response.data['messages']), 40)
+        self.assertEqual(small_queries, large_queries)
+
+    def test_conversation_detail_includes_sender_type(self):
+        response, _ = self.get_detail(2)
+
+        sender_types = [m['sender_type'] for m in response.data['messages']]
+        self.assertEqual(sender_types, ['landlord', 'tenant'])
+
+    def start_conversation(self, message_count):
+        conversation = self.create_conversation(message_count)
+        self.client.force_authenticate(self.tenant)
+        response, queries = self.count_queries(lambda: self.client.post(
+            reverse('start-conversation'),
+            {'property_id': self.property.pk, 'message': 'Is it still available?'},
+            format='json',
+        ))
+        conversation.delete()
+        return response, queries
+
+    def test_start_conversation_queries_do_not_grow_with_messages(self):
+        small_response, small_queries = self.start_conversation(2)
+        large_response, large_queries = self.start_conversation(40)
+
+        self.assertEqual(small_response.status_code, 200)
+        self.assertEqual(len(large_response.data['messages']), 41)
+        self.assertEqual(small_queries, large_queries)
+
+
+class MessageSearchTests(MessagingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.conversation = Conversation.objects.create(
+            landlord=self.landlord, tenant=self.tenant, property=self.property
+        )
+        Message.objects.create(
+            conversation=self.conversation, sender=self.tenant,
+            content='Does the flat have a dishwasher and a washing machine?'
+        )
+        Message.objects.create(
+            conversation=self.conversation, sender=self.landlord,
+            content='Yes, the kitchen was renovated last year.'
+        )
+        other_landlord = User.objects.create_user(email='other@example.com')
+        other_tenant = User.objects.create_user(email='outsider@example.com')
+        other = Conversation.objects.create(landlord=other_landlord, tenant=other_tenant)
+        Message.objects.create(
+            conversation=other, sender=other_tenant, content='Is the dishwasher new?'
+        )
+
+    def search(self, q, user=None):
+        self.client.force_authenticate(user or self.tenant)
+        return self.client.get(reverse('message-search'), {'q': q})
+
+    def test_returns_ranked_hits_from_own_conversations(self):
+        response = self.search('dishwashers')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+        hit = response.data[0]
+        self.assertEqual(hit['conversation_id'], self.conversation.pk)
+        self.assertIn('<mark>dishwasher</mark>', hit['snippet'])
+        self.assertGreater(hit['rank'], 0)
+
+    def test_landlord_sees_hits_in_their_conversations(self):
+        response = self.search('kitchen', user=self.landlord)
+
+        self.assertEqual([hit['conversation_id'] for hit in response.data], [self.conversation.pk])
+
+    def test_snippet_escapes_message_html(self):
+        Message.objects.create(
+            conversation=self.conversation, sender=self.landlord,
+            content='<script>alert(1)</script> <mark>boiler</mark> & radiator serviced <img src=x onerror=alert(1)',
+        )
+
+        snippet = self.search('serviced').data[0]['snippet']
+
+        self.assertNotIn('<script', snippet)
+        self.assertNotIn('<img', snippet)
+        self.assertIn('&amp;', snippet)
+        self.assertIn('<mark>serviced</mark>', snippet)
+        self.assertEqual(snippet.count('<mark>'), 1)
+
+    def test_query_is_required(self):
+        response = self.search('  ')
+
+        self.assertEqual(response.status_code, 400)
+
+
+class MessageArchiveTests(MessagingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.conversation = self.create_conversation(4)
+        old = timezone.now() - timedelta(days=400)
+        messages = list(self.conversation.messages.order_by('pk'))
+        # Two months of old messages, plus one recent message that stays hot
+        Message.objects.filter(pk__in=[m.pk for m in messages[:2]]).update(created_at=old - timedelta(days=40))
+        Message.objects.filter(pk=messages[2].pk).update(created_at=old)
+        Conversation.objects.filter(pk=self.conversation.pk).update(updated_at=old)
+
+    def test_moves_old_messages_into_monthly_archives(self):
+        call_command('archive_messages', stdout=StringIO())
+
+        self.assertEqual(self.conversation.messages.count(), 1)
+        archives = list(MessageArchive.objects.filter(conversation=self.conversation))
+        self.assertEqual([a.message_count for a in archives], [2, 1])
+        self.assertEqual(len(read_archive(archives[0])), 2)
+
+    def test_skips_active_conversations(self):
+        Conversation.objects.filter(pk=self.conversation.pk).update(updated_at=timezone.now())
+
+        call_command('archive_messages', stdout=StringIO())
+
+        self.assertEqual(self.conversation.messages.count(), 4)
+        self.assertFalse(MessageArchive.objects.exists())
+
+    def test_history_includes_archived_messages_on_request(self):
+        call_command('archive_messages', stdout=StringIO())
+        self.client.force_authenticate(self.tenant)
+        url = reverse('message-history', kwargs={'conversation_id': self.conversation.pk})
+
+        hot = self.client.get(url)
+        full = self.client.get(url, {'include_archived': 'true'})
+
+        self.assertEqual(len(hot.data['messages']), 1)
+        contents = [m['content'] for m in full.data['messages']]
+        self.assertEqual(contents, ['Message 0', 'Message 1', 'Message 2', 'Message 3'])
+        self.assertEqual(full.data['messages'][0]['sender_type'], 'landlord')
+
+
+class UnreadCountCacheTests(MessagingTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.conversation = self.create_conversation(3)
+        self.url = reverse('unread-count')
+
+    def unread_count(self, user):
+        self.client.force_authenticate(user)
+        return self.client.get(self.url).data['unread_count']
+
+    def test_cached_count_is_served_without_queries(self):
+        self.assertEqual(self.unread_count(self.tenant), 2)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.unread_count(self.tenant), 2)
+
+    def send(self, sender, content='Any news?'):
+        self.client.force_authenticate(sender)
+        url = reverse('message-create', kwargs={'conversation_id': self.conversation.pk})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, {'content': content}, format='json')
+
+    def test_sending_a_message_updates_recipient_count(self):
+        self.assertEqual(self.unread_count(self.landlord), 1)
+
+        self.send(self.tenant)
+
+        self.assertEqual(self.unread_count(self.landlord), 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.unread_count(self.landlord), 2)
+
+    def test_reading_a_thread_updates_count(self):
+        self.assertEqual(self.unread_count(self.tenant), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('conversation-detail', kwargs={'pk': self.conversation.pk}))
+
+        self.assertEqual(self.unread_count(self.tenant), 0)
+
+    def test_message_sent_while_counting_is_not_lost(self):
+        def count_then_send(user):
+            # The count misses a message committed just after it ran
+            count = count_unread_messages(user)
+            self.send(self.tenant, 'Sent mid-count')
+            self.client.force_authenticate(self.landlord)
+            return count
+
+        with mock.patch('messaging.unread.count_unread_messages', side_effect=count_then_send):
+            self.assertEqual(self.unread_count(self.landlord), 1)
+
+        self.assertEqual(self.unread_count(self.landlord), 2)
+
+
+class MessagePartitioningTests(MessagingTestCase):
+    def test_conversation_queries_are_pruned_to_one_partition(self):
+        conversation = self.create_conversation(3)
+
+        plan = Message.objects.filter(conversation=conversation).explain()
+
+        self.assertEqual(len(set(re.findall(r'messaging_message_p\d+', plan))), 1)
+        self.assertEqual(conversation.messages.count(), 3)
+
+    def scanned_partitions(self, func):
+        with CaptureQueriesContext(connection) as ctx:
+            func()
+        sql = next(query['sql'] for query in ctx.captured_queries if 'messaging_message' in query['sql'])
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN {sql}')
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+        return set(re.findall(r'messaging_message_p\d+', plan))
+
+    def test_unread_count_and_search_are_pruned(self):
+        self.create_conversation(3)
+        self.client.force_authenticate(self.tenant)
 
-# Create your tests here.
+        self.assertEqual(len(self.scanned_partitions(lambda: count_unread_messages(self.tenant))), 1)
+        self.assertEqual(len(self.scanned_partitions(
+            lambda: self.client.get(reverse('message-search'), {'q': 'message'})
+        )), 1)
@@ -0,0 +1,93 @@
+"""
+Per-user unread message totals kept in the shared cache.
+
+Like cached profiles (see accounts.profile_cache), each user has a version in
+the cache and their total is stored under a key that includes it. Sending a
+message bumps the recipient's version after commit, and reading a thread
+bumps the reader's, so the next read counts again from the database.
+
+Counting under the version read beforehand keeps the total exact: a count
+that raced with a send is stored under the old version and never read.
+Adjusting a cached total in place could not guarantee that, as a rebuild
+between a commit and its adjustment would count the message twice.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Message, user_conversation_ids
+
+UNREAD_COUNT_TIMEOUT = 60 * 60  # seconds
+
+
+def unread_version_key(user_id):
+    return f'messaging:unread-version:{user_id}'
+
+
+def unread_count_key(user_id, version):
+    return f'messaging:unread:{user_id}:v{version}'
+
+
+def _new_version():
+    # Time-based, so a version lost to eviction never restarts at a number
+    # whose total may still be cached
+    return time.time_ns()
+
+
+def count_unread_messages(user):
+    """Count the user's unread messages straight from the database."""
+    return Message.objects.filter(
+        conversation_id__in=user_conversation_ids(user),
+        is_read=False
+    ).exclude(sender=user).count()
+
+
+def get_unread_version(user_id):
+    key = unread_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = _new_version()
+        # add() so concurrent readers settle on the same version
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def get_unread_count(user):
+    # The version is read before counting; see the module docstring
+    key = unread_count_key(user.pk, get_unread_version(user.pk))
+    count = cache.get(key)
+    if count is None:
+        count = count_unread_messages(user)
+        cache.set(key, count, UNREAD_COUNT_TIMEOUT)
+    return count
+
+
+def bump_unread_version(user_id):
+    key = unread_version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), timeout=None)
+
+
+def invalidate_unread_count(*user_ids):
+    for user_id in user_ids:
+        bump_unread_version(user_id)
+
+
+def message_sent(message):
+    """Recount the other participant's unread total after commit."""
+    conversation = message.conversation
+    if message.sender_id == conversation.landlord_id:
+        recipient_id = conversation.tenant_id
+    else:
+        recipient_id = conversation.landlord_id
+    transaction.on_commit(lambda: bump_unread_version(recipient_id))
+
+
+def messages_read(user_id, count):
+    """Recount the user's unread total after commit, if they just read messages."""
+    if count:
+        transaction.on_commit(lambda: bump_unread_version(user_id))
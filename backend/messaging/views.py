@@ -2,19 +2,37 @@ from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
-from django.db.models import Q, Max
-from django.contrib.auth.models import User
+from django.db.models import Count, IntegerField, OuterRef, Q, Max, Prefetch, Subquery, prefetch_related_objects
+from django.db.models.functions import Coalesce
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 
-from .models import Conversation, Message
+from . import unread
+from .archive import load_archived_messages
+from .models import Conversation, Message, message_search_vector, user_conversation_ids
 from .serializers import (
     ConversationSerializer, ConversationCreateSerializer, ConversationDetailSerializer,
-    MessageSerializer, MessageCreateSerializer
+    MessageSerializer, MessageCreateSerializer, MessageSearchSerializer,
+    HIGHLIGHT_START, HIGHLIGHT_STOP
 )
 from accounts.models import UserProfile
 from rooms.models import Property
 
+User = get_user_model()
+
+
+def message_prefetch():
+    """
+    Prefetch a conversation's messages together with each sender and the
+    sender's profile, so serializing a thread costs a fixed number of queries.
+    """
+    return Prefetch(
+        'messages',
+        queryset=Message.objects.select_related('sender__profile')
+    )
+
 class IsParticipantPermission(permissions.BasePermission):
     """
     Custom permission to only allow participants of a conversation to access it.
@@ -36,8 +54,21 @@ class ConversationListCreateView(generics.ListCreateAPIView):
     
     def get_queryset(self):
         user = self.request.user
+        # Per-conversation unread counts and latest messages are loaded with
+        # the list instead of once per conversation by ConversationSerializer
+        unread_messages = Message.objects.filter(
+            conversation=OuterRef('pk'), is_read=False
+        ).exclude(sender=user).values('conversation').annotate(count=Count('*')).values('count')
         return Conversation.objects.filter(
             Q(landlord=user) | Q(tenant=user)
+        ).select_related('landlord__profile', 'tenant__profile', 'property').annotate(
+            unread_messages=Coalesce(Subquery(unread_messages, output_field=IntegerField()), 0)
+        ).prefetch_related(
+            Prefetch(
+                'messages',
+                queryset=Message.objects.select_related('sender').order_by('-created_at', '-pk')[:1],
+                to_attr='latest_messages'
+            )
         ).distinct()
     
     def perform_create(self, serializer):
@@ -68,17 +99,21 @@ class ConversationDetailView(generics.RetrieveAPIView):
         user = self.request.user
         return Conversation.objects.filter(
             Q(landlord=user) | Q(tenant=user)
-        )
+        ).select_related('landlord__profile', 'tenant__profile', 'property')
     
     def retrieve(self, request, *args, **kwargs):
         conversation = self.get_object()
         # Mark messages as read for the current user
-        Message.objects.filter(
+        marked_read = Message.objects.filter(
             conversation=conversation,
             is_read=False
         ).exclude(sender=request.user).update(is_read=True)
+        unread.messages_read(request.user.pk, marked_read)
         
-        return super().retrieve(request, *args, **kwargs)
+        # Load the messages after the update so they reflect the new read state
+        prefetch_related_objects([conversation], message_prefetch())
+        serializer = self.get_serializer(conversation)
+        return Response(serializer.data)
 
 @method_decorator(csrf_exempt, name='dispatch')
 class MessageCreateView(generics.CreateAPIView):
@@ -87,6 +122,7 @@ class MessageCreateView(generics.CreateAPIView):
     """
     serializer_class = MessageCreateSerializer
     permission_classes = [permissions.IsAuthenticated]
+    rate_limit_scope = 'message_send'
     
     def perform_create(self, serializer):
         conversation_id = self.kwargs['conversation_id']
@@ -101,6 +137,7 @@ class MessageCreateView(generics.CreateAPIView):
             conversation=conversation,
             sender=self.request.user
         )
+        unread.message_sent(message)
         
         # Update conversation timestamp
         conversation.save()
@@ -109,12 +146,40 @@ class MessageCreateView(generics.CreateAPIView):
         response_serializer = MessageSerializer(message, context={'request': self.request})
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
 
+@method_decorator(csrf_exempt, name='dispatch')
+class MessageHistoryView(APIView):
+    """
+    Full message history of a conversation. Messages moved to cold storage by
+    the archive_messages command are included with ?include_archived=true.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request, conversation_id):
+        conversation = get_object_or_404(
+            Conversation.objects.filter(Q(landlord=request.user) | Q(tenant=request.user)),
+            id=conversation_id
+        )
+        messages = list(
+            Message.objects.filter(conversation=conversation).select_related('sender__profile')
+        )
+        include_archived = request.query_params.get('include_archived', '').lower() in ('1', 'true', 'yes')
+        if include_archived:
+            messages = load_archived_messages(conversation) + messages
+        
+        serializer = MessageSerializer(messages, many=True, context={'request': request})
+        return Response({
+            "conversation": conversation.id,
+            "include_archived": include_archived,
+            "messages": serializer.data
+        })
+
 @method_decorator(csrf_exempt, name='dispatch')
 class StartConversationView(APIView):
     """
     Start a conversation about a specific property
     """
     permission_classes = [permissions.IsAuthenticated]
+    rate_limit_scope = 'message_send'
     
     def post(self, request):
         property_id = request.data.get('property_id')
@@ -152,11 +217,12 @@ class StartConversationView(APIView):
             
             # Send initial message if provided
             if initial_message:
-                Message.objects.create(
+                message = Message.objects.create(
                     conversation=conversation,
                     sender=request.user,
                     content=initial_message
                 )
+                unread.message_sent(message)
             
             # Update landlord's inquiry count if this is a new conversation
             if created:
@@ -164,6 +230,9 @@ class StartConversationView(APIView):
                 landlord_profile.total_inquiries_received += 1
                 landlord_profile.save()
             
+            prefetch_related_objects(
+                [conversation], 'landlord__profile', 'tenant__profile', 'property', message_prefetch()
+            )
             serializer = ConversationDetailSerializer(conversation, context={'request': request})
             return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
             
@@ -172,6 +241,51 @@ class StartConversationView(APIView):
         except UserProfile.DoesNotExist:
             return Response({"error": "User profile not found"}, status=status.HTTP_404_NOT_FOUND)
 
+@method_decorator(csrf_exempt, name='dispatch')
+class MessageSearchView(generics.ListAPIView):
+    """
+    Full-text search across messages in the current user's conversations.
+    Results are ranked by relevance and include a highlighted snippet.
+    """
+    serializer_class = MessageSearchSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    default_limit = 20
+    max_limit = 50
+    
+    def get_limit(self):
+        try:
+            limit = int(self.request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            limit = self.default_limit
+        return max(1, min(limit, self.max_limit))
+    
+    def get_queryset(self):
+        user = self.request.user
+        query = SearchQuery(
+            self.request.query_params.get('q', '').strip(),
+            config='english',
+            search_type='websearch'
+        )
+        # Filtering on the same vector expression as the GIN index lets
+        # PostgreSQL find matches without scanning the user's whole history.
+        return Message.objects.annotate(
+            search=message_search_vector()
+        ).filter(
+            conversation_id__in=user_conversation_ids(user),
+            search=query
+        ).annotate(
+            rank=SearchRank(message_search_vector(), query),
+            snippet=SearchHeadline(
+                'content', query, config='english',
+                start_sel=HIGHLIGHT_START, stop_sel=HIGHLIGHT_STOP, max_fragments=2
+            )
+        ).select_related('conversation', 'sender').order_by('-rank', '-created_at')[:self.get_limit()]
+    
+    def list(self, request, *args, **kwargs):
+        if not request.query_params.get('q', '').strip():
+            return Response({"error": "Search query 'q' is required"}, status=status.HTTP_400_BAD_REQUEST)
+        return super().list(request, *args, **kwargs)
+
 @method_decorator(csrf_exempt, name='dispatch')
 class UnreadMessagesCountView(APIView):
     """
@@ -180,11 +294,5 @@ class UnreadMessagesCountView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request):
-        unread_count = Message.objects.filter(
-            conversation__in=Conversation.objects.filter(
-                Q(landlord=request.user) | Q(tenant=request.user)
-            ),
-            is_read=False
-        ).exclude(sender=request.user).count()
-        
-        return Response({"unread_count": unread_count})
+        # Served from the shared cache; the database is only hit on a miss
+        return Response({"unread_count": unread.get_unread_count(request.user)})
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class RoomsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'rooms'
+
+    def ready(self):
+        # Connect the property cache invalidation receivers
+        from . import signals  # noqa: F401
@@ -0,0 +1,259 @@
+"""
+Bulk import of users and listings for onboarding agencies.
+
+Records are streamed from a JSONL or CSV file and handled in chunks: each
+chunk is validated with the same serializers the API uses, passwords are
+hashed in a process pool, and users, profiles, properties and images are
+written with bulk_create in one transaction per chunk.
+
+A JSONL line is one user with their listings::
+
+    {"email": "...", "password": "...", "first_name": "...", "last_name": "...",
+     "user_type": "landlord", "profile": {"phone_number": "...", "property_name": "..."},
+     "properties": [{"title": "...", ..., "images": ["property_images/a.jpg"]}]}
+
+A CSV row holds the user and profile columns plus at most one listing in
+``listing_*`` columns (``listing_images`` is a ``|``-separated list of
+paths). Consecutive rows with the same email add more listings to that user.
+Image paths must already exist in media storage; only the names are stored.
+"""
+import csv
+import json
+from itertools import groupby
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from rest_framework.validators import UniqueValidator
+
+from accounts.models import UserProfile
+from accounts.serializers import RegisterSerializer
+from .models import Property, PropertyImage
+from .serializers import PropertyCreateSerializer
+
+User = get_user_model()
+
+USER_FIELDS = ('email', 'password', 'first_name', 'last_name', 'user_type')
+PROFILE_FIELDS = (
+    'phone_number', 'bio', 'location', 'date_of_birth',
+    'property_name', 'years_experience', 'website'
+)
+LISTING_PREFIX = 'listing_'
+
+
+def read_records(path):
+    """Yield import records from a .csv or .jsonl file, one user at a time."""
+    if path.lower().endswith('.csv'):
+        yield from _read_csv(path)
+    else:
+        yield from _read_jsonl(path)
+
+
+def _read_jsonl(path):
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_number}: invalid JSON ({e})")
+
+
+def _read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = ({k: v for k, v in row.items() if v not in ('', None)} for row in csv.DictReader(f))
+        for _, group in groupby(rows, key=lambda row: row.get('email')):
+            record = None
+            for row in group:
+                listing = {
+                    key[len(LISTING_PREFIX):]: row.pop(key)
+                    for key in list(row) if key.startswith(LISTING_PREFIX)
+                }
+                if record is None:
+                    record = {key: row.pop(key) for key in USER_FIELDS if key in row}
+                    record['profile'] = row
+                    record['properties'] = []
+                if listing:
+                    images = listing.pop('images', '')
+                    listing['images'] = [name for name in images.split('|') if name]
+                    record['properties'].append(listing)
+            yield record
+
+
+def _register_serializer(data):
+    """RegisterSerializer without the per-row email lookup; duplicates are checked per chunk."""
+    serializer = RegisterSerializer(data=data)
+    email_field = serializer.fields['email']
+    email_field.validators = [v for v in email_field.validators if not isinstance(v, UniqueValidator)]
+    return serializer
+
+
+def _build_images(images):
+    built = []
+    for image in images:
+        if isinstance(image, str):
+            image = {'image': image}
+        if not image.get('image'):
+            raise ValidationError('Each image needs a path.')
+        built.append(PropertyImage(
+            image=image['image'],
+            caption=image.get('caption', ''),
+            is_primary=bool(image.get('is_primary', False)),
+        ))
+    if built and not any(image.is_primary for image in built):
+        built[0].is_primary = True
+    return built
+
+
+def validate_record(record):
+    """
+    Validate one record without touching the database.
+
+    Returns:
+        tuple: (entry, errors); entry holds unsaved model instances and the
+        raw password, and is None when errors is non-empty
+    """
+    errors = {}
+    profile_data = dict(record.get('profile') or {})
+    unknown = sorted(set(profile_data) - set(PROFILE_FIELDS))
+    if unknown:
+        errors['profile'] = [f"Unknown fields: {', '.join(unknown)}"]
+
+    user_type = record.get('user_type')
+    data = {key: record[key] for key in USER_FIELDS if key in record}
+    data['password2'] = data.get('password')
+    if user_type in ('landlord', 'tenant'):
+        data[user_type] = profile_data
+    serializer = _register_serializer(data)
+    if not serializer.is_valid():
+        errors.update(serializer.errors)
+
+    profile = UserProfile(user_type=user_type, **{k: v for k, v in profile_data.items() if k in PROFILE_FIELDS})
+    try:
+        profile.full_clean(exclude=['user'], validate_unique=False, validate_constraints=False)
+    except ValidationError as e:
+        errors.setdefault('profile', []).extend(
+            f'{field}: {message}' for field, messages in e.message_dict.items() for message in messages
+        )
+
+    properties = []
+    listings = record.get('properties') or []
+    if listings and user_type != 'landlord':
+        errors['properties'] = ['Only landlords can have listings.']
+    for i, listing in enumerate(listings):
+        listing = dict(listing)
+        try:
+            images = _build_images(listing.pop('images', []))
+        except ValidationError as e:
+            errors[f'properties[{i}].images'] = e.messages
+            continue
+        property_serializer = PropertyCreateSerializer(data=listing)
+        if not property_serializer.is_valid():
+            errors[f'properties[{i}]'] = property_serializer.errors
+            continue
+        properties.append((Property(**property_serializer.validated_data), images))
+
+    if errors:
+        return None, errors
+
+    validated = serializer.validated_data
+    user = User(
+        email=User.objects.normalize_email(validated['email']),
+        first_name=validated.get('first_name', ''),
+        last_name=validated.get('last_name', ''),
+    )
+    return {
+        'user': user,
+        'password': validated['password'],
+        'profile': profile,
+        'properties': properties,
+    }, None
+
+
+def validate_chunk(records, seen_emails):
+    """
+    Validate a chunk of (index, record) pairs.
+
+    Emails already in the database, or earlier in the import, are rejected
+    with one query for the whole chunk.
+
+    Returns:
+        tuple: (entries, failures); failures is a list of (index, email, errors)
+    """
+    entries, failures = [], []
+    candidates = []
+    for index, record in records:
+        entry, errors = validate_record(record)
+        if errors:
+            failures.append((index, record.get('email'), errors))
+        else:
+            candidates.append((index, entry))
+
+    emails = [entry['user'].email for _, entry in candidates]
+    existing = set(User.objects.filter(email__in=emails).values_list('email', flat=True))
+    for index, entry in candidates:
+        email = entry['user'].email
+        if email in existing or email in seen_emails:
+            failures.append((index, email, {'email': ['A user with this email already exists.']}))
+            continue
+        seen_emails.add(email)
+        entries.append(entry)
+    return entries, failures
+
+
+def hash_passwords(passwords, pool=None, workers=1):
+    """
+    Hash passwords, spreading the work over ``pool`` when one is given;
+    ``workers`` is the number of processes it was created with.
+    """
+    if pool is None:
+        return [make_password(password) for password in passwords]
+    # A few batches per worker keeps them busy without a round trip per password
+    chunksize = max(1, len(passwords) // (workers * 4))
+    return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+
+@transaction.atomic
+def insert_chunk(entries, hashes, mark_verified=False):
+    """
+    Write validated entries with one bulk INSERT per table.
+
+    Returns:
+        dict: Counts of created users, profiles, properties and images
+    """
+    users = []
+    for entry, password_hash in zip(entries, hashes):
+        user = entry['user']
+        user.password = password_hash
+        user.is_active = mark_verified
+        users.append(user)
+    User.objects.bulk_create(users)
+
+    profiles, properties = [], []
+    for entry in entries:
+        entry['profile'].user = entry['user']
+        entry['profile'].email_verified = mark_verified
+        profiles.append(entry['profile'])
+        for property_obj, _ in entry['properties']:
+            property_obj.landlord = entry['user']
+            properties.append(property_obj)
+    UserProfile.objects.bulk_create(profiles)
+    Property.objects.bulk_create(properties)
+
+    images = []
+    for entry in entries:
+        for property_obj, property_images in entry['properties']:
+            for image in property_images:
+                image.property = property_obj
+                images.append(image)
+    PropertyImage.objects.bulk_create(images)
+
+    return {
+        'users': len(users),
+        'profiles': len(profiles),
+        'properties': len(properties),
+        'images': len(images),
+    }
@@ -0,0 +1,134 @@
+import json
+import logging
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import islice
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+
+from rooms.importer import hash_passwords, insert_chunk, read_records, validate_chunk
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Bulk imports users, profiles and listings from a CSV or JSONL file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSONL file to import')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Records validated and inserted per transaction (default: 500)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Processes used to hash passwords; 0 hashes in this process (default: CPU count)',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Checkpoint file recording progress (default: <path>.checkpoint)',
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Skip the records already imported according to the checkpoint',
+        )
+        parser.add_argument(
+            '--mark-verified',
+            action='store_true',
+            help='Create users active and with a verified email',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Validate the file and show what would be imported without writing anything',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'File not found: {path}')
+        checkpoint_path = options['checkpoint'] or f'{path}.checkpoint'
+        dry_run = options['dry_run']
+
+        start = self.load_checkpoint(checkpoint_path, path) if options['resume'] else 0
+        if start:
+            self.stdout.write(f'Resuming after record {start}')
+
+        totals = Counter()
+        seen_emails = set()
+        records = islice(enumerate(read_records(path)), start, None)
+        pool = None
+        if not dry_run and options['workers'] > 0:
+            # Workers started with spawn need Django configured to hash
+            pool = ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup)
+
+        try:
+            with pool or nullcontext():
+                while True:
+                    chunk = list(islice(records, options['chunk_size']))
+                    if not chunk:
+                        break
+
+                    entries, failures = validate_chunk(chunk, seen_emails)
+                    for index, email, errors in failures:
+                        self.stderr.write(f'Record {index + 1} ({email}): {json.dumps(errors, default=str)}')
+                    totals['invalid'] += len(failures)
+
+                    if dry_run:
+                        totals['users'] += len(entries)
+                        totals['landlords'] += sum(e['profile'].user_type == 'landlord' for e in entries)
+                        totals['properties'] += sum(len(e['properties']) for e in entries)
+                        totals['images'] += sum(len(images) for e in entries for _, images in e['properties'])
+                        continue
+
+                    hashes = hash_passwords([entry['password'] for entry in entries], pool, options['workers'])
+                    totals.update(insert_chunk(entries, hashes, options['mark_verified']))
+                    # Only advance the checkpoint once the chunk is committed
+                    self.save_checkpoint(checkpoint_path, path, chunk[-1][0] + 1)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if dry_run:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"[DRY RUN] Would import {totals['users']} users "
+                    f"({totals['landlords']} landlords), {totals['properties']} properties "
+                    f"and {totals['images']} images; {totals['invalid']} invalid records"
+                )
+            )
+            return
+
+        logger.info(
+            f"Imported {totals['users']} users, {totals['properties']} properties "
+            f"and {totals['images']} images from {path}"
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {totals['users']} users, {totals['properties']} properties "
+                f"and {totals['images']} images; skipped {totals['invalid']} invalid records"
+            )
+        )
+
+    def load_checkpoint(self, checkpoint_path, path):
+        try:
+            with open(checkpoint_path, encoding='utf-8') as f:
+                checkpoint = json.load(f)
+        except FileNotFoundError:
+            return 0
+        if checkpoint.get('source') != os.path.abspath(path):
+            raise CommandError(f'{checkpoint_path} belongs to {checkpoint.get("source")}, not {path}')
+        return checkpoint['records']
+
+    def save_checkpoint(self, checkpoint_path, path, records):
+        # Write then rename, so a crash never leaves a half-written checkpoint
+        tmp_path = f'{checkpoint_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'source': os.path.abspath(path), 'records': records}, f)
+        os.replace(tmp_path, checkpoint_path)
@@ -0,0 +1,60 @@
+"""
+Property detail payloads kept in a two-tier cache.
+
+The PropertySerializer payload of a property is the same for every viewer
+apart from is_favorited, so it is cached without that field and the flag is
+looked up per request. Image URLs are cached relative and made absolute for
+each request, so one viewer's scheme and host never reach another. Saving or deleting a property or one of its images
+(or its landlord) invalidates the entry once the transaction commits.
+"""
+from django.db import transaction
+
+from core.cache import TwoTierCache
+from .models import Property
+from .serializers import PropertySerializer
+
+property_details = TwoTierCache('property-detail', maxsize=2048, local_ttl=5, timeout=10 * 60)
+
+
+def _build_property_payload(pk):
+    property_obj = (
+        Property.objects.select_related('landlord')
+        .prefetch_related('images')
+        .filter(pk=pk)
+        .first()
+    )
+    if property_obj is None:
+        return None
+    # No request in the context, so image URLs stay relative
+    data = dict(PropertySerializer(property_obj).data)
+    data.pop('is_favorited', None)
+    return data
+
+
+def with_absolute_urls(data, request):
+    """A copy of a cached payload with its image URLs made absolute for ``request``."""
+    if request is None:
+        return data
+    images = [
+        {**image, 'image': image['image'] and request.build_absolute_uri(image['image'])}
+        for image in data['images']
+    ]
+    return {**data, 'images': images}
+
+
+def get_property_payload(pk, request=None):
+    """Return the detail payload of property ``pk`` for ``request``, or None if it does not exist."""
+    data = property_details.get(pk)
+    if data is None:
+        data = _build_property_payload(pk)
+        # Missing properties are not cached: bulk imports create rows without
+        # signals, and a cached miss would hide them
+        if data is not None:
+            property_details.set(pk, data)
+    return data and with_absolute_urls(data, request)
+
+
+def property_changed(*pks):
+    """Invalidate the properties' cached payloads once the current transaction commits."""
+    if pks:
+        transaction.on_commit(lambda: property_details.delete(*pks))
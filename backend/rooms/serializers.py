@@ -69,13 +69,19 @@ class PropertyListSerializer(serializers.ModelSerializer):
         )
     
     def get_is_favorited(self, obj):
+        # List views annotate this (see rooms.views.listing_queryset)
+        if hasattr(obj, 'favorited'):
+            return obj.favorited
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return Favorite.objects.filter(tenant=request.user, property=obj).exists()
         return False
 
     def get_primary_image(self, obj):
-        primary_image = obj.images.filter(is_primary=True).first()
+        if hasattr(obj, 'primary_images'):
+            primary_image = obj.primary_images[0] if obj.primary_images else None
+        else:
+            primary_image = obj.images.filter(is_primary=True).first()
         if primary_image:
             return self.context['request'].build_absolute_uri(primary_image.image.url)
         return None
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Property, PropertyImage
+from .property_cache import property_changed
+
+
+@receiver([post_save, post_delete], sender=Property)
+def property_saved(sender, instance, **kwargs):
+    property_changed(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=PropertyImage)
+def property_image_saved(sender, instance, **kwargs):
+    property_changed(instance.property_id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def landlord_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Payloads include the landlord's name and email; logins change neither
+    if created or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    property_changed(*instance.room_properties.values_list('pk', flat=True))
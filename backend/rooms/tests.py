@@ -1,3 +1,215 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import tempfile
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from accounts.models import UserProfile
+from accounts.profile_cache import user_types
+from .models import Favorite, Property, PropertyImage, PropertyView
+from .property_cache import property_details
 
-# Create your tests here.
+User = get_user_model()
+
+
+class ImportPortfolioTests(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def listing(self, title, **extra):
+        data = {
+            'title': title, 'property_type': 'apartment', 'location': 'Lagos',
+            'address': '1 Marina Road', 'price': '1500.00', 'bedrooms': 2,
+            'bathrooms': 1, 'area_sqft': 800, 'description': 'Two bed flat'
+        }
+        data.update(extra)
+        return data
+
+    def user(self, email, user_type='landlord', **extra):
+        data = {
+            'email': email, 'password': 'Imp0rted-password!', 'first_name': 'Ada',
+            'last_name': 'Obi', 'user_type': user_type, 'profile': {'location': 'Lagos'}
+        }
+        data.update(extra)
+        return data
+
+    def write_jsonl(self, records):
+        path = os.path.join(self.tmpdir.name, 'portfolio.jsonl')
+        with open(path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+        return path
+
+    def run_import(self, path, *args):
+        stdout, stderr = StringIO(), StringIO()
+        call_command('import_portfolio', path, '--workers', '0', *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_imports_users_profiles_and_listings(self):
+        path = self.write_jsonl([
+            self.user('agency@example.com', properties=[
+                self.listing('Flat A', images=['property_images/a1.jpg', 'property_images/a2.jpg']),
+                self.listing('Flat B'),
+            ]),
+            self.user('tenant@example.com', user_type='tenant'),
+        ])
+
+        self.run_import(path)
+
+        landlord = User.objects.get(email='agency@example.com')
+        self.assertTrue(landlord.check_password('Imp0rted-password!'))
+        self.assertFalse(landlord.is_active)
+        self.assertEqual(landlord.profile.user_type, 'landlord')
+        self.assertEqual(landlord.room_properties.count(), 2)
+        images = PropertyImage.objects.filter(property__title='Flat A')
+        self.assertEqual([image.is_primary for image in images], [True, False])
+        self.assertEqual(UserProfile.objects.get(user__email='tenant@example.com').user_type, 'tenant')
+
+    def test_csv_rows_with_the_same_email_add_listings(self):
+        path = os.path.join(self.tmpdir.name, 'portfolio.csv')
+        fields = ['email', 'password', 'first_name', 'last_name', 'user_type', 'property_name',
+                  'listing_title', 'listing_location', 'listing_address', 'listing_price',
+                  'listing_area_sqft', 'listing_description', 'listing_images']
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(fields)
+            for title in ('Flat A', 'Flat B'):
+                writer.writerow(['agency@example.com', 'Imp0rted-password!', 'Ada', 'Obi', 'landlord',
+                                 'Obi Homes', title, 'Lagos', '1 Road', '900', '500', 'Nice',
+                                 'property_images/x.jpg|property_images/y.jpg'])
+
+        self.run_import(path, '--mark-verified')
+
+        landlord = User.objects.get(email='agency@example.com')
+        self.assertTrue(landlord.is_active)
+        self.assertTrue(landlord.profile.email_verified)
+        self.assertEqual(landlord.profile.property_name, 'Obi Homes')
+        self.assertEqual(Property.objects.filter(landlord=landlord).count(), 2)
+        self.assertEqual(PropertyImage.objects.count(), 4)
+
+    def test_invalid_and_duplicate_records_are_skipped(self):
+        User.objects.create_user(email='taken@example.com')
+        path = self.write_jsonl([
+            self.user('taken@example.com'),
+            self.user('dup@example.com'),
+            self.user('dup@example.com'),
+            self.user('tenant@example.com', user_type='tenant', properties=[self.listing('Flat')]),
+            self.user('bad-price@example.com', properties=[self.listing('Flat', price='cheap')]),
+        ])
+
+        _, stderr = self.run_import(path)
+
+        self.assertEqual(list(User.objects.order_by('email').values_list('email', flat=True)),
+                         ['dup@example.com', 'taken@example.com'])
+        self.assertFalse(Property.objects.exists())
+        self.assertEqual(stderr.count('Record '), 4)
+
+    def test_dry_run_writes_nothing(self):
+        path = self.write_jsonl([self.user('agency@example.com', properties=[self.listing('Flat A')])])
+
+        stdout, _ = self.run_import(path, '--dry-run')
+
+        self.assertIn('Would import 1 users (1 landlords), 1 properties', stdout)
+        self.assertFalse(User.objects.filter(email='agency@example.com').exists())
+        self.assertFalse(os.path.exists(path + '.checkpoint'))
+
+    def test_resume_skips_committed_chunks(self):
+        path = self.write_jsonl([self.user(f'user{i}@example.com') for i in range(3)])
+        self.run_import(path, '--chunk-size', '2')
+        with open(path + '.checkpoint', encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['records'], 3)
+
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(self.user('user3@example.com')) + '\n')
+        _, stderr = self.run_import(path, '--resume')
+
+        self.assertEqual(stderr, '')
+        self.assertEqual(User.objects.filter(email__startswith='user').count(), 4)
+
+    def test_passwords_hashed_in_process_pool(self):
+        path = self.write_jsonl([self.user(f'user{i}@example.com') for i in range(3)])
+
+        call_command('import_portfolio', path, '--workers', '2', stdout=StringIO(), stderr=StringIO())
+
+        for user in User.objects.filter(email__startswith='user'):
+            self.assertTrue(user.check_password('Imp0rted-password!'))
+
+
+class PropertyDetailCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        property_details.clear_local()
+        user_types.clear_local()
+        self.client = APIClient()
+        self.landlord = User.objects.create_user(email='landlord@example.com', password='pw-12345678')
+        UserProfile.objects.create(user=self.landlord, user_type='landlord')
+        self.property = Property.objects.create(
+            landlord=self.landlord, title='Flat', location='Lagos', address='1 Marina Road',
+            price='1500.00', area_sqft=800, description='Two bed flat'
+        )
+        self.url = reverse('property-detail', args=[self.property.pk])
+
+    def test_repeat_views_skip_the_serializer_queries(self):
+        self.client.get(self.url)
+
+        # View row and landlord counter only
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.data['title'], 'Flat')
+        self.assertEqual(PropertyView.objects.filter(property=self.property).count(), 2)
+        self.assertEqual(UserProfile.objects.get(user=self.landlord).total_property_views, 2)
+
+    def test_update_invalidates_payload(self):
+        self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.property.title = 'Renovated flat'
+            self.property.save()
+
+        self.assertEqual(self.client.get(self.url).data['title'], 'Renovated flat')
+
+    def test_is_favorited_is_per_user(self):
+        tenant = User.objects.create_user(email='tenant@example.com', password='pw-12345678')
+        Favorite.objects.create(tenant=tenant, property=self.property)
+        self.assertFalse(self.client.get(self.url).data['is_favorited'])
+
+        self.client.force_authenticate(tenant)
+
+        self.assertTrue(self.client.get(self.url).data['is_favorited'])
+
+    @override_settings(ALLOWED_HOSTS=['one.example', 'two.example'])
+    def test_image_urls_are_absolute_for_each_request(self):
+        PropertyImage.objects.create(property=self.property, image='property_images/front.jpg')
+        self.client.get(self.url, HTTP_HOST='one.example')
+
+        response = self.client.get(self.url, HTTP_HOST='two.example', secure=True)
+
+        self.assertEqual(response.data['images'][0]['image'], 'https://two.example/media/property_images/front.jpg')
+        self.assertEqual(property_details.get(self.property.pk)['images'][0]['image'], '/media/property_images/front.jpg')
+
+    def test_missing_property(self):
+        response = self.client.get(reverse('property-detail', args=[self.property.pk + 1]))
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_user_type_change_reaches_permission_checks(self):
+        tenant = User.objects.create_user(email='tenant@example.com', password='pw-12345678')
+        profile = UserProfile.objects.create(user=tenant, user_type='tenant')
+        self.client.force_authenticate(tenant)
+        self.assertEqual(self.client.delete(self.url).status_code, 403)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.user_type = 'landlord'
+            profile.save()
+
+        # Now a landlord, but not this property's
+        response = self.client.delete(self.url)
+        self.assertEqual(response.status_code, 403)
+        self.assertIn('own properties', str(response.data))
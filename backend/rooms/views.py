@@ -5,7 +5,8 @@ from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
-from django.db.models import Q
+from django.db.models import Exists, F, OuterRef, Prefetch, Q, Value
+from django.http import Http404
 from .models import Property, PropertyImage, PropertyReview, LandlordReview, Favorite, PropertyView
 from .serializers import (
     PropertySerializer, PropertyCreateSerializer, 
@@ -15,10 +16,25 @@ from .serializers import (
     FavoriteSerializer, PropertyViewSerializer
 )
 from accounts.models import UserProfile
+from accounts.profile_cache import get_user_type
+from .property_cache import get_property_payload
 from django.contrib.auth.models import User
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 
+def listing_queryset(queryset, user):
+    """
+    Load what PropertyListSerializer reads with the properties: the landlord,
+    the primary image and whether ``user`` has favorited each one.
+    """
+    if user.is_authenticated:
+        favorited = Exists(Favorite.objects.filter(tenant=user, property=OuterRef('pk')))
+    else:
+        favorited = Value(False)
+    return queryset.select_related('landlord').annotate(favorited=favorited).prefetch_related(
+        Prefetch('images', queryset=PropertyImage.objects.filter(is_primary=True), to_attr='primary_images')
+    )
+
 class IsLandlordPermission(permissions.BasePermission):
     """
     Custom permission to only allow landlords to create properties.
@@ -27,11 +43,7 @@ class IsLandlordPermission(permissions.BasePermission):
         if not request.user.is_authenticated:
             return False
         
-        try:
-            profile = UserProfile.objects.get(user=request.user)
-            return profile.user_type == 'landlord'
-        except UserProfile.DoesNotExist:
-            return False
+        return get_user_type(request.user.pk) == 'landlord'
 
 class IsLandlordOrReadOnly(permissions.BasePermission):
     """
@@ -44,11 +56,7 @@ class IsLandlordOrReadOnly(permissions.BasePermission):
         if not request.user.is_authenticated:
             return False
         
-        try:
-            profile = UserProfile.objects.get(user=request.user)
-            return profile.user_type == 'landlord'
-        except UserProfile.DoesNotExist:
-            return False
+        return get_user_type(request.user.pk) == 'landlord'
 
 class IsTenantPermission(permissions.BasePermission):
     """
@@ -58,16 +66,13 @@ class IsTenantPermission(permissions.BasePermission):
         if not request.user.is_authenticated:
             return False
         
-        try:
-            profile = UserProfile.objects.get(user=request.user)
-            return profile.user_type == 'tenant'
-        except UserProfile.DoesNotExist:
-            return False
+        return get_user_type(request.user.pk) == 'tenant'
 
 @method_decorator(csrf_exempt, name='dispatch')
 class PropertyListCreateView(generics.ListCreateAPIView):
     queryset = Property.objects.all()
     permission_classes = [IsLandlordOrReadOnly]
+    rate_limit_scope = 'property_create'
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['property_type', 'bedrooms', 'bathrooms', 'furnished', 'parking', 'pets_allowed', 'status']
     search_fields = ['title', 'location', 'address', 'description']
@@ -98,7 +103,7 @@ class PropertyListCreateView(generics.ListCreateAPIView):
                 Q(location__icontains=location) | Q(address__icontains=location)
             )
             
-        return queryset
+        return listing_queryset(queryset, self.request.user)
     
     def perform_create(self, serializer):
         serializer.save(landlord=self.request.user)
@@ -129,22 +134,28 @@ class PropertyDetailView(generics.RetrieveUpdateDestroyAPIView):
         return obj
     
     def retrieve(self, request, *args, **kwargs):
-        property_obj = self.get_object()
+        data = get_property_payload(kwargs['pk'], request)
+        if data is None:
+            raise Http404
         
         # Track property view
         ip_address = self.get_client_ip(request)
         PropertyView.objects.create(
-            property=property_obj,
+            property_id=data['id'],
             viewer=request.user if request.user.is_authenticated else None,
             ip_address=ip_address
         )
         
-        # Update landlord's total views count
-        landlord_profile = UserProfile.objects.get(user=property_obj.landlord)
-        landlord_profile.total_property_views += 1
-        landlord_profile.save()
+        # Update landlord's total views count without a save(), which would
+        # invalidate their cached profile on every property view
+        UserProfile.objects.filter(user_id=data['landlord']).update(
+            total_property_views=F('total_property_views') + 1
+        )
         
-        return super().retrieve(request, *args, **kwargs)
+        is_favorited = request.user.is_authenticated and Favorite.objects.filter(
+            tenant=request.user, property_id=data['id']
+        ).exists()
+        return Response({**data, 'is_favorited': is_favorited})
     
     def get_client_ip(self, request):
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -160,7 +171,7 @@ class LandlordPropertiesView(generics.ListAPIView):
     permission_classes = [IsLandlordPermission]
     
     def get_queryset(self):
-        return Property.objects.filter(landlord=self.request.user)
+        return listing_queryset(Property.objects.filter(landlord=self.request.user), self.request.user)
 
 @method_decorator(csrf_exempt, name='dispatch')
 class PropertyImageUploadView(APIView):
@@ -174,12 +185,13 @@ class PropertyImageUploadView(APIView):
             return Response({"error": "No images provided"}, status=status.HTTP_400_BAD_REQUEST)
         
         uploaded_images = []
+        has_primary = property_obj.images.filter(is_primary=True).exists()
         for image in images:
             property_image = PropertyImage.objects.create(
                 property=property_obj,
                 image=image,
                 caption=request.data.get('caption', ''),
-                is_primary=len(uploaded_images) == 0 and not property_obj.images.filter(is_primary=True).exists()
+                is_primary=len(uploaded_images) == 0 and not has_primary
             )
             uploaded_images.append(property_image)
         
@@ -193,7 +205,7 @@ class PropertyReviewListCreateView(generics.ListCreateAPIView):
     
     def get_queryset(self):
         property_id = self.kwargs['property_id']
-        return PropertyReview.objects.filter(property_id=property_id)
+        return PropertyReview.objects.filter(property_id=property_id).select_related('tenant')
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -217,7 +229,7 @@ class LandlordReviewListCreateView(generics.ListCreateAPIView):
     
     def get_queryset(self):
         landlord_id = self.kwargs['landlord_id']
-        return LandlordReview.objects.filter(landlord_id=landlord_id)
+        return LandlordReview.objects.filter(landlord_id=landlord_id).select_related('tenant', 'landlord')
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -251,7 +263,7 @@ class FavoriteListCreateView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated, IsTenantPermission]
     
     def get_queryset(self):
-        return Favorite.objects.filter(tenant=self.request.user)
+        return Favorite.objects.filter(tenant=self.request.user).select_related('tenant', 'property')
     
     def perform_create(self, serializer):
         property_id = self.request.data.get('property')